@@ -0,0 +1,175 @@
+# Batch.py
+import contextlib
+import glob
+import io
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from Parser import Parser
+from Program import Program
+from Cache import ProgramCache
+
+'''
+Non-interactive batch runner - runs many scripts across every core with a process pool
+Each worker process is started once and handles many scripts, keeping its imports, dispatch tables
+and parsed Programs warm between tasks. A script's Program is parsed once per worker and reused
+whenever the same unchanged file comes round again; every run still gets a fresh interpreter,
+so scripts never see each other's globals.
+Per-script stdout and stderr are captured separately and returned with the exit status and timing:
+    0  - ran to completion
+    65 - token or parse error, as StarlingScript.main
+    70 - runtime error reported by the interpreter
+    1  - the script crashed the interpreter with an unexpected Python exception
+Timeouts use SIGALRM inside the worker, so they are only enforced where signal.setitimer exists (not Windows).
+'''
+
+# Extension of the scripts picked up when a directory is given
+SCRIPT_PATTERN = "*.txt"
+
+
+# Raised by the alarm handler - a BaseException so no 'except Exception' in the interpreters can swallow it
+class ScriptTimeout(BaseException):
+    pass
+
+
+# Expand directories, glob patterns and plain file names into a sorted list of script paths
+def expand_paths(patterns):
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(sorted(glob.glob(os.path.join(pattern, SCRIPT_PATTERN))))
+        elif os.path.exists(pattern):
+            paths.append(pattern)
+        else:
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+    return paths
+
+
+''' \/ Worker process \/ '''
+
+# Run options, set once per worker by init_worker()
+_options = {}
+# Path -> (file size, modification time, Program) parsed in this worker
+_programs = {}
+
+
+def init_worker(options):
+    _options.update(options)
+    # Scripts calling input() get end of file rather than blocking on a terminal nobody is watching
+    sys.stdin = io.StringIO("")
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, raise_timeout)
+
+
+def raise_timeout(signum, frame):
+    raise ScriptTimeout()
+
+
+# Parsed Program for the file, reused while the file is unchanged
+def load_program(path):
+    stat = os.stat(path)
+    cached = _programs.get(path)
+    if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+    cache = ProgramCache() if _options.get("cache") else None
+    program = Program.from_file(path, resolve=_options.get("resolve", False), optimise=_options.get("optimise", False),
+                                fast_scan=_options.get("fast_scan", False), cache=cache,
+                                memoise=_options.get("memoise", True))
+    _programs[path] = (stat.st_size, stat.st_mtime_ns, program)
+    return program
+
+
+# Run one script in this worker, returns its result record
+def run_script(path):
+    timeout = _options.get("timeout")
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    status = "ok"
+    exit_code = 0
+    error = None
+    start = time.perf_counter()
+    if timeout and hasattr(signal, "setitimer"):
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                program = load_program(path)
+                interpreter = program.run(backend=_options.get("backend", "tree"))
+                if interpreter.hadRuntimeError:
+                    status, exit_code = "runtime error", 70
+            except Parser.ParseError as e:
+                status, exit_code, error = "parse error", 65, str(e)
+            except RuntimeError as e:
+                # Scanner errors - runtime errors are handled inside interpret()
+                status, exit_code, error = "token error", 65, str(e)
+            finally:
+                if timeout and hasattr(signal, "setitimer"):
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+    except ScriptTimeout:
+        status, exit_code, error = "timeout", None, f"Exceeded {timeout} seconds"
+    except Exception as e:
+        status, exit_code = "crashed", 1
+        error = "".join(traceback.format_exception_only(type(e), e)).strip()
+    return {
+        "path": path,
+        "status": status,
+        "exit_code": exit_code,
+        "time": time.perf_counter() - start,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "error": error,
+        "worker": os.getpid(),
+    }
+
+
+''' \/ Parent process \/ '''
+
+
+# One worker per core this process may run on - fewer than os.cpu_count() inside a restricted container
+def default_workers():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# Run every script on a process pool, returns the summary
+# workers - number of worker processes, defaults to one per core
+# timeout - seconds each script may run for, None for no limit
+# Remaining options are those of StarlingScript.run_file: backend, resolve, optimise, fast_scan, cache, memoise
+def run_batch(paths, workers=None, timeout=None, backend="tree", resolve=False, optimise=False, fast_scan=False,
+              cache=False, memoise=True):
+    options = {"timeout": timeout, "backend": backend, "resolve": resolve, "optimise": optimise,
+               "fast_scan": fast_scan, "cache": cache, "memoise": memoise}
+    workers = workers or default_workers()
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(options,)) as pool:
+        results = list(pool.map(run_script, paths))
+    wall_time = time.perf_counter() - start
+
+    statuses = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    return {
+        "wall_time": wall_time,
+        "script_time": sum(result["time"] for result in results),
+        "workers": workers,
+        "scripts": len(results),
+        "statuses": statuses,
+        "options": options,
+        "results": results,
+    }
+
+
+# Write the summary as JSON to a file, or stdout when path is None or "-"
+def write_summary(summary, path=None):
+    text = json.dumps(summary, indent=2)
+    if path is None or path == "-":
+        print(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text + "\n")
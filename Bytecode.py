@@ -0,0 +1,143 @@
+# Bytecode.py
+# Instruction set and code objects shared by Compiler.py and VM.py
+from array import array
+from bisect import bisect_right
+from enum import IntEnum
+
+'''
+Compact bytecode representation
+Code is stored as 32-bit words in an array - the opcode followed by its operands, each one word.
+Values used by the code (numbers, strings, name tokens, functions) live in the constant pool
+and are referred to by index. The line table maps instruction offsets back to source lines.
+'''
+
+class OpCode(IntEnum):
+    CONSTANT = 0                    # index          push constants[index]
+    NIL = 1                         #                push nil
+    TRUE = 2                        #                push true
+    FALSE = 3                       #                push false
+    POP = 4                         #                discard top of stack
+    GET_VAR = 5                     # name           push value of variable looked up by name
+    SET_VAR = 6                     # name           assign top of stack to variable, leaves value
+    DEFINE = 7                      # name           pop value and define it in the current scope
+    GET_LOCAL = 8                   # depth, slot    push value of resolved local variable
+    SET_LOCAL = 9                   # depth, slot    assign top of stack to resolved local, leaves value
+    ADD = 10
+    SUBTRACT = 11
+    MULTIPLY = 12
+    DIVIDE = 13
+    POWER = 14
+    GREATER = 15
+    GREATER_EQUAL = 16
+    LESS = 17
+    LESS_EQUAL = 18
+    EQUAL = 19
+    NOT_EQUAL = 20
+    NOT = 21
+    NEGATE = 22
+    PRINT = 23                      #                pop and print value
+    JUMP = 24                       # target         continue at target
+    POP_JUMP_IF_FALSE = 25          # target         pop, jump if falsey
+    JUMP_IF_FALSE_OR_POP = 26       # target         jump leaving value if falsey, otherwise pop - 'and'
+    JUMP_IF_TRUE_OR_POP = 27        # target         jump leaving value if truthy, otherwise pop - 'or'
+    PUSH_SCOPE = 28                 #                enter a new block environment
+    POP_SCOPE = 29                  #                leave the current block environment
+    CLOSURE = 30                    # index          push a function for the prototype at constants[index]
+    CALL = 31                       # count          call the callee below 'count' arguments
+    RETURN = 32                     #                pop value and return it to the caller
+    HALT = 33                       #                end of the top-level script
+    TAIL_CALL = 34                  # count          'return f(...)' - call reusing the current frame
+    GET_CELL = 35                   # depth, slot    push value of the Cell in a resolved local, see Environment.Cell
+    SET_CELL = 36                   # depth, slot    assign top of stack to the Cell in a resolved local, leaves value
+    CELL = 37                       #                replace top of stack with a Cell holding it
+    CLOSURE_CELL = 38               # index          define the function's name as a Cell holding a new function
+
+
+class Chunk:
+    def __init__(self):
+        self.code = array('I')
+        self.constants = []
+        # Run-length line table - parallel lists of the first offset of each run and its line
+        self.line_offsets = []
+        self.line_numbers = []
+        # Dedupe literal constants - keyed with the type so 1, 1.0 and true stay separate
+        self.constant_index = {}
+
+    # Append an instruction and its operands, recording the source line it came from
+    def write(self, op, *operands, line=None):
+        if line is not None and (not self.line_numbers or self.line_numbers[-1] != line):
+            self.line_offsets.append(len(self.code))
+            self.line_numbers.append(line)
+        self.code.append(op)
+        for operand in operands:
+            self.code.append(operand)
+        return len(self.code) - 1
+
+    # Add a value to the constant pool, returns its index
+    def add_constant(self, value):
+        try:
+            key = (type(value), value)
+            if key in self.constant_index:
+                return self.constant_index[key]
+        except TypeError:
+            key = None
+        self.constants.append(value)
+        index = len(self.constants) - 1
+        if key is not None:
+            self.constant_index[key] = index
+        return index
+
+    # Source line for the instruction at offset, or None if no line was recorded before it
+    def line_at(self, offset):
+        position = bisect_right(self.line_offsets, offset) - 1
+        if position < 0:
+            return None
+        return self.line_numbers[position]
+
+    # Human-readable listing of the chunk, for debugging the compiler
+    def disassemble(self, name="<script>"):
+        lines = [f"== {name} =="]
+        offset = 0
+        while offset < len(self.code):
+            op = OpCode(self.code[offset])
+            count = OPERAND_COUNTS[op]
+            operands = list(self.code[offset + 1:offset + 1 + count])
+            text = f"{offset:04d} {str(self.line_at(offset)):>4} {op.name:<22}"
+            if op in (OpCode.CONSTANT, OpCode.GET_VAR, OpCode.SET_VAR, OpCode.DEFINE, OpCode.CLOSURE,
+                      OpCode.CLOSURE_CELL):
+                text += f" {operands[0]} ({self.constants[operands[0]]})"
+            elif operands:
+                text += " " + " ".join(str(operand) for operand in operands)
+            lines.append(text)
+            offset += 1 + count
+        for constant in self.constants:
+            if isinstance(constant, FunctionProto):
+                lines.append(constant.chunk.disassemble(str(constant)))
+        return "\n".join(lines)
+
+
+# Number of operand words following each opcode
+OPERAND_COUNTS = {op: 0 for op in OpCode}
+OPERAND_COUNTS.update({
+    OpCode.CONSTANT: 1, OpCode.GET_VAR: 1, OpCode.SET_VAR: 1, OpCode.DEFINE: 1,
+    OpCode.GET_LOCAL: 2, OpCode.SET_LOCAL: 2, OpCode.GET_CELL: 2, OpCode.SET_CELL: 2,
+    OpCode.JUMP: 1, OpCode.POP_JUMP_IF_FALSE: 1, OpCode.JUMP_IF_FALSE_OR_POP: 1, OpCode.JUMP_IF_TRUE_OR_POP: 1,
+    OpCode.CLOSURE: 1, OpCode.CLOSURE_CELL: 1, OpCode.CALL: 1, OpCode.TAIL_CALL: 1,
+})
+
+
+class FunctionProto:
+    '''
+    Compiled form of a Stmt.Function - everything except the closure environment,
+    which is only known when the CLOSURE instruction runs
+    '''
+    def __init__(self, name, params, chunk, upvalues=(), param_cells=None):
+        self.name = name  # Name token
+        self.params = params  # Parameter names
+        self.chunk = chunk
+        # From the Resolver, as on Stmt.Function - addresses of the Cells captured, and captured parameters
+        self.upvalues = upvalues
+        self.param_cells = param_cells
+
+    def __str__(self):
+        return f"<fn {self.name.lexeme}>"
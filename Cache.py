@@ -0,0 +1,127 @@
+# Cache.py
+import gc
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+
+from Dispatch import NODE_CLASSES
+
+'''
+On-disk cache of parsed programs, in the spirit of Python's __pycache__
+The Stmt list the Parser produces for a script is pickled into a __starlingcache__ folder beside it.
+The pickle repeats the same node and token layouts over and over, so it is several times the size of the
+script - entries are compressed with zlib, which makes them smaller than the script for little load time.
+Entries are keyed by a hash of the source text together with everything that decides what the parser
+builds from it - the cache VERSION, the layout of every syntax tree node class and the Python version -
+so editing the script or upgrading the interpreter simply misses instead of loading a stale tree.
+Entries are written to a temporary file and renamed into place, so a reader never sees half an entry,
+and an entry that cannot be read for any reason is deleted and treated as a miss.
+The tree is cached before the Optimiser or Resolver run, as both change it in place.
+'''
+
+# Bump whenever the parser starts producing a different tree for the same source
+VERSION = 2
+
+# zlib level entries are compressed at - most of the size saving of level 9 at a fraction of the time
+COMPRESSION_LEVEL = 6
+
+# Folder created next to each script, unless ProgramCache is given a directory
+CACHE_DIRECTORY = "__starlingcache__"
+
+
+# Class names and slots of every node class - changing a node class changes every key
+def node_layout():
+    return repr([(node_class.__qualname__, node_class.__slots__) for node_class, suffix in NODE_CLASSES])
+
+
+KEY_PREFIX = f"{VERSION}\n{node_layout()}\n{sys.version_info[:2]}\n".encode()
+
+
+class ProgramCache:
+    # directory - where to keep every entry, None for a __starlingcache__ folder beside each script
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source):
+        return hashlib.sha256(KEY_PREFIX + source.encode()).hexdigest()
+
+    # Entries are named after the script so each script keeps at most one
+    def entry_path(self, path, key):
+        directory = self.directory
+        if directory is None:
+            directory = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRECTORY)
+        return os.path.join(directory, f"{os.path.basename(path)}.{key[:32]}.pickle")
+
+    # Returns the cached Stmt list for this exact source, or None on a miss
+    def load(self, path, source):
+        key = self.key(source)
+        entry = self.entry_path(path, key)
+        # Syntax trees hold no reference cycles - as in Scanner.scan_tokens_fast(), the cyclic garbage collector
+        # is paused rather than left to re-scan the hundreds of thousands of nodes being recreated
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(entry, "rb") as f:
+                cached_key, statements = pickle.loads(zlib.decompress(f.read()))
+            if cached_key != key or not isinstance(statements, list):
+                raise ValueError(f"Cache entry {entry} does not match its name")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # Corrupt, truncated or from an incompatible build - remove it so it is rewritten
+            self.misses += 1
+            self.remove(entry)
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self.hits += 1
+        return statements
+
+    # Save the Stmt list for this source, replacing any older entry for the same script
+    # Returns False if the entry could not be written, e.g. the folder is read-only - the cache is only ever an aid
+    def store(self, path, source, statements):
+        key = self.key(source)
+        entry = self.entry_path(path, key)
+        directory = os.path.dirname(entry)
+        temporary = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            data = zlib.compress(pickle.dumps((key, statements), protocol=pickle.HIGHEST_PROTOCOL),
+                                 COMPRESSION_LEVEL)
+            descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=os.path.basename(entry), suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(data)
+            # Atomic - readers see either the old entry or the complete new one
+            os.replace(temporary, entry)
+            temporary = None
+        except (OSError, pickle.PicklingError, RecursionError):
+            return False
+        finally:
+            if temporary is not None:
+                self.remove(temporary)
+        self.remove_stale(entry)
+        return True
+
+    # Entries left behind by earlier versions of the same script - same name, different key
+    def remove_stale(self, entry):
+        directory, name = os.path.split(entry)
+        script = name[:-len(".pickle") - 32]
+        for other in os.listdir(directory):
+            if other != name and len(other) == len(name) and other.startswith(script) and other.endswith(".pickle"):
+                self.remove(os.path.join(directory, other))
+
+    def remove(self, entry):
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+    def stats(self):
+        return f"{self.hits} hit(s), {self.misses} miss(es)"
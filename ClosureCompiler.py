@@ -0,0 +1,524 @@
+# ClosureCompiler.py
+from TokenType import TokenType
+from Expr import Expr
+from Environment import Environment, SlotEnvironment, Cell, capture
+from Callable import Callable
+from Natives import VARIADIC, define_natives
+from Return import TailCall
+from Rope import Rope, concat
+from Output import OutputSink
+from Dispatch import dispatch_table
+from Loops import COMPARISONS, countable
+
+'''
+Closure compilation execution engine
+Walks the Expr/Stmt tree once and turns every node into a specialised Python closure.
+Expression closures take the current environment and return a value, statement closures take
+the environment and return None, or a 1-tuple holding the value of a 'return' statement.
+Running the program is then just calling closures - no isinstance chains or operator if/elif
+chains are left on the hot path. Output matches Interpreter exactly.
+Truthiness checks are inlined as 'value is None or value is False' - the Interpreter.is_truthy rules.
+'return f(...)' returns a Return.TailCall for the calling CompiledFunction to run in place of itself,
+as in Interpreter.visitReturnStmt.
+'''
+
+
+def stringify(value):
+    if value is None:
+        return "nil"
+    return str(value)
+
+
+# PLUS - if either operand is a string, treat the operation as string concatenation
+def add(left, right):
+    if left.__class__ is str or right.__class__ is str or left.__class__ is Rope or right.__class__ is Rope:
+        return concat(left, right)
+    return left + right
+
+
+# Binary operators that map directly onto a Python operator
+BINARY_OPERATORS = {
+    TokenType.GREATER: lambda left, right: left > right,
+    TokenType.GREATER_EQUAL: lambda left, right: left >= right,
+    TokenType.LESS: lambda left, right: left < right,
+    TokenType.LESS_EQUAL: lambda left, right: left <= right,
+    TokenType.MINUS: lambda left, right: left - right,
+    TokenType.PLUS: add,
+    TokenType.SLASH: lambda left, right: left / right,
+    TokenType.STAR: lambda left, right: left * right,
+    TokenType.BANG_EQUAL: lambda left, right: left != right,
+    TokenType.EQUAL_EQUAL: lambda left, right: left == right,
+    TokenType.CARET: lambda left, right: left ** right,
+}
+
+
+class CompiledFunction(Callable):
+    '''
+    Runtime function value for the closure engine
+    Holds the compiled body instead of the Stmt.Function body, plus its closure scope (see Environment.capture).
+    '''
+    def __init__(self, declaration, body, closure, new_scope):
+        self.declaration = declaration
+        self.params = [param.lexeme for param in declaration.params]
+        self.body = body
+        self.closure = closure
+        self.new_scope = new_scope
+
+    # Tail calls to other compiled functions loop here instead of nesting Python frames
+    def call(self, interpreter, arguments):
+        function = self
+        while True:
+            environment = function.new_scope(function.closure)
+            cells = function.declaration.param_cells
+            if cells is None:
+                for name, value in zip(function.params, arguments):
+                    environment.define(name, value)
+            else:
+                for index, (name, value) in enumerate(zip(function.params, arguments)):
+                    environment.define(name, Cell(value) if index in cells else value)
+            completion = function.body(environment)
+            if completion is None:
+                return None
+            if completion.__class__ is not TailCall:
+                return completion[0]
+            function = completion.function
+            arguments = completion.arguments
+
+    def arity(self):
+        return len(self.params)
+
+    def __str__(self):
+        return f"<fn {self.declaration.name.lexeme}>"
+
+
+class ClosureCompiler:
+    # resolved - statements have been annotated by the Resolver, local scopes use SlotEnvironment
+    def __init__(self, interpreter, resolved=False):
+        # Passed on to Callable.call() when a compiled call expression invokes a function
+        self.interpreter = interpreter
+        self.resolved = resolved
+        self.new_scope = SlotEnvironment if resolved else Environment
+        self.dispatch = dispatch_table(type(self))
+
+    # Compile a list of statements into a list of statement closures
+    def compile(self, statements):
+        return [self.compile_stmt(statement) for statement in statements]
+
+    def compile_stmt(self, stmt):
+        return self.dispatch[stmt.__class__](self, stmt)
+
+    def compile_expr(self, expr):
+        return self.dispatch[expr.__class__](self, expr)
+
+    # Runs a list of statement closures in order, stopping at the first 'return'
+    def sequence(self, compiled):
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def run_sequence(env):
+            for statement in compiled:
+                completion = statement(env)
+                if completion is not None:
+                    return completion
+            return None
+        return run_sequence
+
+    ''' \/ Statements \/ '''
+
+    # Blocks that declare nothing run in the enclosing scope, as in Interpreter.visitBlockStmt
+    def visitBlockStmt(self, stmt):
+        body = self.sequence(self.compile(stmt.statements))
+        if not stmt.declares:
+            return body
+        new_scope = self.new_scope
+
+        def block(env):
+            return body(new_scope(env))
+        return block
+
+    def visitExpressionStmt(self, stmt):
+        expression = self.compile_expr(stmt.expression)
+
+        def expression_statement(env):
+            expression(env)
+        return expression_statement
+
+    def visitFunctionStmt(self, stmt):
+        name = stmt.name.lexeme
+        body = self.sequence(self.compile(stmt.body))
+        new_scope = self.new_scope
+
+        upvalues = stmt.upvalues
+        if stmt.cell:
+            # Captured by its own body - the Cell has to exist before the function captures it
+            def captured_function(env):
+                cell = Cell(None)
+                env.define(name, cell)
+                cell.value = CompiledFunction(stmt, body, capture(env, upvalues), new_scope)
+            return captured_function
+
+        def function(env):
+            env.define(name, CompiledFunction(stmt, body, capture(env, upvalues), new_scope))
+        return function
+
+    def visitIfStmt(self, stmt):
+        condition = self.compile_expr(stmt.condition)
+        then_branch = self.compile_stmt(stmt.thenBranch)
+        if stmt.elseBranch is None:
+            def if_statement(env):
+                value = condition(env)
+                if not (value is None or value is False):
+                    return then_branch(env)
+            return if_statement
+
+        else_branch = self.compile_stmt(stmt.elseBranch)
+
+        def if_else_statement(env):
+            value = condition(env)
+            if not (value is None or value is False):
+                return then_branch(env)
+            return else_branch(env)
+        return if_else_statement
+
+    def visitPrintStmt(self, stmt):
+        expression = self.compile_expr(stmt.expression)
+        write_line = self.interpreter.output.write_line
+
+        def print_statement(env):
+            write_line(stringify(expression(env)))
+        return print_statement
+
+    def visitReturnStmt(self, stmt):
+        if stmt.value is None:
+            return lambda env: (None,)
+        expr = stmt.value
+        if isinstance(expr, Expr.Call):
+            return self.compile_tail_call(expr)
+        value = self.compile_expr(expr)
+        return lambda env: (value(env),)
+
+    # 'return f(...)' - a call to another compiled function is handed back as a TailCall, anything else is called here
+    def compile_tail_call(self, expr):
+        callee = self.compile_expr(expr.callee)
+        arguments = [self.compile_expr(argument) for argument in expr.arguments]
+        interpreter = self.interpreter
+        paren = expr.paren
+        count = len(arguments)
+
+        def tail_call(env):
+            function = callee(env)
+            values = [argument(env) for argument in arguments]
+
+            try:
+                arity = function.arity()
+            except AttributeError:
+                raise RuntimeError(paren, f"Can only call functions and classes. Line: {paren.line}")
+            if arity != count and arity != VARIADIC:
+                raise RuntimeError(paren, f"Expected {arity} arguments but got {count}. Line: {paren.line}")
+            if function.__class__ is CompiledFunction:
+                return TailCall(function, values)
+            return (function.call(interpreter, values),)
+        return tail_call
+
+    def visitVarStmt(self, stmt):
+        name = stmt.name.lexeme
+        if not stmt.initialiser:
+            if stmt.cell:
+                return lambda env: env.define(name, Cell(None))
+
+            def declare(env):
+                env.define(name, None)
+            return declare
+
+        initialiser = self.compile_expr(stmt.initialiser)
+        if stmt.cell:
+            return lambda env: env.define(name, Cell(initialiser(env)))
+
+        def declare_initialised(env):
+            env.define(name, initialiser(env))
+        return declare_initialised
+
+    def visitWhileStmt(self, stmt):
+        condition = self.compile_expr(stmt.condition)
+        body = self.compile_stmt(stmt.body)
+        if stmt.counted is not None:
+            return self.compile_counted(stmt.counted, condition, body)
+
+        def while_statement(env):
+            while True:
+                value = condition(env)
+                if value is None or value is False:
+                    return None
+                completion = body(env)
+                if completion is not None:
+                    return completion
+        return while_statement
+
+    # Counted loop, as Interpreter.execute_counted runs it - falls back to the plain while loop
+    # when the counter or limit is not a number
+    def compile_counted(self, counted, condition, body):
+        counter = self.compile_expr(counted.counter)
+        limit_value = self.compile_expr(counted.limit)
+        counted_body = self.compile_stmt(counted.body)
+        compare = COMPARISONS[counted.comparison]
+        step = counted.step
+
+        def counted_statement(env):
+            start = counter(env)
+            limit = limit_value(env)
+            if not countable(start, limit):
+                while True:
+                    value = condition(env)
+                    if value is None or value is False:
+                        return None
+                    completion = body(env)
+                    if completion is not None:
+                        return completion
+            values, key = counted.store(env)
+            numbers = counted.values(start, limit)
+            if numbers is not None:
+                for number in numbers:
+                    values[key] = number
+                    completion = counted_body(env)
+                    if completion is not None:
+                        return completion
+                values[key] = counted.final(start, numbers)
+                return None
+            number = start
+            while compare(number, limit):
+                values[key] = number
+                completion = counted_body(env)
+                if completion is not None:
+                    return completion
+                number = number + step
+            values[key] = number
+            return None
+        return counted_statement
+
+    ''' \/ Expressions \/ '''
+
+    def visitAssignExpr(self, expr):
+        value = self.compile_expr(expr.value)
+        if expr.depth is not None:
+            depth, slot = expr.depth, expr.slot
+            if expr.cell:
+                def assign_cell(env):
+                    result = value(env)
+                    env.get_at(depth, slot).value = result
+                    return result
+                return assign_cell
+
+            def assign_local(env):
+                result = value(env)
+                env.assign_at(depth, slot, result)
+                return result
+            return assign_local
+
+        name = expr.name.name
+        if self.resolved:
+            def assign_global(env):
+                result = value(env)
+                env.assign(name, result)
+                return result
+            return assign_global
+        lexeme = name.lexeme
+
+        # Same walk as Environment.assign, without the recursive method calls
+        def assign(env):
+            result = value(env)
+            environment = env
+            while environment is not None:
+                if lexeme in environment.values:
+                    environment.values[lexeme] = result
+                    return result
+                environment = environment.enclosing
+            raise RuntimeError(name, f"Undefined variable '{lexeme}'.")
+        return assign
+
+    def visitBinaryExpr(self, expr):
+        operator = BINARY_OPERATORS.get(expr.operator.type)
+        if operator is None:
+            left = self.compile_expr(expr.left)
+            right = self.compile_expr(expr.right)
+
+            # Unexpected operator found
+            def unexpected(env):
+                left(env)
+                right(env)
+                self.interpreter.output.write_line(f"Unexpected operator {expr}")
+            return unexpected
+
+        # Both operands constant - fold into a single constant closure
+        if isinstance(expr.left, Expr.Literal) and isinstance(expr.right, Expr.Literal):
+            try:
+                value = operator(expr.left.value, expr.right.value)
+            except Exception:
+                pass
+            else:
+                return lambda env: value
+
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        operator_type = expr.operator.type
+
+        # Specialise the common arithmetic and comparison operators so each is a single closure call
+        if operator_type == TokenType.PLUS:
+            if isinstance(expr.right, Expr.Literal):
+                constant = expr.right.value
+                if isinstance(constant, str):
+                    return lambda env: concat(left(env), constant)
+                return lambda env: add(left(env), constant)
+            return lambda env: add(left(env), right(env))
+        if operator_type == TokenType.MINUS:
+            if isinstance(expr.right, Expr.Literal):
+                constant = expr.right.value
+                return lambda env: left(env) - constant
+            return lambda env: left(env) - right(env)
+        if operator_type == TokenType.LESS:
+            if isinstance(expr.right, Expr.Literal):
+                constant = expr.right.value
+                return lambda env: left(env) < constant
+            return lambda env: left(env) < right(env)
+        if operator_type == TokenType.LESS_EQUAL:
+            if isinstance(expr.right, Expr.Literal):
+                constant = expr.right.value
+                return lambda env: left(env) <= constant
+            return lambda env: left(env) <= right(env)
+        if operator_type == TokenType.GREATER:
+            return lambda env: left(env) > right(env)
+        if operator_type == TokenType.GREATER_EQUAL:
+            return lambda env: left(env) >= right(env)
+        if operator_type == TokenType.EQUAL_EQUAL:
+            return lambda env: left(env) == right(env)
+        if operator_type == TokenType.BANG_EQUAL:
+            return lambda env: left(env) != right(env)
+        if operator_type == TokenType.STAR:
+            return lambda env: left(env) * right(env)
+        if operator_type == TokenType.SLASH:
+            return lambda env: left(env) / right(env)
+        return lambda env: operator(left(env), right(env))
+
+    # Builtins such as input() are NativeFunctions in the global scope, called like any other function
+    def visitCallExpr(self, expr):
+        callee = self.compile_expr(expr.callee)
+        arguments = [self.compile_expr(argument) for argument in expr.arguments]
+        interpreter = self.interpreter
+        paren = expr.paren
+        count = len(arguments)
+
+        def call(env):
+            function = callee(env)
+            values = [argument(env) for argument in arguments]
+
+            # Values that cannot be called have no arity() - the one check Interpreter.call_arguments makes
+            try:
+                arity = function.arity()
+            except AttributeError:
+                raise RuntimeError(paren, f"Can only call functions and classes. Line: {paren.line}")
+            if arity != count and arity != VARIADIC:
+                raise RuntimeError(paren, f"Expected {arity} arguments but got {count}. Line: {paren.line}")
+            return function.call(interpreter, values)
+        return call
+
+    # Grouping only affects parsing - compile straight to the inner expression
+    def visitGroupingExpr(self, expr):
+        return self.compile_expr(expr.expression)
+
+    def visitLiteralExpr(self, expr):
+        value = expr.value
+        return lambda env: value
+
+    def visitLogicalExpr(self, expr):
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        if expr.operator.type == TokenType.OR or expr.operator.type == TokenType.PIPE:
+            def logical_or(env):
+                value = left(env)
+                if not (value is None or value is False):
+                    return value
+                return right(env)
+            return logical_or
+
+        def logical_and(env):
+            value = left(env)
+            if value is None or value is False:
+                return value
+            return right(env)
+        return logical_and
+
+    def visitUnaryExpr(self, expr):
+        right = self.compile_expr(expr.right)
+        if expr.operator.type == TokenType.BANG:
+            def logical_not(env):
+                value = right(env)
+                return value is None or value is False
+            return logical_not
+        elif expr.operator.type == TokenType.MINUS:
+            return lambda env: -right(env)
+
+        def unknown(env):
+            right(env)
+        return unknown
+
+    def visitVariableExpr(self, expr):
+        if expr.depth is not None:
+            depth, slot = expr.depth, expr.slot
+            if expr.cell:
+                return lambda env: env.get_at(depth, slot).value
+            if depth == 0:
+                return lambda env: env.values[slot]
+            return lambda env: env.get_at(depth, slot)
+
+        name = expr.name
+        if self.resolved:
+            return lambda env: env.get(name)
+        lexeme = name.lexeme
+
+        # Same walk as Environment.get, without the recursive method calls
+        def variable(env):
+            while env is not None:
+                values = env.values
+                if lexeme in values:
+                    return values[lexeme]
+                env = env.enclosing
+            raise RuntimeError(name, f"Undefined variable '{lexeme}' on line {name.line}")
+        return variable
+
+
+class ClosureInterpreter:
+    '''
+    Drop-in alternative to Interpreter that compiles the statements to closures before running them
+    '''
+    # output - OutputSink the print statement writes to, as in Interpreter
+    def __init__(self, resolved=False, output=None):
+        # Per-instance global scope, as in Interpreter
+        self.globals = Environment(enclosing=None)
+        define_natives(self.globals)
+        self.environment = self.globals
+        # Set once a runtime error has stopped a script, like StarlingScript.hadError for parse errors
+        self.hadRuntimeError = False
+        self.output = output if output is not None else OutputSink()
+        self.compiler = ClosureCompiler(self, resolved=resolved)
+
+    # Each top-level statement is compiled just before it runs, so statements can come from an iterator
+    def interpret(self, statements):
+        try:
+            for statement in statements:
+                compiled = self.compiler.compile_stmt(statement)
+                try:
+                    # A 'return' at the top level ends the program, as it does in Interpreter
+                    completion = compiled(self.environment)
+                    if completion is not None:
+                        if completion.__class__ is TailCall:
+                            completion.function.call(self, completion.arguments)
+                        break
+                except RecursionError:
+                    self.hadRuntimeError = True
+                    self.output.write_line(f"\033[91mError: Stack overflow - recursion too deep for the closure backend\033[0m")
+                    break
+                except RuntimeError as error:
+                    self.hadRuntimeError = True
+                    self.output.write_line(f"\033[91mError: {error.args[1]}\033[0m")
+                    break
+        finally:
+            self.output.flush()
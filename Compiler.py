@@ -0,0 +1,221 @@
+# Compiler.py
+from TokenType import TokenType
+from Expr import Expr
+from Bytecode import OpCode, Chunk, FunctionProto
+from Dispatch import dispatch_table
+
+'''
+Bytecode compiler - translates the Stmt/Expr syntax tree into Chunks of bytecode for the VM
+Single pass over the tree: each statement and expression emits the instructions that leave
+its result on the VM stack. Every function declaration compiles into its own Chunk, held in
+a FunctionProto in the constant pool of the enclosing chunk.
+'''
+
+# Binary operator tokens and the instruction implementing each
+BINARY_OPCODES = {
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.CARET: OpCode.POWER,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+}
+
+
+class Compiler:
+    def __init__(self):
+        # Chunk currently being written - swapped out while compiling a function body
+        self.chunk = None
+        # Line of the innermost token seen, tagged onto emitted instructions for the line table
+        self.line = None
+        # Number of function bodies being compiled - 'return f(...)' is only a tail call inside one
+        self.function_depth = 0
+        self.dispatch = dispatch_table(type(self))
+
+    # Compile a whole program, returns the FunctionProto for the top-level script
+    def compile(self, statements):
+        self.chunk = Chunk()
+        for statement in statements:
+            self.compile_stmt(statement)
+        self.emit(OpCode.HALT)
+        return FunctionProto(None, [], self.chunk)
+
+    def compile_stmt(self, stmt):
+        self.dispatch[stmt.__class__](self, stmt)
+
+    def compile_expr(self, expr):
+        return self.dispatch[expr.__class__](self, expr)
+
+    def emit(self, op, *operands):
+        return self.chunk.write(op, *operands, line=self.line)
+
+    # Emit a jump with a placeholder target, returns the offset of the operand to patch
+    def emit_jump(self, op):
+        return self.emit(op, 0)
+
+    # Point a previously emitted jump at the next instruction
+    def patch_jump(self, operand_offset):
+        self.chunk.code[operand_offset] = len(self.chunk.code)
+
+    def constant(self, value):
+        return self.chunk.add_constant(value)
+
+    ''' \/ Statements \/ '''
+
+    # Blocks that declare nothing run in the enclosing scope, as in Interpreter.visitBlockStmt
+    def visitBlockStmt(self, stmt):
+        if not stmt.declares:
+            for statement in stmt.statements:
+                self.compile_stmt(statement)
+            return
+        self.emit(OpCode.PUSH_SCOPE)
+        for statement in stmt.statements:
+            self.compile_stmt(statement)
+        self.emit(OpCode.POP_SCOPE)
+
+    def visitExpressionStmt(self, stmt):
+        self.compile_expr(stmt.expression)
+        self.emit(OpCode.POP)
+
+    # Function body goes into its own chunk, the enclosing chunk creates the function and defines its name
+    def visitFunctionStmt(self, stmt):
+        self.line = stmt.name.line
+        enclosing = self.chunk
+        self.chunk = Chunk()
+        self.function_depth += 1
+        for statement in stmt.body:
+            self.compile_stmt(statement)
+        self.function_depth -= 1
+        # Falling off the end of a function returns nil
+        self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+        proto = FunctionProto(stmt.name, [param.lexeme for param in stmt.params], self.chunk,
+                              stmt.upvalues, stmt.param_cells)
+        self.chunk = enclosing
+
+        self.line = stmt.name.line
+        if stmt.cell:
+            self.emit(OpCode.CLOSURE_CELL, self.constant(proto))
+            return
+        self.emit(OpCode.CLOSURE, self.constant(proto))
+        self.emit(OpCode.DEFINE, self.constant(stmt.name.lexeme))
+
+    def visitIfStmt(self, stmt):
+        self.compile_expr(stmt.condition)
+        else_jump = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self.compile_stmt(stmt.thenBranch)
+        if stmt.elseBranch is None:
+            self.patch_jump(else_jump)
+            return
+        end_jump = self.emit_jump(OpCode.JUMP)
+        self.patch_jump(else_jump)
+        self.compile_stmt(stmt.elseBranch)
+        self.patch_jump(end_jump)
+
+    def visitPrintStmt(self, stmt):
+        self.compile_expr(stmt.expression)
+        self.emit(OpCode.PRINT)
+
+    # A call in tail position inside a function becomes TAIL_CALL, which returns the callee's result itself
+    def visitReturnStmt(self, stmt):
+        self.line = stmt.keyword.line
+        expr = stmt.value
+        if expr is None:
+            self.emit(OpCode.NIL)
+        elif self.function_depth and isinstance(expr, Expr.Call):
+            self.compile_expr(expr.callee)
+            for argument in expr.arguments:
+                self.compile_expr(argument)
+            self.line = expr.paren.line
+            self.emit(OpCode.TAIL_CALL, len(expr.arguments))
+            return
+        else:
+            self.compile_expr(expr)
+        self.emit(OpCode.RETURN)
+
+    def visitVarStmt(self, stmt):
+        self.line = stmt.name.line
+        if stmt.initialiser:
+            self.compile_expr(stmt.initialiser)
+        else:
+            self.emit(OpCode.NIL)
+        if stmt.cell:
+            self.emit(OpCode.CELL)
+        self.emit(OpCode.DEFINE, self.constant(stmt.name.lexeme))
+
+    def visitWhileStmt(self, stmt):
+        loop_start = len(self.chunk.code)
+        self.compile_expr(stmt.condition)
+        exit_jump = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self.compile_stmt(stmt.body)
+        self.emit(OpCode.JUMP, loop_start)
+        self.patch_jump(exit_jump)
+
+    ''' \/ Expressions \/ '''
+
+    def visitAssignExpr(self, expr):
+        self.compile_expr(expr.value)
+        name = expr.name.name
+        self.line = name.line
+        if expr.depth is not None:
+            self.emit(OpCode.SET_CELL if expr.cell else OpCode.SET_LOCAL, expr.depth, expr.slot)
+        else:
+            self.emit(OpCode.SET_VAR, self.constant(name))
+
+    def visitBinaryExpr(self, expr):
+        self.compile_expr(expr.left)
+        self.compile_expr(expr.right)
+        self.line = expr.operator.line
+        self.emit(BINARY_OPCODES[expr.operator.type])
+
+    # Builtins such as input() are NativeFunctions in the global scope, so they compile to a plain CALL
+    def visitCallExpr(self, expr):
+        self.compile_expr(expr.callee)
+        for argument in expr.arguments:
+            self.compile_expr(argument)
+        self.line = expr.paren.line
+        self.emit(OpCode.CALL, len(expr.arguments))
+
+    def visitGroupingExpr(self, expr):
+        self.compile_expr(expr.expression)
+
+    def visitLiteralExpr(self, expr):
+        if expr.value is None:
+            self.emit(OpCode.NIL)
+        elif expr.value is True:
+            self.emit(OpCode.TRUE)
+        elif expr.value is False:
+            self.emit(OpCode.FALSE)
+        else:
+            self.emit(OpCode.CONSTANT, self.constant(expr.value))
+
+    # Short-circuit - the left value stays on the stack as the result when it decides the outcome
+    def visitLogicalExpr(self, expr):
+        self.compile_expr(expr.left)
+        self.line = expr.operator.line
+        if expr.operator.type == TokenType.OR or expr.operator.type == TokenType.PIPE:
+            end_jump = self.emit_jump(OpCode.JUMP_IF_TRUE_OR_POP)
+        else:
+            end_jump = self.emit_jump(OpCode.JUMP_IF_FALSE_OR_POP)
+        self.compile_expr(expr.right)
+        self.patch_jump(end_jump)
+
+    def visitUnaryExpr(self, expr):
+        self.compile_expr(expr.right)
+        self.line = expr.operator.line
+        if expr.operator.type == TokenType.BANG:
+            self.emit(OpCode.NOT)
+        else:
+            self.emit(OpCode.NEGATE)
+
+    def visitVariableExpr(self, expr):
+        self.line = expr.name.line
+        if expr.depth is not None:
+            self.emit(OpCode.GET_CELL if expr.cell else OpCode.GET_LOCAL, expr.depth, expr.slot)
+        else:
+            self.emit(OpCode.GET_VAR, self.constant(expr.name))
@@ -0,0 +1,440 @@
+# Differential.py
+# Differential test harness - runs the same programs on every execution backend
+# and checks each one prints exactly what the tree-walking Interpreter prints
+# - and that the PrattParser builds the same syntax trees as the recursive descent Parser
+import contextlib
+import io
+import sys
+
+from Scanner import Scanner
+from Parser import Parser, PrattParser
+from Token import Token
+from Dispatch import NODE_CLASS_SET
+from Resolver import Resolver
+from Optimiser import Optimiser
+from Memo import PurityAnalyser
+from Loops import LoopAnalyser
+import StarlingScript
+
+# Lines fed to input() while running test_cases5.txt
+SHOPPING_INPUT = "milk\neggs\n\n"
+
+# Small programs covering the corners the test case files do not reach
+PROGRAMS = {
+    "closure counters": """
+        fun makeCounter() {
+          var i = 0;
+          fun count() { i = i + 1; return i; }
+          return count;
+        }
+        var a = makeCounter();
+        var b = makeCounter();
+        a(); a();
+        print a();
+        print b();
+    """,
+    "shared captures": """
+        var laterFunction;
+        var get;
+        var set;
+        fun pair(start) {
+          var unused = "not captured";
+          fun getter() { return start; }
+          fun setter(value) { start = value; }
+          get = getter;
+          set = setter;
+          print getter();
+          start = start + 1;
+        }
+        pair(10);
+        print get();
+        set(42);
+        print get();
+        fun outer(a) {
+          var b = a * 2;
+          fun middle() {
+            var c = b + 1;
+            fun inner() { b = b + c; return a + b + c; }
+            return inner;
+          }
+          var f = middle();
+          print f();
+          print b;
+          return f;
+        }
+        var g = outer(1);
+        print g();
+        {
+          var n = 3;
+          fun countdown(k) { if (k <= 0) return "done"; return countdown(k - n + 2); }
+          print countdown(5);
+          fun later() { return declaredAfter; }
+          var declaredAfter = "local";
+          laterFunction = later;
+        }
+        var declaredAfter = "global";
+        print laterFunction();
+        var fns = nil;
+        for (var i = 0; i < 3; i = i + 1) {
+          var j = i * 10;
+          fun show() { return i + j; }
+          if (i == 1) fns = show;
+        }
+        print fns();
+    """,
+    "return from nested loops": """
+        fun find(limit) {
+          var i = 0;
+          while (true) {
+            {
+              var j = i * i;
+              if (j > limit) return i;
+            }
+            i = i + 1;
+          }
+        }
+        print find(50);
+        fun nothing() { return; }
+        print nothing();
+        fun fallOff() { var x = 1; }
+        print fallOff();
+    """,
+    "short-circuit values": """
+        print nil or "default";
+        print 0 or "zero is truthy";
+        print false and undefinedName;
+        print true & "amp";
+        print false | nil;
+        var calls = 0;
+        fun touch() { calls = calls + 1; return true; }
+        print true or touch();
+        print false and touch();
+        print calls;
+    """,
+    "arithmetic and strings": """
+        print 2 ^ 10;
+        print 2 ^ 3 ^ 2;
+        print -2 ^ 2;
+        print 7 / 2;
+        print "n=" + 1 + 2;
+        print 1 + 2 + "=n";
+        print 1.5 + 1;
+        print !nil;
+        print "a" == "a";
+        print 1 == 1.0;
+    """,
+    "mutual recursion": """
+        fun isEven(n) { if (n == 0) return true; return isOdd(n - 1); }
+        fun isOdd(n) { if (n == 0) return false; return isEven(n - 1); }
+        print isEven(100);
+        print isOdd(51);
+    """,
+    "shadowing and for loops": """
+        var total = 0;
+        for (var i = 0; i < 5; i = i + 1) {
+          var i2 = i * 2;
+          total = total + i2;
+        }
+        print total;
+        var x = "outer";
+        {
+          var x = x + " inner";
+          print x;
+        }
+        print x;
+        for (;false;) print "never";
+    """,
+    "top-level return": """
+        print "first";
+        { return "done"; }
+        print "unreachable";
+    """,
+    "constant folding": """
+        print (10 * 2) / 6;
+        print "foo" + "bar" + 1 + 2;
+        print 1 + 2 + "baz";
+        print !false and !!nil;
+        print 2 ^ 3 ^ 2 - -1;
+        print nil or false;
+        print 0 and "zero";
+        var x = 5;
+        print false or x;
+        print true and x * (2 + 3);
+        if (1 > 2) print "no"; else if (true) print "yes";
+        if (nil) print "never";
+        while (false & x) print "never";
+        var n = 0;
+        while (!false) { n = n + 1; if (n == 3) return n; }
+    """,
+    "unfoldable errors": """
+        fun never() { print -"text"; print 1 / 0; }
+        print "fine";
+        print "n" * 3;
+        print 1 / 0;
+    """,
+    "memoisation": """
+        fun fib(n) { if (n <= 1) return n; return fib(n - 2) + fib(n - 1); }
+        print fib(25);
+        fun same(x) { return x; }
+        print same(1); print same(1.0); print same(true); print same(1);
+        var offset = 1;
+        fun shifted(x) { return x + offset; }
+        print shifted(1);
+        offset = 10;
+        print shifted(1);
+        fun one() { return 1; }
+        fun viaOne() { return one(); }
+        print viaOne();
+        one = shifted;
+        print viaOne();
+        fun shout(x) { print x; return x; }
+        shout("twice"); shout("twice");
+        fun divide(x) { return 1 / x; }
+        print divide(2);
+        print divide("oops");
+    """,
+    "tail calls": """
+        fun loop(n, acc) { if (n == 0) return acc; return loop(n - 1, acc + 1); }
+        print loop(20000, 0);
+        fun isEven(n) { if (n == 0) return true; return isOdd(n - 1); }
+        fun isOdd(n) { if (n == 0) return false; return isEven(n - 1); }
+        print isEven(20001);
+        fun inBlock(n) { { var m = n; if (m > 0) return loop(m, 0); } return "none"; }
+        print inBlock(5);
+        print inBlock(0);
+        fun twice(f, x) { return f(f(x)); }
+        fun inc(x) { return x + 1; }
+        print twice(inc, 1);
+        fun wrong() { return inc(1, 2); }
+        print "before";
+        return loop(3, 0);
+        print "unreachable";
+    """,
+    "natives": """
+        print len("hello");
+        print str(12) + str(nil) + str(1.5);
+        print num("42") + num(" 2.5 ") + num(7);
+        print abs(-3) + floor(2.7) + ceil(2.1);
+        print sqrt(16);
+        print min(3, 4) + max(3, 4);
+        print clock() >= 0;
+        print len;
+        fun hyp(a, b) { return sqrt(a * a + b * b); }
+        print hyp(3, 4);
+        fun makeAdder() { fun add(x) { return x + 1; } return add; }
+        print makeAdder()(1);
+        fun len(x) { return "shadowed"; }
+        print len("abc");
+        print num("abc");
+    """,
+    "call errors": """
+        fun two(a, b) { return a + b; }
+        print "before";
+        print two(1);
+    """,
+    "calling a non-function": """
+        var notFunction = "text";
+        print "before";
+        notFunction();
+    """,
+    "counted loops": """
+        var total = 0;
+        for (var i = 0; i < 10; i = i + 1) total = total + i;
+        print total;
+        for (var i = 1; i <= 10; i = i + 3) print i;
+        for (var i = 10; i >= 0; i = i - 4) print i;
+        for (var i = 5; i > 5; i = i - 1) print "never";
+        for (var i = 0; i > 5; i = i + 1) print "never";
+        var count = 0;
+        for (var x = 0; x < 1; x = x + 0.1) count = count + 1;
+        print count;
+        var get;
+        for (var i = 0; i < 3; i = i + 1) { fun g() { return i; } get = g; }
+        print get();
+        fun first(limit) {
+          for (var i = 0; i < 100; i = i + 1) {
+            if (i * i > limit) return i;
+          }
+          return -1;
+        }
+        print first(50);
+        var n = 4;
+        for (var i = 0; i < n; i = i + 1) {
+          for (var j = 0; j < i; j = j + 1) total = total + j;
+        }
+        print total;
+        var m = 3;
+        for (var i = 0; i < m; i = i + 1) { m = m - 1; print i; }
+        for (var i = 0; i < 10; i = i + 1) { i = i + 2; print i; }
+        for (var b = true; b < 3; b = b + 1) print b;
+        for (var s = "a"; s < 3; s = s + 1) print s;
+    """,
+    "declared after use": """
+        var a = "global";
+        {
+          fun f() { return a; }
+          var a = "local";
+          print f();
+        }
+        {
+          fun g() { return b; }
+          var b = 1;
+          print g();
+        }
+    """,
+    "limit assigned later": """
+        var n = 3;
+        fun f() {
+          for (var i = 0; i < n; i = i + 1) { g(); print i; }
+        }
+        fun g() { n = 0; }
+        f();
+        var k = 2;
+        for (var i = 0; i < k; i = i + 1) print i;
+    """,
+    "long strings": """
+        var chunk = "0123456789";
+        var s = "";
+        for (var i = 0; i < 300; i = i + 1) s = s + chunk;
+        print len(s);
+        var a = s + "a";
+        var b = s + "b";
+        print len(a) + len(b);
+        print a == b;
+        print a != s + "a";
+        print a == s + "a";
+        print (s + "") == s;
+        var front = "start:" + s;
+        print len(front);
+        var twice = s + s;
+        print len(twice);
+        print twice == s + s;
+        print s < a;
+        print s + 1 + nil + true;
+        fun size(text) { return len(text); }
+        print size(s) + size(s);
+        var line = "";
+        for (var i = 0; i < 120; i = i + 1) line = line + i + ",";
+        print line;
+        print str(line) == line;
+    """,
+    "runtime error": """
+        print "before";
+        print missing;
+        print "after";
+    """,
+}
+
+
+# Run a program on one backend, returns everything it printed plus any exception that escaped
+# pipeline - pull the statements through the resolver and LoopAnalyser one at a time, as run(pipeline=True) does
+def run_program(source, backend, resolve, stdin_text="", optimise=False, memoise=False, counted=False,
+                pipeline=False):
+    parser = Parser(Scanner(source).scan_tokens())
+    if pipeline:
+        statements = parser.declarations()
+        if resolve:
+            statements = Resolver().resolve_each(statements)
+        if counted:
+            statements = LoopAnalyser().analyse_each(statements)
+    else:
+        statements = parser.parse()
+        if optimise:
+            statements = Optimiser().optimise(statements)
+        if resolve:
+            Resolver().resolve(statements)
+        if counted:
+            LoopAnalyser().analyse(statements)
+        if memoise:
+            PurityAnalyser().analyse(statements)
+    # Every backend instance has its own globals, so programs cannot see each other's variables
+    interpreter = StarlingScript.BACKENDS[backend](resolved=resolve)
+
+    output = io.StringIO()
+    stdin = sys.stdin
+    sys.stdin = io.StringIO(stdin_text)
+    try:
+        with contextlib.redirect_stdout(output):
+            try:
+                interpreter.interpret(statements)
+            except Exception as error:
+                print(f"<escaped {type(error).__name__}: {error}>")
+    finally:
+        sys.stdin = stdin
+    return output.getvalue()
+
+
+# Nested tuples describing a syntax tree - every node's class and slots, and every token in it
+def tree(node):
+    if node.__class__ in NODE_CLASS_SET:
+        return (node.__class__.__name__,) + tuple(tree(getattr(node, name, None)) for name in node.__slots__)
+    if isinstance(node, (list, tuple)):
+        return tuple(tree(item) for item in node)
+    if isinstance(node, Token):
+        return (node.type, node.lexeme, node.literal, node.line)
+    return node
+
+
+# Parse a program with both parsers, returns True if the trees are identical
+def same_parse(source):
+    tokens = Scanner(source).scan_tokens()
+    return tree(Parser(tokens).parse()) == tree(PrattParser(tokens).parse())
+
+
+def load_programs():
+    programs = []
+    for number in range(1, 6):
+        file_name = f"test_cases{number}.txt"
+        with open(file_name, "r") as f:
+            programs.append((file_name, f.read(), SHOPPING_INPUT if number == 5 else ""))
+    for name, source in PROGRAMS.items():
+        programs.append((name, source, ""))
+    return programs
+
+
+# Compare every backend against the unoptimised, unmemoised tree-walker, with and without the resolver and Optimiser
+# Memoisation only changes the tree-walker, so it is checked there alone
+# Counted loops are checked on every backend - the vm ignores them, so it shows the annotation changes nothing else
+# - both for whole programs and for statements analysed one at a time as they are pipelined
+# Returns the number of mismatches
+def main():
+    failures = 0
+    for name, source, stdin_text in load_programs():
+        if same_parse(source):
+            print(f"ok    {name:<28} PrattParser")
+        else:
+            failures += 1
+            print(f"FAIL  {name:<28} PrattParser built a different tree")
+        for resolve in (False, True):
+            expected = run_program(source, "tree", resolve, stdin_text)
+            for backend in StarlingScript.BACKENDS:
+                for optimise, memoise, counted, pipeline in ((False, False, False, False),
+                                                             (True, False, False, False),
+                                                             (False, True, False, False),
+                                                             (False, False, True, False),
+                                                             (True, False, True, False),
+                                                             (False, False, True, True)):
+                    if backend == "tree" and not optimise and not memoise and not counted:
+                        continue
+                    if backend != "tree" and memoise:
+                        continue
+                    actual = run_program(source, backend, resolve, stdin_text, optimise, memoise, counted, pipeline)
+                    mode = (f"{backend}{' +resolve' if resolve else ''}{' +optimise' if optimise else ''}"
+                            f"{' +memoise' if memoise else ''}{' +counted' if counted else ''}"
+                            f"{' +pipeline' if pipeline else ''}")
+                    if actual == expected:
+                        print(f"ok    {name:<28} {mode}")
+                        continue
+                    failures += 1
+                    print(f"FAIL  {name:<28} {mode}")
+                    for line_number, (want, got) in enumerate(zip(expected.splitlines() + ["<end>"],
+                                                                  actual.splitlines() + ["<end>"]), start=1):
+                        if want != got:
+                            print(f"      line {line_number}: expected {want!r}, got {got!r}")
+                            break
+    print(f"\n{failures} mismatch(es)")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
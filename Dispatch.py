@@ -0,0 +1,68 @@
+# Dispatch.py
+from Expr import Expr
+from Stmt import Stmt
+
+'''
+Cached visitor dispatch tables
+Visiting a node used to mean building a method name like 'visit' + class name + 'Expr' and calling
+getattr() on the visitor - for every node, every time. Instead, each visitor class gets a table
+mapping every syntax tree node class straight to its visit method, built once on first use and cached.
+Visitors dispatch with a single dictionary lookup:
+    table = dispatch_table(type(self))
+    table[node.__class__](self, node)
+'''
+
+
+# Raised for node classes the visitor has no visit method for
+class DispatchTable(dict):
+    def __missing__(self, node_class):
+        raise NotImplementedError(f"No visit method found for {node_class.__name__}")
+
+
+# Every syntax tree node class, with the suffix its visit method names end in
+def node_classes():
+    classes = []
+    for base, suffix in ((Expr, 'Expr'), (Stmt, 'Stmt')):
+        for name, value in vars(base).items():
+            if isinstance(value, type) and not name.startswith('_'):
+                classes.append((value, suffix))
+    return classes
+
+
+NODE_CLASSES = node_classes()
+NODE_CLASS_SET = frozenset(node_class for node_class, _ in NODE_CLASSES)
+
+# Every node in the given syntax trees, found by following each node's slots - for passes that only need
+# to look at nodes of one or two kinds and have no use for a visit method per class
+# prune - node classes whose children are not followed, though the nodes themselves are yielded
+def walk(nodes, prune=()):
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        yield node
+        if node.__class__ in prune:
+            continue
+        for name in node.__slots__:
+            value = getattr(node, name, None)
+            if isinstance(value, (list, tuple)):
+                stack.extend(item for item in value if item.__class__ in NODE_CLASS_SET)
+            elif value.__class__ in NODE_CLASS_SET:
+                stack.append(value)
+
+
+# Visitor class -> DispatchTable
+_tables = {}
+
+
+# Dispatch table for a visitor class, built on first use
+# Tables hold the plain functions looked up on the class, so subclasses overriding a visit method get their own
+def dispatch_table(visitor_class):
+    table = _tables.get(visitor_class)
+    if table is None:
+        table = DispatchTable()
+        for node_class, suffix in NODE_CLASSES:
+            method = getattr(visitor_class, 'visit' + node_class.__name__ + suffix, None)
+            if method is not None:
+                table[node_class] = method
+        _tables[visitor_class] = table
+    return table
@@ -36,3 +36,83 @@ class Environment:
             return
 
         raise RuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+
+
+"""
+Array-backed environment used once the Resolver has annotated the syntax tree.
+Each local variable was given a (depth, slot) address ahead of time, so reads and writes
+index straight into a list instead of hashing the variable name at every level of the chain.
+Globals are not resolved and stay name-based in the dictionary Environment at the root.
+"""
+
+
+class SlotEnvironment:
+    def __init__(self, enclosing):
+        self.enclosing = enclosing
+        #  Using list to store variable bindings, in declaration order
+        self.values = []
+        # Global scope is always the dictionary Environment at the root of the chain
+        self.globals = enclosing.globals if isinstance(enclosing, SlotEnvironment) else enclosing
+
+    # Walk a fixed number of scopes out, no name lookups along the way
+    def ancestor(self, depth):
+        environment = self
+        for _ in range(depth):
+            environment = environment.enclosing
+        return environment
+
+    # Read a resolved local variable
+    def get_at(self, depth, slot):
+        environment = self
+        while depth:
+            environment = environment.enclosing
+            depth -= 1
+        return environment.values[slot]
+
+    # Write a resolved local variable
+    def assign_at(self, depth, slot, value):
+        environment = self
+        while depth:
+            environment = environment.enclosing
+            depth -= 1
+        environment.values[slot] = value
+
+    # Unresolved names are globals - jump straight to the global scope
+    def get(self, name):
+        return self.globals.get(name)
+
+    def assign(self, name, value):
+        self.globals.assign(name, value)
+
+    # The Resolver hands out slots in declaration order, and declarations in a scope
+    # execute in that same order, so the next slot is always the end of the list
+    def define(self, name, value):
+        self.values.append(value)
+
+
+"""
+Flat closures, once the Resolver has run
+A function no longer keeps the whole chain of scopes it was declared in. The Resolver works out which
+local variables each function reads or writes from outside its own body (its upvalues), and those
+variables are stored in a Cell instead of directly in their slot. Declaring the function copies just
+those Cells into a small closure scope, so the variable is shared - an assignment through any closure
+or in the declaring scope is seen by all of them - while every other outer variable can be freed.
+"""
+
+
+class Cell:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+# Closure scope for a function declared in this environment, holding the Cells at its upvalue addresses
+# A function with no upvalues reaches only globals, so the global scope itself is its closure
+# The function's body finds its upvalues one scope past its parameters, and globals by name as before
+def capture(environment, upvalues):
+    if not upvalues:
+        return environment.globals if isinstance(environment, SlotEnvironment) else environment
+    closure = SlotEnvironment(environment.globals)
+    closure.values = [environment.get_at(depth, slot) for depth, slot in upvalues]
+    return closure
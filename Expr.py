@@ -7,23 +7,29 @@ from abc import ABC, abstractmethod
 Expressions are the first syntax tree nodes we see
 The main Expr class defines the visitor interface used to dispatch against
  the specific expression types, and contains the other expression subclasses as nested classes.
+Every node class declares __slots__ so instances carry no per-instance __dict__ - large scripts build
+hundreds of thousands of nodes. Any attribute a pass attaches to a node must be listed in its __slots__.
 '''
 
 class Expr(ABC):
+    # Visit method is looked up in the visitor's cached dispatch table (see Dispatch.py)
     def accept(self, visitor):
-        method_name = 'visit' + self.__class__.__name__ + 'Expr'
-        visit_method = getattr(visitor, method_name, None)
-        if visit_method:
-            return visit_method(self)
-        else:
-            raise NotImplementedError(f"No visit method found for {self.__class__.__name__}")
+        from Dispatch import dispatch_table  # Imported here - Dispatch imports Expr
+        return dispatch_table(type(visitor))[self.__class__](visitor, self)
 
     # Assign Expressions
     # Takes token name and expression value
     class Assign():
+        __slots__ = ("name", "value", "depth", "slot", "cell")
+
         def __init__(self, name, value):
             self.name = name
             self.value = value
+            # Scope address filled in by the Resolver - None means global
+            self.depth = None
+            self.slot = None
+            # The slot holds a Cell shared with closures, set by the Resolver
+            self.cell = False
 
         def __str__(self):
             return f"{self.name} {self.value}"
@@ -32,10 +38,14 @@ class Expr(ABC):
     # The infix arithmetic (+, -, *, /) and logic operators (==, !=, <, <=, >, >=)
     # Expression, operator, expression
     class Binary():
+        __slots__ = ("left", "operator", "right", "cache")
+
         def __init__(self, left, operator, right):
             self.left = left
             self.operator = operator
             self.right = right
+            # InlineCache.BinaryCache attached by the tree-walking Interpreter on first evaluation
+            self.cache = None
 
         def __str__(self):
             return f"({self.operator.lexeme} {self.left} {self.right})"
@@ -44,6 +54,8 @@ class Expr(ABC):
     # primary ( "(" arguments? ")" )*
     # Expression callee, Token paren, List<Expr> arguments
     class Call():
+        __slots__ = ("callee", "paren", "arguments")
+
         def __init__(self, callee, paren, arguments):
             self.callee = callee
             self.paren = paren
@@ -56,6 +68,8 @@ class Expr(ABC):
     # Property access, or “get” expressions
     # Expression object, token name
     class Get():
+        __slots__ = ("object", "name")
+
         def __init__(self, object, name):
             self.object = object
             self.name = name
@@ -67,6 +81,8 @@ class Expr(ABC):
     # Using parentheses to group expressions
     # "(" expression ")"
     class Grouping():
+        __slots__ = ("expression",)
+
         def __init__(self, expression):
             self.expression = expression
 
@@ -78,6 +94,8 @@ class Expr(ABC):
     # NUMBER | STRING | "true" | "false" | "nil"
     # Object value
     class Literal():
+        __slots__ = ("value",)
+
         def __init__(self, value):
             self.value = value
 
@@ -87,6 +105,8 @@ class Expr(ABC):
     # Logical expression
     # Expression left, operator, expression right, (AND, OR)
     class Logical():
+        __slots__ = ("left", "operator", "right")
+
         def __init__(self, left, operator, right):
             self.left = left
             self.operator = operator
@@ -99,6 +119,8 @@ class Expr(ABC):
     # Expr object, Token name, Expr value
     # Left side of an assignment
     class Set():
+        __slots__ = ("object", "name", "value")
+
         def __init__(self, object, name, value):
             self.object = object
             self.name = name
@@ -111,6 +133,8 @@ class Expr(ABC):
     # Token keyword, Token method
     # Used for a method call - super access followed by a function call
     class Super():
+        __slots__ = ("keyword", "method")
+
         def __init__(self, keyword, method):
             self.keyword = keyword
             self.method = method
@@ -121,6 +145,8 @@ class Expr(ABC):
     # This expression
     # Evaluates to the instance that the method was called on
     class This():
+        __slots__ = ("keyword",)
+
         def __init__(self, keyword):
             self.keyword = keyword
 
@@ -132,6 +158,8 @@ class Expr(ABC):
     # ( "-" | "!" ) expression
     # Token operator, Expr right
     class Unary():
+        __slots__ = ("operator", "right")
+
         def __init__(self, operator, right):
             self.operator = operator
             self.right = right
@@ -142,8 +170,15 @@ class Expr(ABC):
     # Variable expression
     # E.g. 'var 1 = 3';
     class Variable():
+        __slots__ = ("name", "depth", "slot", "cell")
+
         def __init__(self, name):
             self.name = name
+            # Scope address filled in by the Resolver - None means global
+            self.depth = None
+            self.slot = None
+            # The slot holds a Cell shared with closures, set by the Resolver
+            self.cell = False
 
         # Return as string when printing
         def __str__(self):
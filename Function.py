@@ -1,8 +1,8 @@
 # Function.py
 
 from Callable import Callable
-from Environment import Environment
-from Return import Return
+from Return import TailCall
+from Environment import Cell
 
 '''
 Class that implements Callabale -> Instead of Stmt.Function, we wrap in a new class
@@ -15,17 +15,45 @@ class Function(Callable):
         self.declaration = declaration
 
     # Implement call() of Callable
+    # Functions the PurityAnalyser marked pure are answered from the interpreter's MemoTable when it can
     def call(self, interpreter, arguments):
-        # Environment call and define
-        environment = Environment(self.closure)
-        for i in range(len(self.declaration.params)):
-            environment.define(self.declaration.params[i].lexeme, arguments[i])
+        if self.declaration.pure:
+            return interpreter.memo.call(self, interpreter, arguments)
+        return self.run(interpreter, arguments)
 
+    # Run the body for these arguments
+    # A 'return f(...)' completes with a TailCall rather than calling f, and f then runs here in place of this
+    # function - tail recursion loops in this method instead of nesting Python frames
+    def run(self, interpreter, arguments):
+        call_stack = interpreter.call_stack
+        if call_stack is not None:
+            # Sampling profiler attached - keep this call on the stack it samples
+            call_stack.append(self)
         try:
-            interpreter.executeBlock(self.declaration.body, environment)
-        except Return as returnValue:
-            return returnValue.value
-        return None
+            function = self
+            while True:
+                # Environment call and define
+                declaration = function.declaration
+                environment = interpreter.new_scope(function.closure)
+                params = declaration.params
+                cells = declaration.param_cells
+                for i in range(len(params)):
+                    # Parameters captured by closures are shared through a Cell, like captured variables
+                    environment.define(params[i].lexeme, Cell(arguments[i]) if cells and i in cells else arguments[i])
+
+                # Body either runs off the end (None) or hands back a Return or TailCall completion
+                completion = interpreter.executeBlock(declaration.body, environment)
+                if completion is None:
+                    return None
+                if completion.__class__ is not TailCall:
+                    return completion.value
+                function = completion.function
+                arguments = completion.arguments
+                if call_stack is not None:
+                    call_stack[-1] = function
+        finally:
+            if call_stack is not None:
+                call_stack.pop()
 
     # When binding parameters, we assume parameter and argument lists are the same length,
     # visitCallExpr() checks arity before calling call().
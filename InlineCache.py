@@ -0,0 +1,138 @@
+# InlineCache.py
+import operator
+
+from TokenType import TokenType
+from Expr import Expr
+from Dispatch import walk
+from Rope import Rope, concat
+
+'''
+Type-feedback inline caches for binary operators
+The tree-walking Interpreter used to find the operation for every Expr.Binary it evaluated by testing the
+operator against each token type in turn, and '+' then tested both operands for strings. Instead, the first
+evaluation of each Binary node attaches a BinaryCache to the node (expr.cache), recording the classes of the
+two operands and the Python function for that operator and those operand types - operator.add for numbers,
+Rope.concat when a string is involved. Later evaluations check the operand classes against the recorded ones
+(the guard) and call the function directly. A miss takes the generic path for the operator, which still
+checks the operands, and counts against the site.
+A site is monomorphic while it only ever sees one pair of operand classes, and polymorphic once it has seen
+more. A polymorphic site keeps its first specialisation until misses outnumber hits, then specialises again
+for the operands of the latest miss.
+Caches live on the syntax tree, so they are shared by every interpreter running the same Program. A cache
+never changes its guard or function once built - respecialising puts a new BinaryCache on the node - so a
+thread always calls a function that matches the guard it checked. Hit and miss counts from threads running
+at the same time may lose the odd increment.
+    for site in site_stats(statements): print(site)
+'''
+
+
+# '+' as the Interpreter defines it - string concatenation if either operand is a string, else addition
+def add(left, right):
+    if left.__class__ is str or right.__class__ is str or left.__class__ is Rope or right.__class__ is Rope:
+        return concat(left, right)
+    return left + right
+
+
+# Operator token type -> generic function, correct for any operands
+OPERATORS = {
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.MINUS: operator.sub,
+    TokenType.PLUS: add,
+    TokenType.SLASH: operator.truediv,
+    TokenType.STAR: operator.mul,
+    TokenType.BANG_EQUAL: operator.ne,
+    TokenType.EQUAL_EQUAL: operator.eq,
+    TokenType.CARET: operator.pow,
+}
+
+
+# Function for an operator when the operands are known to be of these classes
+# Only '+' depends on the operand types - every other operator maps straight to Python's
+def specialise(operator_type, left_type, right_type):
+    if operator_type is TokenType.PLUS:
+        if left_type is str or right_type is str or left_type is Rope or right_type is Rope:
+            return concat
+        return operator.add
+    return OPERATORS[operator_type]
+
+
+class BinaryCache:
+    __slots__ = ("left_type", "right_type", "function", "generic", "hits", "misses", "seen")
+
+    # left_type, right_type - operand classes the guard accepts
+    # seen - every pair of operand classes the site has evaluated, shared with the cache it replaces
+    def __init__(self, operator_type, left_type, right_type, hits=0, misses=0, seen=None):
+        self.left_type = left_type
+        self.right_type = right_type
+        self.function = specialise(operator_type, left_type, right_type)
+        self.generic = OPERATORS[operator_type]
+        self.hits = hits
+        self.misses = misses
+        self.seen = seen if seen is not None else {(left_type, right_type)}
+
+    # Operands that failed the guard - evaluate generically, and respecialise once the guard fails more
+    # often than it passes
+    def miss(self, expr, left, right):
+        self.misses += 1
+        types = (left.__class__, right.__class__)
+        self.seen.add(types)
+        if self.misses > self.hits:
+            expr.cache = BinaryCache(expr.operator.type, *types, self.hits, self.misses, self.seen)
+        return self.generic(left, right)
+
+    def polymorphic(self):
+        return len(self.seen) > 1
+
+
+# First evaluation of a Binary node - build its cache and evaluate, counting the evaluation as a miss
+# The operator must be in OPERATORS
+def attach_cache(expr, left, right):
+    cache = BinaryCache(expr.operator.type, left.__class__, right.__class__, misses=1)
+    expr.cache = cache
+    return cache.function(left, right)
+
+
+# Every Binary node in a syntax tree
+def binary_sites(nodes):
+    return (node for node in walk(nodes) if node.__class__ is Expr.Binary)
+
+
+def type_name(value_type):
+    if value_type is type(None):
+        return "nil"
+    if value_type is Rope:
+        return "rope"
+    return value_type.__name__
+
+
+# Statistics for every Binary node that has been evaluated, in source order
+def site_stats(statements):
+    sites = []
+    for expr in binary_sites(statements):
+        cache = expr.cache
+        if cache is None:
+            continue
+        sites.append({
+            "line": expr.operator.line,
+            "operator": expr.operator.lexeme,
+            "types": sorted(f"{type_name(left)} {expr.operator.lexeme} {type_name(right)}"
+                            for left, right in cache.seen),
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "polymorphic": cache.polymorphic(),
+        })
+    sites.sort(key=lambda site: site["line"])
+    return sites
+
+
+# Table of site_stats(), one line per site
+def report(statements):
+    lines = [f"{'line':>6}  {'op':<3} {'hits':>10} {'misses':>8}  types"]
+    for site in site_stats(statements):
+        marker = "  polymorphic" if site["polymorphic"] else ""
+        lines.append(f"{site['line']:>6}  {site['operator']:<3} {site['hits']:>10} {site['misses']:>8}  "
+                     f"{', '.join(site['types'])}{marker}")
+    return "\n".join(lines)
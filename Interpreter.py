@@ -2,53 +2,81 @@
 from TokenType import TokenType
 from Expr import Expr
 from Stmt import Stmt
-from Environment import Environment
-from Callable import Callable
+from Environment import Environment, SlotEnvironment, Cell, capture
+from Natives import VARIADIC, define_natives
 from Function import Function
-from Return import Return
+from Return import Return, TailCall
+from Memo import MemoTable
+from InlineCache import OPERATORS, attach_cache
+from Loops import COMPARISONS, countable
+from Output import OutputSink
+from Dispatch import dispatch_table
 
 
 class Interpreter():
-    environment = Environment(enclosing=None)
+    # Runtime value for a script function - subclasses may substitute their own
+    function_class = Function
+
+    # resolved - statements have been annotated by the Resolver, local scopes use SlotEnvironment
+    # output - OutputSink the print statement writes to, a new one on sys.stdout by default
+    def __init__(self, resolved=False, output=None):
+        # Global scope belongs to this instance alone, so separate interpreters never see each other's globals.
+        # Calling interpret() again on the same instance carries on with the globals left by the last run.
+        self.globals = Environment(enclosing=None)
+        define_natives(self.globals)
+        self.environment = self.globals
+        # Set once a runtime error has stopped a script, like StarlingScript.hadError for parse errors
+        self.hadRuntimeError = False
+        self.output = output if output is not None else OutputSink()
+        # Script functions currently running, innermost last - only kept while a SamplingProfiler is attached
+        self.call_stack = None
+        # Whether 'return f(...)' hands the call back to Function.run() as a TailCall
+        self.tail_calls = True
+        # Results of pure function calls, see Memo.PurityAnalyser
+        self.memo = MemoTable()
+        # Environment class used for every new local scope (blocks and function calls)
+        self.new_scope = SlotEnvironment if resolved else Environment
+        # Node class -> visit method, shared by every instance of this interpreter class
+        self.dispatch = dispatch_table(type(self))
 
     # Interpret expressions - Begin with execute function
+    # A 'return' at the top level ends the program
+    # Statements may be a list or an iterator such as Parser.declarations() - each one runs as soon as it arrives.
+    # Only running a statement is guarded, so errors raised while producing the next one reach the caller.
+    # Remembered results are dropped first - a new program may rebind the functions a pure function calls
+    # A top-level 'return f(...)' still makes its call before the program ends
     def interpret(self, statements):
+        self.memo.clear()
         try:
             for statement in statements:
-                self.execute(statement)
-        except RuntimeError as error:
-            print(f"\033[91mError: {error.args[1]}\033[0m")
+                try:
+                    completion = self.execute(statement)
+                    if completion is not None:
+                        if completion.__class__ is TailCall:
+                            completion.function.call(self, completion.arguments)
+                        break
+                except RecursionError:
+                    # Only calls in tail position run in constant stack - the vm backend has no depth limit at all
+                    self.hadRuntimeError = True
+                    self.output.write_line(f"\033[91mError: Stack overflow - recursion too deep for the tree-walker\033[0m")
+                    break
+                except RuntimeError as error:
+                    self.hadRuntimeError = True
+                    self.output.write_line(f"\033[91mError: {error.args[1]}\033[0m")
+                    break
+        finally:
+            # Whatever stopped the program, everything it printed is written out
+            self.output.flush()
 
     # Evaluate expressions, select evaluation method based on expression type
+    # Dispatch table maps the expression class straight to its visit method
     def evaluate(self, expr):
-        # Evaluate Binary Expression
-        if isinstance(expr, Expr.Binary):
-            return self.visitBinaryExpr(expr)
-        # Evaluate Grouping - Using parentheses to group expressions - "(" expression ")"
-        elif isinstance(expr, Expr.Grouping):
-            return self.evaluate(expr.expression)
-        # Evaluate Literal Expression - Numbers, strings, Booleans, and nil
-        elif isinstance(expr, Expr.Literal):
-            return self.visitLiteralExpr(expr)
-        # Evaluate Unary Expression - ( "-" | "!" ) expression
-        elif isinstance(expr, Expr.Unary):
-            return self.visitUnaryExpr(expr)
-        # Evaluate Logical Expression - ('AND', 'OR')
-        elif isinstance(expr, Expr.Logical):
-            return self.visitLogicalExpr(expr)
-        # Evaluate Variable Expression
-        elif isinstance(expr, Expr.Variable):
-            return self.visitVariableExpr(expr)
-        # Evaluate Assignment Expression
-        elif isinstance(expr, Expr.Assign):
-            return self.visitAssignExpr(expr)
-        # Evaluate Call Expression
-        elif isinstance(expr, Expr.Call):
-            return self.visitCallExpr(expr)
+        return self.dispatch[expr.__class__](self, expr)
 
     # Execute - Accept Expressions
+    # Returns None when the statement completes normally, or the Return completion of a 'return' statement
     def execute(self, stmt):
-        return stmt.accept(self)
+        return self.dispatch[stmt.__class__](self, stmt)
 
     ''' \/ Syntax tree nodes \/ '''
 
@@ -61,33 +89,50 @@ class Interpreter():
     A variable usage refers to the preceding declaration with the same name in the innermost 
     scope that encloses the expression where the variable is used.
     """
+    # Stops at the first statement producing a Return completion and passes it on
     def executeBlock(self, statements, environment):
         previous = self.environment
         try:
             self.environment = environment
 
             for statement in statements:
-                self.execute(statement)
+                completion = self.execute(statement)
+                if completion is not None:
+                    return completion
+            return None
         finally:
             self.environment = previous
 
     # Execute - Block statements
+    # A block declaring nothing would only get an empty scope, so its statements run in the enclosing one.
+    # That covers the blocks wrapping every desugared 'for' loop body, which would otherwise allocate each iteration.
     def visitBlockStmt(self, stmt):
-        self.executeBlock(stmt.statements, Environment(self.environment))
+        if stmt.declares:
+            return self.executeBlock(stmt.statements, self.new_scope(self.environment))
+        for statement in stmt.statements:
+            completion = self.execute(statement)
+            if completion is not None:
+                return completion
         return None
 
     # Load expressions - Call evaluate function - Evaluates expression type
-    # Return object type
+    # Value is discarded - statements only produce completions
     def visitExpressionStmt(self, stmt):
-        return_statement = self.evaluate(stmt.expression)
-        #print(f"{self.stringify(return_statement)}")
-        return return_statement
+        self.evaluate(stmt.expression)
+        return None
 
     # Execute class statements
     # Binds the resulting object to a new variable. A
     # After creating Function, create a new binding in the current environment and store a reference to it there.
+    # Once resolved, the function keeps only the Cells it uses - see Environment.capture()
+    # A function its own body refers to from a closure is defined as a Cell first, so it can capture itself
     def visitFunctionStmt(self, stmt):
-        function = Function(stmt, self.environment)
+        if stmt.cell:
+            cell = Cell(None)
+            self.environment.define(stmt.name.lexeme, cell)
+            cell.value = self.function_class(stmt, capture(self.environment, stmt.upvalues))
+            return None
+        function = self.function_class(stmt, capture(self.environment, stmt.upvalues))
         self.environment.define(stmt.name.lexeme, function)
         return None
 
@@ -96,27 +141,36 @@ class Interpreter():
     # before returning to the outer if statements.
     def visitIfStmt(self, stmt):
         if self.is_truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.thenBranch)
+            return self.execute(stmt.thenBranch)
         elif stmt.elseBranch is not None:
-            self.execute(stmt.elseBranch)
+            return self.execute(stmt.elseBranch)
         return None
 
     # Print statement’s visit method - Print outcome
     # Convert value to a string using the stringify() function
     def visitPrintStmt(self, stmt):
         value = self.evaluate(stmt.expression)
-        print(f"{self.stringify(value)}")
+        self.output.write_line(self.stringify(value))
         return None
 
     # Evaluate return statements
     # If we have a return value, we evaluate it, otherwise, we use nil
+    # 'return f(...)' evaluates f and its arguments but leaves the call to Function.run(), which makes it
+    # without nesting another Python frame
     def visitReturnStmt(self, stmt):
         value = None
         if stmt.value is not None:
-            value = self.evaluate(stmt.value)
+            expr = stmt.value
+            if expr.__class__ is Expr.Call and self.tail_calls:
+                callee, arguments = self.call_arguments(expr)
+                if isinstance(callee, Function):
+                    return TailCall(callee, arguments)
+                value = callee.call(self, arguments)
+            else:
+                value = self.evaluate(expr)
 
-        # Assuming 'Return' is a custom exception defined to handle return values in your interpreter
-        raise Return(value)
+        # Completion signal, handed back up through the enclosing statements to Function.call()
+        return Return(value)
 
     # Syntax tree - Declaration statements
     # If variable has initialiser, evaluate it, if not other choice
@@ -125,12 +179,49 @@ class Interpreter():
         if stmt.initialiser:
             value = self.evaluate(stmt.initialiser)
 
-        self.environment.define(stmt.name.lexeme, value)
+        self.environment.define(stmt.name.lexeme, Cell(value) if stmt.cell else value)
         return None
 
+    # A 'return' inside the body leaves the loop and passes the completion on
+    # Counted loops run the counter in Python and only the body through the interpreter, see Loops.py
     def visitWhileStmt(self, stmt):
+        counted = stmt.counted
+        if counted is not None:
+            start = self.evaluate(counted.counter)
+            limit = self.evaluate(counted.limit)
+            if countable(start, limit):
+                return self.execute_counted(counted, start, limit)
         while self.is_truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.body)
+            completion = self.execute(stmt.body)
+            if completion is not None:
+                return completion
+        return None
+
+    # The counter is written into its variable before each iteration, so the body sees it as it would have
+    # An early return leaves the counter at the value of that iteration, as the increment never ran
+    def execute_counted(self, counted, start, limit):
+        values, key = counted.store(self.environment)
+        body = counted.body
+        execute = self.execute
+        numbers = counted.values(start, limit)
+        if numbers is not None:
+            for number in numbers:
+                values[key] = number
+                completion = execute(body)
+                if completion is not None:
+                    return completion
+            values[key] = counted.final(start, numbers)
+            return None
+        compare = COMPARISONS[counted.comparison]
+        step = counted.step
+        number = start
+        while compare(number, limit):
+            values[key] = number
+            completion = execute(body)
+            if completion is not None:
+                return completion
+            number = number + step
+        values[key] = number
         return None
 
     # Syntax tree - Evaluates the right-hand side to get the value, then stores it in the named variable
@@ -138,6 +229,13 @@ class Interpreter():
     # StarlingScript can handle variable names longer than two characters
     def visitAssignExpr(self, expr):
         value = self.evaluate(expr.value)
+        # Resolved local - write straight into its slot, or into the Cell it holds
+        if expr.depth is not None:
+            if expr.cell:
+                self.environment.get_at(expr.depth, expr.slot).value = value
+            else:
+                self.environment.assign_at(expr.depth, expr.slot, value)
+            return value
         name = expr.name.name
         self.environment.assign(name, value)
         return value
@@ -148,71 +246,59 @@ class Interpreter():
         # Left and right binary expression
         left = self.evaluate(expr.left)
         right = self.evaluate(expr.right)
-        if expr.operator.type == TokenType.GREATER:
-            return left > right
-        elif expr.operator.type == TokenType.GREATER_EQUAL:
-            return left >= right
-        elif expr.operator.type == TokenType.LESS:
-            return left < right
-        elif expr.operator.type == TokenType.LESS_EQUAL:
-            return left <= right
-        elif expr.operator.type == TokenType.MINUS:
-            return left - right
-        elif expr.operator.type == TokenType.PLUS:
-            # If either operand is a string, treat the operation as string concatenation
-            if isinstance(left, str) or isinstance(right, str):
-                # Convert both operands to strings if at least one is a string
-                return str(left) + str(right)
-            else:
-                # Otherwise, proceed with numerical addition
-                return left + right
-        elif expr.operator.type == TokenType.SLASH:
-            return left / right
-        elif expr.operator.type == TokenType.STAR:
-            return left * right
-        elif expr.operator.type == TokenType.BANG_EQUAL:
-            return left != right
-        elif expr.operator.type == TokenType.EQUAL_EQUAL:
-            return left == right
-        elif expr.operator.type == TokenType.CARET:  # Handle the CARET "^" operator
-            return left ** right
-        else:
-            # Unexpected operator found
-            print(f"Unexpected operator {expr}")
-            return
+        # Inline cache - operands of the classes this site has seen before go straight to the specialised function
+        cache = expr.cache
+        if cache is not None:
+            if left.__class__ is cache.left_type and right.__class__ is cache.right_type:
+                cache.hits += 1
+                return cache.function(left, right)
+            return cache.miss(expr, left, right)
+        if expr.operator.type in OPERATORS:
+            return attach_cache(expr, left, right)
+        # Unexpected operator found
+        self.output.write_line(f"Unexpected operator {expr}")
+        return
 
     # Evaluate call expressions
     # Call expressions are used to invoke functions
     # Call expressions are evaluated by first evaluating the callee expression
+    # Builtins such as input() are NativeFunctions in the global scope, so every call takes the same path
+    # The callee and arguments are evaluated and checked here rather than through call_arguments(), since
+    # every call in a program passes through - one Python frame fewer per call
     def visitCallExpr(self, expr):
-        exprCheck = expr.callee.name.lexeme
-        if exprCheck == "input":  # Assuming callee is a string with the function name
-            # Handle input function
-            prompt = ""
-            if expr.arguments:
-                # Evaluate the first argument to use as the prompt
-                prompt = self.evaluate(expr.arguments[0])
-            user_input = input(prompt)
-            return user_input  # Return the user input to be used in the program
-        else:
-            callee = self.evaluate(expr.callee)
-
+        dispatch = self.dispatch
+        callee = expr.callee
+        callee = dispatch[callee.__class__](self, callee)
         arguments = []
         for argument in expr.arguments:
-            arguments.append(self.evaluate(argument))
+            arguments.append(dispatch[argument.__class__](self, argument))
+        try:
+            arity = callee.arity()
+        except AttributeError:
+            raise RuntimeError(expr.paren, f"Can only call functions and classes. Line: {expr.paren.line}")
+        if arity != len(arguments) and arity != VARIADIC:
+            raise RuntimeError(expr.paren, f"Expected {arity} arguments but got {len(arguments)}. Line: {expr.paren.line}")
+        return callee.call(self, arguments)
 
-        # Check if the callee is a callable object
-        if not isinstance(callee, Callable):
-            raise RuntimeError(f"Can only call functions and classes. Line: {expr.paren.line}")
-        if not isinstance(callee, Callable):
-            raise TypeError("Callee must be an instance of Callable")
+    # Evaluate the callee and arguments of a call, and check they can be called
+    # Asking for the arity is the only check - values that cannot be called have no arity() at all
+    def call_arguments(self, expr):
+        callee = self.evaluate(expr.callee)
+        arguments = [self.evaluate(argument) for argument in expr.arguments]
+        try:
+            arity = callee.arity()
+        except AttributeError:
+            raise RuntimeError(expr.paren, f"Can only call functions and classes. Line: {expr.paren.line}")
 
         # Arity - fancy term for the number of arguments a function or operation expects.
         # Check to see if the argument list’s length matches the callable’s arity.
-        if len(arguments) != callee.arity():
-            raise RuntimeError(f"Expected {callee.arity()} arguments but got {len(arguments)}. Line: {expr.paren.line}")
+        if arity != len(arguments) and arity != VARIADIC:
+            raise RuntimeError(expr.paren, f"Expected {arity} arguments but got {len(arguments)}. Line: {expr.paren.line}")
+        return callee, arguments
 
-        return callee.call(self, arguments)
+    # Evaluate Grouping - Using parentheses to group expressions - "(" expression ")"
+    def visitGroupingExpr(self, expr):
+        return self.evaluate(expr.expression)
 
     # Convert the literal tree node into a runtime value using Expr.Value
     def visitLiteralExpr(self, expr):
@@ -245,7 +331,12 @@ class Interpreter():
 
     # Evaluate a variable expression
     # Forwards to Environment - make sure the variable is defined
+    # Resolved locals are read by (depth, slot), globals by name
     def visitVariableExpr(self, expr):
+        if expr.depth is not None:
+            if expr.cell:
+                return self.environment.get_at(expr.depth, expr.slot).value
+            return self.environment.get_at(expr.depth, expr.slot)
         return self.environment.get(expr.name)
 
     # Truthiness and falsiness
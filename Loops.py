@@ -0,0 +1,199 @@
+# Loops.py
+import operator
+
+from TokenType import TokenType
+from Expr import Expr
+from Stmt import Stmt
+from Environment import SlotEnvironment
+from Dispatch import walk
+from Natives import is_number
+
+'''
+Counted loop recognition
+Parser.for_statement turns
+    for (var i = A; i < B; i = i + C) body
+into Block([Var i = A, While(i < B, Block([body, Expression(i = i + C)]))]), so every iteration evaluates the
+comparison and the increment through the interpreter. LoopAnalyser finds While nodes of exactly that shape
+and annotates them with a CountedLoop (stmt.counted). The tree-walker and closure backends then drive the
+counter in Python - a range() when A, B and C are all integers - and only run the body through the
+interpreter, writing the counter into its variable before each iteration and the final value after the loop.
+A loop is counted when
+    - the comparison is i < B, i <= B, i > B or i >= B, and the increment is i = i + C or i = i - C
+    - C is a number literal other than zero
+    - B is a number literal, or a variable that nothing in the program assigns to - other than the increment
+      of a for loop declaring a variable of that name, which only ever changes that loop's own counter
+    - nothing in the body, nested functions included, assigns to i, and no closure captures it
+i is declared by the loop itself, so only the loop can see it. If A or B turn out not to be numbers when the
+loop starts, it runs as an ordinary while loop. The vm backend compiles loops to bytecode and ignores
+the annotation.
+Names are tracked across statements, so statements pipelined one at a time are analysed as they arrive.
+Pipelined, only loops outside function bodies are counted: a function may run after a later statement has
+declared another function assigning to its loop's limit, which has not been seen when the loop is analysed.
+'''
+
+COMPARISONS = {
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+}
+
+
+class CountedLoop:
+    __slots__ = ("counter", "comparison", "limit", "step", "increment", "body")
+
+    # counter - Expr.Variable reading i, the left operand of the loop condition
+    # comparison - TokenType of the condition's operator
+    # limit - Expr.Literal or Expr.Variable for B, evaluated once when the loop starts
+    # step - number added to i each iteration
+    # increment - the Expr.Assign to i, whose scope address says where i lives
+    # body - the loop body without the increment
+    def __init__(self, counter, comparison, limit, step, increment, body):
+        self.counter = counter
+        self.comparison = comparison
+        self.limit = limit
+        self.step = step
+        self.increment = increment
+        self.body = body
+
+    # Values i takes, when they can be counted with range() - None otherwise
+    def values(self, start, limit):
+        step = self.step
+        if start.__class__ is not int or limit.__class__ is not int or step.__class__ is not int:
+            return None
+        comparison = self.comparison
+        if step > 0 and comparison is TokenType.LESS:
+            return range(start, limit, step)
+        if step > 0 and comparison is TokenType.LESS_EQUAL:
+            return range(start, limit + 1, step)
+        if step < 0 and comparison is TokenType.GREATER:
+            return range(start, limit, step)
+        if step < 0 and comparison is TokenType.GREATER_EQUAL:
+            return range(start, limit - 1, step)
+        return None
+
+    # Value i holds after the loop, once every value in counted has been used
+    def final(self, start, counted):
+        return counted[-1] + self.step if counted else start
+
+    # Variable values and key the counter is written to - a slot list and index once resolved, else a dictionary
+    # environment - the scope the loop runs in
+    def store(self, environment):
+        increment = self.increment
+        if increment.depth is not None:
+            return environment.ancestor(increment.depth).values, increment.slot
+        if isinstance(environment, SlotEnvironment):
+            environment = environment.globals
+        name = increment.name.name.lexeme
+        while name not in environment.values:
+            environment = environment.enclosing
+        return environment.values, name
+
+
+# A counted loop can only start and stop on numbers - true and false are not counted
+def countable(start, limit):
+    return is_number(start) and is_number(limit)
+
+
+# The Expr.Assign to i ending the body of a for loop - Block([Var i, While(condition, Block([..., i = ...]))]) -
+# or None for any other node
+# A body that declares names would give the assignment a scope of its own, so it is not a for loop here
+def for_increment(node):
+    if node.__class__ is not Stmt.Block or len(node.statements) != 2:
+        return None
+    declaration, loop = node.statements
+    if declaration.__class__ is not Stmt.Var or loop.__class__ is not Stmt.While:
+        return None
+    body = loop.body
+    if body.__class__ is not Stmt.Block or body.declares or not body.statements:
+        return None
+    last = body.statements[-1]
+    if last.__class__ is not Stmt.Expression or last.expression.__class__ is not Expr.Assign:
+        return None
+    if last.expression.name.name.lexeme != declaration.name.lexeme:
+        return None
+    return last.expression
+
+
+class LoopAnalyser:
+    def __init__(self):
+        # Names assigned anywhere in the statements analysed so far
+        self.assigned = set()
+        # Number of loops annotated
+        self.counted = 0
+
+    def analyse(self, statements):
+        for statement in statements:
+            self.note_assignments(statement)
+        for statement in statements:
+            self.annotate(statement)
+
+    # Analyse statements one at a time as they are pulled through, for pipelined execution
+    # A loop outside any function runs once the statements before it have, so their assignments are all it needs
+    # to know about - loops in function bodies are left uncounted
+    def analyse_each(self, statements):
+        for statement in statements:
+            self.note_assignments(statement)
+            self.annotate(statement, prune=(Stmt.Function,))
+            yield statement
+
+    # Increments of for loops are left out - they assign the variable their loop declares, nothing else
+    def note_assignments(self, statement):
+        nodes = list(walk([statement]))
+        increments = {id(increment) for increment in map(for_increment, nodes) if increment is not None}
+        for node in nodes:
+            if node.__class__ is Expr.Assign and id(node) not in increments:
+                self.assigned.add(node.name.name.lexeme)
+
+    # Annotate every for loop in a statement, however deeply nested
+    # prune - node classes whose loops are left alone
+    def annotate(self, statement, prune=()):
+        for node in walk([statement], prune):
+            increment = for_increment(node)
+            if increment is not None:
+                declaration, loop = node.statements
+                counted = self.recognise(declaration.name.lexeme, loop, increment)
+                if counted is not None:
+                    loop.counted = counted
+                    self.counted += 1
+
+    # CountedLoop for a for loop, or None if it does not count its variable the way a counted loop must
+    def recognise(self, name, loop, increment):
+        condition = loop.condition
+        if condition.__class__ is not Expr.Binary or condition.operator.type not in COMPARISONS:
+            return None
+        counter = condition.left
+        if counter.__class__ is not Expr.Variable or counter.name.lexeme != name:
+            return None
+        limit = condition.right
+        if limit.__class__ is Expr.Literal:
+            if not is_number(limit.value):
+                return None
+        elif limit.__class__ is not Expr.Variable or limit.name.lexeme == name or limit.name.lexeme in self.assigned:
+            return None
+
+        step = self.step(name, increment)
+        if step is None or increment.cell:
+            return None
+
+        rest = loop.body.statements[:-1]
+        for node in walk(rest):
+            if node.__class__ is Expr.Assign and node.name.name.lexeme == name:
+                return None
+        return CountedLoop(counter, condition.operator.type, limit, step, increment,
+                           rest[0] if len(rest) == 1 else Stmt.Block(rest))
+
+    # C from 'i = i + C' or 'i = i - C', as the number added each iteration
+    def step(self, name, increment):
+        value = increment.value
+        if value.__class__ is not Expr.Binary:
+            return None
+        if value.left.__class__ is not Expr.Variable or value.left.name.lexeme != name:
+            return None
+        if value.right.__class__ is not Expr.Literal or not is_number(value.right.value) or value.right.value == 0:
+            return None
+        if value.operator.type is TokenType.PLUS:
+            return value.right.value
+        if value.operator.type is TokenType.MINUS:
+            return -value.right.value
+        return None
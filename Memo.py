@@ -0,0 +1,248 @@
+# Memo.py
+from collections import OrderedDict
+
+from Expr import Expr
+from Dispatch import dispatch_table
+from Natives import NATIVES
+
+'''
+Automatic memoisation of pure script functions
+PurityAnalyser runs over a whole program after parsing and marks each top-level Stmt.Function whose
+result depends only on its arguments (stmt.pure). The tree-walking Interpreter then answers repeated calls
+to those functions from its MemoTable instead of running the body again - fib(n) goes from exponential to
+linear. A function is pure when its body
+    - never prints and declares no nested functions or classes
+    - reads and assigns only its own parameters and local variables
+    - calls only top-level functions that are themselves pure, or pure natives such as len() and sqrt(), by name
+A name counts as a function only when the program declares it once at the top level and never assigns to it,
+so a call always reaches the declaration that was analysed - and a native only while the program leaves its
+name alone. Calls to input(), clock() or any other name that is not such a function make the caller impure.
+Only whole programs are analysed - statements pipelined one at a time are never memoised.
+'''
+
+# Calls remembered by each interpreter before the least recently used are forgotten
+MEMO_SIZE = 65536
+
+
+# Least recently used cache of pure function results, one per interpreter
+class MemoTable:
+    def __init__(self, size=MEMO_SIZE):
+        self.size = size
+        # (declaration, arguments..., argument types...) -> result, least recently used first
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Result of calling a pure function, running its body only the first time these arguments are seen
+    # Argument types are part of the key, so 1, 1.0 and true - equal in Python - stay apart
+    def call(self, function, interpreter, arguments):
+        key = (function.declaration, *arguments, *map(type, arguments))
+        entries = self.entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+        self.misses += 1
+        # A runtime error propagates from here, so failed calls are never remembered
+        value = function.run(interpreter, arguments)
+        entries[key] = value
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return f"{self.hits} hit(s), {self.misses} miss(es)"
+
+
+class PurityAnalyser:
+    def __init__(self):
+        # Stack of local scopes, innermost last, each the set of names declared in it
+        self.scopes = []
+        # Index into scopes of the first scope belonging to the function being walked
+        self.function_base = 0
+        # [declaration, pure so far, names of non-local functions called] for the function being walked
+        self.function = None
+        # Every top-level function, in the same form
+        self.functions = []
+        # Top-level name -> number of top-level declarations of it
+        self.declared = {}
+        # Global names assigned to anywhere in the program
+        self.assigned = set()
+        self.dispatch = dispatch_table(type(self))
+
+    # Mark the pure top-level functions in a whole program, returns how many there are
+    def analyse(self, statements):
+        for statement in statements:
+            self.analyse_stmt(statement)
+
+        # Names that always refer to the one function declared with them
+        stable = {}
+        for declaration, pure, calls in self.functions:
+            name = declaration.name.lexeme
+            if self.declared[name] == 1 and name not in self.assigned:
+                stable[name] = (declaration, pure, calls)
+        # Assume every candidate is pure, then drop those calling anything impure until nothing changes,
+        # so recursive and mutually recursive functions can still be pure
+        pure = {name for name, (declaration, candidate, calls) in stable.items() if candidate}
+        pure_natives = {name for name, native in NATIVES.items()
+                        if native.pure and name not in self.declared and name not in self.assigned}
+        changed = True
+        while changed:
+            changed = False
+            for name in list(pure):
+                if not stable[name][2] <= pure | pure_natives:
+                    pure.discard(name)
+                    changed = True
+
+        for declaration, candidate, calls in self.functions:
+            declaration.pure = declaration.name.lexeme in pure
+        return len(pure)
+
+    def analyse_stmt(self, stmt):
+        self.dispatch[stmt.__class__](self, stmt)
+
+    def analyse_expr(self, expr):
+        self.dispatch[expr.__class__](self, expr)
+
+    def analyse_all(self, statements):
+        for statement in statements:
+            self.analyse_stmt(statement)
+
+    def declare(self, name):
+        if self.scopes:
+            self.scopes[-1].add(name.lexeme)
+        else:
+            self.declared[name.lexeme] = self.declared.get(name.lexeme, 0) + 1
+
+    # Declared inside the function being walked
+    def is_local(self, name):
+        for scope in self.scopes[self.function_base:]:
+            if name.lexeme in scope:
+                return True
+        return False
+
+    def is_global(self, name):
+        for scope in self.scopes:
+            if name.lexeme in scope:
+                return False
+        return True
+
+    def impure(self):
+        if self.function is not None:
+            self.function[1] = False
+
+    ''' \/ Statements \/ '''
+
+    def visitBlockStmt(self, stmt):
+        self.scopes.append(set())
+        self.analyse_all(stmt.statements)
+        self.scopes.pop()
+
+    def visitClassStmt(self, stmt):
+        self.impure()
+        self.declare(stmt.name)
+
+    def visitExpressionStmt(self, stmt):
+        self.analyse_expr(stmt.expression)
+
+    # Functions declared inside other functions are closures, never memoised - and make the outer one impure
+    def visitFunctionStmt(self, stmt):
+        self.impure()
+        top_level = not self.scopes
+        self.declare(stmt.name)
+        function = [stmt, top_level, set()]
+        if top_level:
+            self.functions.append(function)
+        else:
+            stmt.pure = False
+
+        enclosing, enclosing_base = self.function, self.function_base
+        self.function, self.function_base = function, len(self.scopes)
+        self.scopes.append({param.lexeme for param in stmt.params})
+        self.analyse_all(stmt.body)
+        self.scopes.pop()
+        self.function, self.function_base = enclosing, enclosing_base
+
+    def visitIfStmt(self, stmt):
+        self.analyse_expr(stmt.condition)
+        self.analyse_stmt(stmt.thenBranch)
+        if stmt.elseBranch is not None:
+            self.analyse_stmt(stmt.elseBranch)
+
+    def visitPrintStmt(self, stmt):
+        self.impure()
+        self.analyse_expr(stmt.expression)
+
+    def visitReturnStmt(self, stmt):
+        if stmt.value is not None:
+            self.analyse_expr(stmt.value)
+
+    # The initialiser runs before the name is declared, so it still sees any outer variable of the same name
+    def visitVarStmt(self, stmt):
+        if stmt.initialiser:
+            self.analyse_expr(stmt.initialiser)
+        self.declare(stmt.name)
+
+    def visitWhileStmt(self, stmt):
+        self.analyse_expr(stmt.condition)
+        self.analyse_stmt(stmt.body)
+
+    ''' \/ Expressions \/ '''
+
+    def visitAssignExpr(self, expr):
+        self.analyse_expr(expr.value)
+        name = expr.name.name
+        if self.is_global(name):
+            self.assigned.add(name.lexeme)
+        if not self.is_local(name):
+            self.impure()
+
+    def visitBinaryExpr(self, expr):
+        self.analyse_expr(expr.left)
+        self.analyse_expr(expr.right)
+
+    # Calling a non-local name is pure if that name turns out to be a pure function, anything else is not
+    def visitCallExpr(self, expr):
+        callee = expr.callee
+        if self.function is not None and isinstance(callee, Expr.Variable) and not self.is_local(callee.name):
+            self.function[2].add(callee.name.lexeme)
+        else:
+            self.impure()
+            self.analyse_expr(callee)
+        for argument in expr.arguments:
+            self.analyse_expr(argument)
+
+    def visitGetExpr(self, expr):
+        self.impure()
+        self.analyse_expr(expr.object)
+
+    def visitGroupingExpr(self, expr):
+        self.analyse_expr(expr.expression)
+
+    def visitLiteralExpr(self, expr):
+        pass
+
+    def visitLogicalExpr(self, expr):
+        self.analyse_expr(expr.left)
+        self.analyse_expr(expr.right)
+
+    def visitSetExpr(self, expr):
+        self.impure()
+        self.analyse_expr(expr.object)
+        self.analyse_expr(expr.value)
+
+    def visitSuperExpr(self, expr):
+        self.impure()
+
+    def visitThisExpr(self, expr):
+        self.impure()
+
+    def visitUnaryExpr(self, expr):
+        self.analyse_expr(expr.right)
+
+    def visitVariableExpr(self, expr):
+        if not self.is_local(expr.name):
+            self.impure()
@@ -0,0 +1,135 @@
+# Natives.py
+import math
+import time
+
+from Callable import Callable
+from Rope import is_string
+
+'''
+Native functions - builtins implemented in Python
+Every interpreter defines the whole NATIVES registry in its global scope when it is created, so
+builtins are looked up and called like any script function - no call site checks for special names.
+A script declaring a global of the same name simply replaces the builtin for that run.
+    input(prompt?)  - read a line from the user, optionally printing a prompt first
+    clock()         - seconds from a high-resolution timer, for timing code inside a script
+    len(string)     - number of characters in a string
+    str(value)      - value as the string print would show
+    num(value)      - number parsed from a string, like a number literal; numbers are returned as they are
+    abs, floor, ceil, sqrt, min, max - maths on numbers
+Natives marked pure give the same result for the same arguments and have no side effects, so
+Memo.PurityAnalyser lets pure script functions call them.
+'''
+
+# Arity of natives that take any number of arguments
+VARIADIC = -1
+
+
+class NativeFunction(Callable):
+    # function - Python function taking the argument values
+    # arity - number of arguments, or VARIADIC
+    # with_interpreter - the function takes the calling interpreter before the argument values
+    def __init__(self, name, function, arity, pure=False, with_interpreter=False):
+        self.name = name
+        self.function = function
+        self.argument_count = arity
+        self.pure = pure
+        self.with_interpreter = with_interpreter
+
+    def call(self, interpreter, arguments):
+        if self.with_interpreter:
+            return self.function(interpreter, *arguments)
+        return self.function(*arguments)
+
+    def arity(self):
+        return self.argument_count
+
+    def __str__(self):
+        return f"<native fn {self.name}>"
+
+
+# Raised with the two arguments interpret() reports, like Environment's undefined variable errors
+def native_error(message):
+    return RuntimeError(None, message)
+
+
+# true and false are Python bools, which are also ints - they are not numbers to a script
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def check_number(name, value):
+    if not is_number(value):
+        raise native_error(f"{name}() expects a number.")
+    return value
+
+
+# Only the first argument is used as the prompt, as before input() was a native
+# Buffered output is written first, so the prompt comes after everything already printed
+def native_input(interpreter, *arguments):
+    interpreter.output.flush()
+    return input(arguments[0] if arguments else "")
+
+
+# A Rope knows its length without being joined
+def native_len(value):
+    if not is_string(value):
+        raise native_error("len() expects a string.")
+    return len(value)
+
+
+def native_str(value):
+    if value is None:
+        return "nil"
+    return str(value)
+
+
+# Follows Scanner.number() - integers stay ints, anything with a fraction or exponent is a float
+def native_num(value):
+    if is_number(value):
+        return value
+    if is_string(value):
+        text = str(value).strip()
+        try:
+            return int(text)
+        except ValueError:
+            pass
+        try:
+            return float(text)
+        except ValueError:
+            pass
+    raise native_error(f"num() cannot convert '{native_str(value)}' to a number.")
+
+
+def native_sqrt(value):
+    if check_number("sqrt", value) < 0:
+        raise native_error("sqrt() expects a number that is not negative.")
+    return math.sqrt(value)
+
+
+def native_min(left, right):
+    return min(check_number("min", left), check_number("min", right))
+
+
+def native_max(left, right):
+    return max(check_number("max", left), check_number("max", right))
+
+
+NATIVES = {native.name: native for native in (
+    NativeFunction("input", native_input, VARIADIC, with_interpreter=True),
+    NativeFunction("clock", time.perf_counter, 0),
+    NativeFunction("len", native_len, 1, pure=True),
+    NativeFunction("str", native_str, 1, pure=True),
+    NativeFunction("num", native_num, 1, pure=True),
+    NativeFunction("abs", lambda value: abs(check_number("abs", value)), 1, pure=True),
+    NativeFunction("floor", lambda value: math.floor(check_number("floor", value)), 1, pure=True),
+    NativeFunction("ceil", lambda value: math.ceil(check_number("ceil", value)), 1, pure=True),
+    NativeFunction("sqrt", native_sqrt, 1, pure=True),
+    NativeFunction("min", native_min, 2, pure=True),
+    NativeFunction("max", native_max, 2, pure=True),
+)}
+
+
+# Define every native in a global environment
+def define_natives(environment):
+    for name, native in NATIVES.items():
+        environment.define(name, native)
@@ -0,0 +1,184 @@
+# Optimiser.py
+from TokenType import TokenType
+from Expr import Expr
+from Stmt import Stmt
+from Interpreter import Interpreter
+from Dispatch import dispatch_table
+from Rope import flatten
+
+'''
+Constant folding pass - runs after Parser.parse() and before the Resolver
+Any Binary, Unary, Logical or Grouping expression whose operands are all literals is replaced by
+a single Expr.Literal holding its value, so it is worked out once instead of every time it runs.
+Values are computed by the Interpreter itself, so folding follows exactly the same rules as running
+the program - string coercion on '+', '^' as power, is_truthy() for '!', 'and' and 'or'.
+An expression that would fail at runtime, such as 1 / 0 or -"text", is left alone so the error still
+happens when (and only if) it runs.
+If statements with a constant condition are replaced by the branch that would run, and while loops
+whose condition is constant false are removed.
+'''
+
+# Folded numbers and strings are capped at this many bits/characters - '9 ^ 9 ^ 9' stays for runtime
+MAX_FOLDED_SIZE = 4096
+
+
+class Optimiser:
+    def __init__(self):
+        # Number of constant expressions folded and branches pruned - unwrapped parentheses are not counted
+        self.folded = 0
+        # Evaluates operator nodes once their operands are literals
+        self.interpreter = Interpreter()
+        self.dispatch = dispatch_table(type(self))
+
+    # Optimise a list of statements, returns the new list
+    def optimise(self, statements):
+        optimised = []
+        for statement in statements:
+            statement = self.optimise_stmt(statement)
+            if statement is not None:
+                optimised.append(statement)
+        return optimised
+
+    # Optimise statements one at a time as they are pulled through, for pipelined execution
+    def optimise_each(self, statements):
+        for statement in statements:
+            statement = self.optimise_stmt(statement)
+            if statement is not None:
+                yield statement
+
+    # Returns the replacement statement, or None when it can be removed altogether
+    def optimise_stmt(self, stmt):
+        return self.dispatch[stmt.__class__](self, stmt)
+
+    # Returns the replacement expression
+    def optimise_expr(self, expr):
+        return self.dispatch[expr.__class__](self, expr)
+
+    # Statement in a position that cannot be left empty, such as a loop body
+    def optimise_branch(self, stmt):
+        stmt = self.optimise_stmt(stmt)
+        return stmt if stmt is not None else Stmt.Block([])
+
+    # Replace a node whose operands are all literals with a literal of its value
+    # The node is left as it is if evaluating it fails, or the result is too big to keep in the tree
+    def fold(self, expr):
+        try:
+            value = self.interpreter.evaluate(expr)
+        except Exception:
+            return expr
+        self.folded += 1
+        # Literals live in the shared syntax tree, so a long folded string is kept as a plain string, never a Rope
+        return Expr.Literal(flatten(value))
+
+    # Results that would be huge to build at compile time - '^' on large integers and '*' repeating a string
+    def too_large(self, operator_type, left, right):
+        if operator_type == TokenType.CARET:
+            return (isinstance(left, int) and isinstance(right, int) and right > 0
+                    and right * abs(left).bit_length() > MAX_FOLDED_SIZE)
+        if operator_type == TokenType.STAR:
+            if isinstance(right, str):
+                left, right = right, left
+            return isinstance(left, str) and isinstance(right, int) and len(left) * right > MAX_FOLDED_SIZE
+        return False
+
+    ''' \/ Statements \/ '''
+
+    def visitBlockStmt(self, stmt):
+        stmt.statements = self.optimise(stmt.statements)
+        stmt.declares = Stmt.Block.declares_names(stmt.statements)
+        return stmt
+
+    def visitExpressionStmt(self, stmt):
+        stmt.expression = self.optimise_expr(stmt.expression)
+        return stmt
+
+    def visitFunctionStmt(self, stmt):
+        stmt.body = self.optimise(stmt.body)
+        return stmt
+
+    # Branches are statements, never declarations, so one can stand in for the whole if statement
+    def visitIfStmt(self, stmt):
+        stmt.condition = self.optimise_expr(stmt.condition)
+        if isinstance(stmt.condition, Expr.Literal):
+            self.folded += 1
+            if self.interpreter.is_truthy(stmt.condition.value):
+                return self.optimise_stmt(stmt.thenBranch)
+            if stmt.elseBranch is not None:
+                return self.optimise_stmt(stmt.elseBranch)
+            return None
+        stmt.thenBranch = self.optimise_branch(stmt.thenBranch)
+        if stmt.elseBranch is not None:
+            stmt.elseBranch = self.optimise_stmt(stmt.elseBranch)
+        return stmt
+
+    def visitPrintStmt(self, stmt):
+        stmt.expression = self.optimise_expr(stmt.expression)
+        return stmt
+
+    def visitReturnStmt(self, stmt):
+        if stmt.value is not None:
+            stmt.value = self.optimise_expr(stmt.value)
+        return stmt
+
+    def visitVarStmt(self, stmt):
+        if stmt.initialiser:
+            stmt.initialiser = self.optimise_expr(stmt.initialiser)
+        return stmt
+
+    def visitWhileStmt(self, stmt):
+        stmt.condition = self.optimise_expr(stmt.condition)
+        if isinstance(stmt.condition, Expr.Literal) and not self.interpreter.is_truthy(stmt.condition.value):
+            self.folded += 1
+            return None
+        stmt.body = self.optimise_branch(stmt.body)
+        return stmt
+
+    ''' \/ Expressions \/ '''
+
+    def visitAssignExpr(self, expr):
+        expr.value = self.optimise_expr(expr.value)
+        return expr
+
+    def visitBinaryExpr(self, expr):
+        expr.left = self.optimise_expr(expr.left)
+        expr.right = self.optimise_expr(expr.right)
+        if not (isinstance(expr.left, Expr.Literal) and isinstance(expr.right, Expr.Literal)):
+            return expr
+        if self.too_large(expr.operator.type, expr.left.value, expr.right.value):
+            return expr
+        return self.fold(expr)
+
+    def visitCallExpr(self, expr):
+        expr.callee = self.optimise_expr(expr.callee)
+        expr.arguments = [self.optimise_expr(argument) for argument in expr.arguments]
+        return expr
+
+    # Parentheses only affect parsing - the grouped expression can take their place
+    # Unwrapping them folds nothing, so it is not counted
+    def visitGroupingExpr(self, expr):
+        return self.optimise_expr(expr.expression)
+
+    def visitLiteralExpr(self, expr):
+        return expr
+
+    # A literal left operand decides whether the right one is ever evaluated
+    # The right operand need not be constant - when it runs, its value is the result
+    def visitLogicalExpr(self, expr):
+        expr.left = self.optimise_expr(expr.left)
+        expr.right = self.optimise_expr(expr.right)
+        if not isinstance(expr.left, Expr.Literal):
+            return expr
+        self.folded += 1
+        truthy = self.interpreter.is_truthy(expr.left.value)
+        if expr.operator.type == TokenType.OR or expr.operator.type == TokenType.PIPE:
+            return expr.left if truthy else expr.right
+        return expr.right if truthy else expr.left
+
+    def visitUnaryExpr(self, expr):
+        expr.right = self.optimise_expr(expr.right)
+        if not isinstance(expr.right, Expr.Literal):
+            return expr
+        return self.fold(expr)
+
+    def visitVariableExpr(self, expr):
+        return expr
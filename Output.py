@@ -0,0 +1,78 @@
+# Output.py
+import io
+import sys
+
+'''
+Buffered output for the print statement
+Calling Python's print() for every line a script prints means a function call, formatting and a write
+per line. Each interpreter instead hands its lines to an OutputSink, which joins them and writes them out
+in large batches. The buffer is written out
+    - once it holds buffer_size characters
+    - whenever flush() is called
+    - before input() shows its prompt, so the prompt appears after everything printed so far
+    - when interpret() finishes, however it finishes
+Runtime error messages go through the same sink, so they stay in order with the script's output.
+When the output is a terminal, every line is written straight away, as Python itself does.
+
+    Interpreter(output=OutputSink.to_file("out.txt"))      # write to a file
+    output = OutputSink.in_memory()                        # collect the output for embedding
+    Interpreter(output=output).interpret(statements)
+    output.getvalue()
+'''
+
+# Characters buffered before writing, when the output is not a terminal
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+
+class OutputSink:
+    # stream - object with write(), None for whatever sys.stdout is each time the buffer is written
+    # buffer_size - characters to buffer before writing, 0 writes every line straight away,
+    #               None picks DEFAULT_BUFFER_SIZE, or 0 for a terminal
+    def __init__(self, stream=None, buffer_size=None):
+        self.stream = stream
+        if buffer_size is None:
+            isatty = getattr(stream if stream is not None else sys.stdout, "isatty", None)
+            buffer_size = 0 if isatty is not None and isatty() else DEFAULT_BUFFER_SIZE
+        self.buffer_size = buffer_size
+        self.lines = []
+        # Characters in lines, newlines included
+        self.size = 0
+        # Set by to_file(), closed by close()
+        self.owns_stream = False
+
+    @classmethod
+    def to_file(cls, path, buffer_size=DEFAULT_BUFFER_SIZE):
+        sink = cls(open(path, "w"), buffer_size)
+        sink.owns_stream = True
+        return sink
+
+    @classmethod
+    def in_memory(cls):
+        return cls(io.StringIO(), DEFAULT_BUFFER_SIZE)
+
+    def write_line(self, text):
+        self.lines.append(text)
+        self.size += len(text) + 1
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.lines:
+            return
+        lines = self.lines
+        self.lines = []
+        self.size = 0
+        lines.append("")
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write("\n".join(lines))
+        stream.flush()
+
+    # Everything written to an in-memory sink so far
+    def getvalue(self):
+        self.flush()
+        return self.stream.getvalue()
+
+    def close(self):
+        self.flush()
+        if self.owns_stream:
+            self.stream.close()
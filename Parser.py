@@ -24,11 +24,14 @@ class Parser:
     # Parse the input expression
     def parse(self):
         # raise Parser.ParseError("Forced error")
-        statements = []
+        return list(self.declarations())
+
+    # Yield each top-level declaration as soon as it is parsed
+    # Lets the interpreter run a statement before the rest of the program has been parsed
+    def declarations(self):
         # While not at end of token
         while not self.is_at_end():
-            statements.append(self.declaration())
-        return statements
+            yield self.declaration()
 
     # Parsing the top-level expression
     def expression(self):
@@ -444,3 +447,150 @@ class Parser:
         else:
             error_message = error_message + f"Error at '{token.lexeme}': {message}"
         raise Parser.ParseError(error_message)
+
+
+# Parser reading from a token iterator such as StreamingScanner.iter_tokens()
+# The grammar only ever looks at the current token and the one just consumed,
+# so those two are kept instead of the whole token list
+class StreamingParser(Parser):
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.current_token = next(self.tokens)
+        self.previous_token = None
+
+    def advance(self):
+        if not self.is_at_end():
+            self.previous_token = self.current_token
+            self.current_token = next(self.tokens)
+        return self.previous_token
+
+    def peek(self):
+        return self.current_token
+
+    def previous(self):
+        return self.previous_token
+
+
+# Binding powers for the PrattParser, loosest first - one per level of the recursive descent grammar
+PREC_ASSIGNMENT = 1  # =
+PREC_OR = 2          # or |
+PREC_AND = 3         # and &
+PREC_EQUALITY = 4    # == !=
+PREC_COMPARISON = 5  # < <= > >=
+PREC_TERM = 6        # + -
+PREC_FACTOR = 7      # * /
+PREC_POWER = 8       # ^
+PREC_UNARY = 9       # ! -
+PREC_CALL = 10       # ()
+
+
+# Table-driven Pratt parser for expressions - builds the same syntax trees as Parser, with the same precedence,
+# associativity and errors, and parses statements exactly as Parser does
+# Parser works through a method per precedence level for every operand, and each level calls match(), which
+# calls check(), is_at_end() and peek() for every token type it tries - a dozen or so calls to reach a literal.
+# Here one loop looks the current token up in two tables instead:
+#     PREFIX - token types that can start an expression -> function building it from the consumed token
+#     INFIX - operator token types -> (binding power, function building the expression from the left operand)
+# parse_precedence(level) parses a prefix expression, then keeps taking operators that bind at least as tightly
+# as level. Binary and logical operators parse their right operand one level tighter, so they are
+# left-associative, '^' included; '=' parses its value at its own level, so it is right-associative.
+# The tokens must be a list ending with EOF, as Scanner.scan_tokens() returns - StreamingParser stays recursive.
+class PrattParser(Parser):
+    def expression(self):
+        return self.parse_precedence(PREC_ASSIGNMENT)
+
+    # Parse an expression whose operators all bind at least as tightly as precedence
+    def parse_precedence(self, precedence):
+        tokens = self.tokens
+        token = tokens[self.current]
+        prefix = PRATT_PREFIX.get(token.type)
+        if prefix is None:
+            raise self.error(token, "Expect expression.")
+        self.current += 1
+        expr = prefix(self, token)
+
+        infix_rules = PRATT_INFIX
+        while True:
+            token = tokens[self.current]
+            rule = infix_rules.get(token.type)
+            if rule is None or rule[0] < precedence:
+                return expr
+            self.current += 1
+            expr = rule[1](self, expr, token, rule[0])
+
+    # Prefix rules - the token has been consumed
+
+    def literal(self, token):
+        return Expr.Literal(token.literal)
+
+    def false_literal(self, token):
+        return Expr.Literal(False)
+
+    def true_literal(self, token):
+        return Expr.Literal(True)
+
+    def nil_literal(self, token):
+        return Expr.Literal(None)
+
+    def variable(self, token):
+        return Expr.Variable(token)
+
+    def grouping(self, token):
+        expr = self.parse_precedence(PREC_ASSIGNMENT)
+        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
+        return Expr.Grouping(expr)
+
+    # '-' and '!' apply to a call or another unary expression, so '-2 ^ 2' is (-2) ^ 2 as in Parser
+    def prefix_unary(self, operator):
+        return Expr.Unary(operator, self.parse_precedence(PREC_UNARY))
+
+    # Infix rules - the operator token has been consumed, precedence is its binding power
+
+    def binary(self, left, operator, precedence):
+        return Expr.Binary(left, operator, self.parse_precedence(precedence + 1))
+
+    def logical(self, left, operator, precedence):
+        return Expr.Logical(left, operator, self.parse_precedence(precedence + 1))
+
+    def infix_call(self, callee, paren, precedence):
+        return self.finish_call(callee)
+
+    # The value is parsed before the target is checked, so errors in it are reported first, as in Parser
+    def infix_assignment(self, target, equals, precedence):
+        value = self.parse_precedence(precedence)
+        if isinstance(target, Expr.Variable):
+            return Expr.Assign(Expr.Variable(target.name), value)
+        raise self.error(equals, "Invalid assignment target.")
+
+
+PRATT_PREFIX = {
+    TokenType.NUMBER: PrattParser.literal,
+    TokenType.STRING: PrattParser.literal,
+    TokenType.FALSE: PrattParser.false_literal,
+    TokenType.TRUE: PrattParser.true_literal,
+    TokenType.NIL: PrattParser.nil_literal,
+    TokenType.IDENTIFIER: PrattParser.variable,
+    TokenType.LEFT_PAREN: PrattParser.grouping,
+    TokenType.BANG: PrattParser.prefix_unary,
+    TokenType.MINUS: PrattParser.prefix_unary,
+}
+
+PRATT_INFIX = {
+    TokenType.EQUAL: (PREC_ASSIGNMENT, PrattParser.infix_assignment),
+    TokenType.OR: (PREC_OR, PrattParser.logical),
+    TokenType.PIPE: (PREC_OR, PrattParser.logical),
+    TokenType.AND: (PREC_AND, PrattParser.logical),
+    TokenType.AMPERSAND: (PREC_AND, PrattParser.logical),
+    TokenType.BANG_EQUAL: (PREC_EQUALITY, PrattParser.binary),
+    TokenType.EQUAL_EQUAL: (PREC_EQUALITY, PrattParser.binary),
+    TokenType.GREATER: (PREC_COMPARISON, PrattParser.binary),
+    TokenType.GREATER_EQUAL: (PREC_COMPARISON, PrattParser.binary),
+    TokenType.LESS: (PREC_COMPARISON, PrattParser.binary),
+    TokenType.LESS_EQUAL: (PREC_COMPARISON, PrattParser.binary),
+    TokenType.MINUS: (PREC_TERM, PrattParser.binary),
+    TokenType.PLUS: (PREC_TERM, PrattParser.binary),
+    TokenType.SLASH: (PREC_FACTOR, PrattParser.binary),
+    TokenType.STAR: (PREC_FACTOR, PrattParser.binary),
+    TokenType.CARET: (PREC_POWER, PrattParser.binary),
+    TokenType.LEFT_PAREN: (PREC_CALL, PrattParser.infix_call),
+}
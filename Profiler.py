@@ -0,0 +1,222 @@
+# Profiler.py
+import json
+import threading
+import time
+
+from Expr import Expr
+from Stmt import Stmt
+from Function import Function
+from Interpreter import Interpreter
+
+'''
+Profilers for the tree-walking Interpreter
+Deterministic profiler - times every statement and expression the tree-walker runs
+ProfilingInterpreter is a subclass, so the plain Interpreter's execute()/evaluate() are untouched and
+cost nothing extra when profiling is off.
+Time is recorded against source lines and against script functions:
+hits  - times control entered the line, or the function was called
+self  - time spent on the line (or in the function) itself, excluding the lines (or functions) it ran
+total - time from entering until leaving, including everything it ran; recursion is only counted once
+A node's line comes from the operator, name, paren or keyword token it carries. Nodes without a token of
+their own (blocks, literals, groupings) belong to whichever line is running them.
+Sampling profiler - SamplingProfiler below, for when instrumenting every node would distort the timings
+'''
+
+
+# Hit count and self/total time for each key, measured with a stack of the keys currently running
+class ProfileTable:
+    def __init__(self):
+        # Key -> [hits, self time, total time]
+        self.entries = {}
+        # [key, start time, time spent in nested keys, call depth] for everything currently running
+        self.stack = []
+        # Key -> how many times it is on the stack, so recursive time is only added to its total once
+        self.active = {}
+
+    # depth - script call depth, so a recursive call running the caller's line counts as a new hit
+    def enter(self, key, depth=0):
+        self.active[key] = self.active.get(key, 0) + 1
+        self.stack.append([key, time.perf_counter(), 0.0, depth])
+
+    def exit(self):
+        key, start, nested, depth = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed - nested
+        self.active[key] -= 1
+        if not self.active[key]:
+            entry[2] += elapsed
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+    # Entries as (key, hits, self, total), most self time first
+    def sorted(self):
+        rows = [(key, hits, self_time, total) for key, (hits, self_time, total) in self.entries.items()]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows
+
+
+# Source line a node belongs to, or None if it has no token of its own
+def node_line(node):
+    node_class = node.__class__
+    if node_class in (Expr.Binary, Expr.Logical, Expr.Unary):
+        return node.operator.line
+    if node_class is Expr.Variable or node_class is Stmt.Var or node_class is Stmt.Function:
+        return node.name.line
+    if node_class is Expr.Assign:
+        return node.name.name.line
+    if node_class is Expr.Call:
+        return node.paren.line
+    if node_class is Stmt.Return:
+        return node.keyword.line
+    if node_class is Stmt.Expression or node_class is Stmt.Print:
+        return node_line(node.expression)
+    if node_class is Stmt.If or node_class is Stmt.While:
+        return node_line(node.condition)
+    return None
+
+
+# Script function that records its calls in the interpreter's function table
+class ProfiledFunction(Function):
+    def call(self, interpreter, arguments):
+        functions = interpreter.functions
+        functions.enter((self.declaration.name.lexeme, self.declaration.name.line))
+        interpreter.call_depth += 1
+        try:
+            return Function.call(self, interpreter, arguments)
+        finally:
+            interpreter.call_depth -= 1
+            functions.exit()
+
+
+class ProfilingInterpreter(Interpreter):
+    function_class = ProfiledFunction
+
+    # source - the script's text, so the report can show each line
+    def __init__(self, resolved=False, source=None):
+        super().__init__(resolved=resolved)
+        self.source_lines = source.splitlines() if source is not None else []
+        self.lines = ProfileTable()
+        self.functions = ProfileTable()
+        # Node -> line, worked out once per node
+        self.node_lines = {}
+        # Script function calls currently running
+        self.call_depth = 0
+        # Every call is timed as a call of its own, tail calls included
+        self.tail_calls = False
+
+    # Every statement and expression passes through here
+    # Nodes on the line already running in the same call just run, any other node starts timing its line
+    def execute(self, node):
+        node_lines = self.node_lines
+        if node in node_lines:
+            line = node_lines[node]
+        else:
+            line = node_lines[node] = node_line(node)
+        stack = self.lines.stack
+        if line is None or (stack and stack[-1][0] == line and stack[-1][3] == self.call_depth):
+            return self.dispatch[node.__class__](self, node)
+        self.lines.enter(line, self.call_depth)
+        try:
+            return self.dispatch[node.__class__](self, node)
+        finally:
+            self.lines.exit()
+
+    evaluate = execute
+
+    def source_line(self, line):
+        if 0 < line <= len(self.source_lines):
+            return self.source_lines[line - 1].strip()
+        return ""
+
+    # Sorted text report, hottest lines and functions first
+    def profile_report(self, limit=20):
+        out = ["Lines by self time", f"{'line':>6} {'hits':>10} {'self ms':>10} {'total ms':>10}  source"]
+        for line, hits, self_time, total in self.lines.sorted()[:limit]:
+            out.append(f"{line:>6} {hits:>10} {self_time * 1000:>10.2f} {total * 1000:>10.2f}  {self.source_line(line)}")
+        out.append("")
+        out.append("Functions by self time")
+        out.append(f"{'function':<24} {'calls':>10} {'self ms':>10} {'total ms':>10}")
+        for (name, line), calls, self_time, total in self.functions.sorted()[:limit]:
+            label = f"{name} (line {line})"
+            out.append(f"{label:<24} {calls:>10} {self_time * 1000:>10.2f} {total * 1000:>10.2f}")
+        return "\n".join(out)
+
+    # Everything recorded, times in seconds
+    def profile_data(self):
+        return {
+            "lines": [{"line": line, "hits": hits, "self": self_time, "total": total, "source": self.source_line(line)}
+                      for line, hits, self_time, total in self.lines.sorted()],
+            "functions": [{"name": name, "line": line, "calls": calls, "self": self_time, "total": total}
+                          for (name, line), calls, self_time, total in self.functions.sorted()],
+        }
+
+    def write_profile(self, path):
+        with open(path, "w") as f:
+            json.dump(self.profile_data(), f, indent=2)
+            f.write("\n")
+
+
+# Sampling profiler - a timer thread periodically records which script functions are running
+# Much cheaper than ProfilingInterpreter: the only cost to the script is Function.call pushing and popping
+# its entry on interpreter.call_stack, so deeply recursive scripts keep their real timings.
+# Samples are written in the collapsed-stack format flamegraph tools read, one stack per line:
+#     <script>;<fn fib>:28;<fn fib>:28 37
+# Each frame is the function's name from Function.__str__ and the line it is declared on.
+class SamplingProfiler:
+    # interval - seconds between samples
+    def __init__(self, interpreter, interval=0.005):
+        self.interpreter = interpreter
+        self.interval = interval
+        # Tuple of running functions -> number of samples that saw it
+        self.samples = {}
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        self.interpreter.call_stack = []
+        self.running = True
+        self.thread = threading.Thread(target=self.sample, name="StarlingScript sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.interpreter.call_stack = None
+
+    def sample(self):
+        samples = self.samples
+        interpreter = self.interpreter
+        while self.running:
+            time.sleep(self.interval)
+            # Copying a list is atomic under the GIL, so this is a consistent snapshot of the stack
+            stack = interpreter.call_stack
+            if stack is None:
+                break
+            snapshot = tuple(stack)
+            samples[snapshot] = samples.get(snapshot, 0) + 1
+
+    # Collapsed stacks, one 'frame;frame;... count' line per distinct stack
+    def collapsed(self):
+        labels = {}
+        lines = []
+        for stack, count in self.samples.items():
+            frames = ["<script>"]
+            for function in stack:
+                label = labels.get(function.declaration)
+                if label is None:
+                    label = labels[function.declaration] = f"{function}:{function.declaration.name.line}"
+                frames.append(label)
+            lines.append(f"{';'.join(frames)} {count}")
+        lines.sort()
+        return "\n".join(lines)
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            f.write(self.collapsed() + "\n")
+
+    def total_samples(self):
+        return sum(self.samples.values())
@@ -0,0 +1,96 @@
+# Program.py
+from Scanner import Scanner
+from Parser import PrattParser
+from Resolver import Resolver
+from Optimiser import Optimiser
+from Memo import PurityAnalyser
+from Loops import LoopAnalyser
+from InlineCache import site_stats
+from StarlingScript import BACKENDS
+
+'''
+Embedding API - a script scanned and parsed once, then run any number of times
+A Program is immutable: every pass that changes the syntax tree (Optimiser, Resolver) runs while it is
+being built, and nothing touches the tree afterwards. Interpreters only read the tree and keep all
+runtime state - globals included - in their own environments, so any number of interpreter instances
+can run the same Program one after another or at the same time in separate threads. The one exception is
+the tree-walker's inline caches on Binary nodes, which are built to be shared (see InlineCache.py).
+
+    program = Program.from_file("script.txt", resolve=True)
+    program.run()                      # fresh interpreter, fresh globals
+    program.run(backend="vm")
+    interpreter = program.run()        # returns the interpreter, its globals hold the script's variables
+
+Scripts print to sys.stdout, which threads share, unless each run is given its own OutputSink:
+
+    output = OutputSink.in_memory()
+    program.run(output=output)
+    output.getvalue()
+'''
+
+
+def parse(source, fast_scan=False):
+    scanner = Scanner(source)
+    tokens = scanner.scan_tokens_fast() if fast_scan else scanner.scan_tokens()
+    return PrattParser(tokens).parse()
+
+
+class Program:
+    __slots__ = ("statements", "resolved")
+
+    # statements - parsed (and already optimised/resolved) statements, kept as a tuple
+    # resolved - the Resolver has annotated the statements, interpreters must be created with resolved=True
+    def __init__(self, statements, resolved=False):
+        object.__setattr__(self, "statements", tuple(statements))
+        object.__setattr__(self, "resolved", resolved)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Program is immutable")
+
+    # Scan and parse the source once
+    # Raises Parser.ParseError for syntax errors and RuntimeError for token errors
+    @classmethod
+    def from_source(cls, source, resolve=False, optimise=False, fast_scan=False, memoise=True):
+        return cls.from_statements(parse(source, fast_scan), resolve=resolve, optimise=optimise, memoise=memoise)
+
+    # cache - a Cache.ProgramCache to load the parsed statements from, or store them in
+    @classmethod
+    def from_file(cls, path, resolve=False, optimise=False, fast_scan=False, cache=None, memoise=True):
+        with open(path, "r") as f:
+            source = f.read()
+        statements = cache.load(path, source) if cache is not None else None
+        if statements is None:
+            statements = parse(source, fast_scan)
+            if cache is not None:
+                cache.store(path, source, statements)
+        return cls.from_statements(statements, resolve=resolve, optimise=optimise, memoise=memoise)
+
+    # Run the passes that rewrite the tree now, before the Program is shared
+    # memoise - mark pure functions so the tree-walker remembers their results (each interpreter keeps its own)
+    @classmethod
+    def from_statements(cls, statements, resolve=False, optimise=False, memoise=True):
+        if optimise:
+            statements = Optimiser().optimise(statements)
+        if resolve:
+            Resolver().resolve(statements)
+        LoopAnalyser().analyse(statements)
+        if memoise:
+            PurityAnalyser().analyse(statements)
+        return cls(statements, resolved=resolve)
+
+    # New interpreter with empty globals, ready to run this Program
+    # output - OutputSink for its print statements, so each thread can collect its own output
+    def interpreter(self, backend="tree", output=None):
+        return BACKENDS[backend](resolved=self.resolved, output=output)
+
+    # Run the Program, on a fresh interpreter unless one is given, and return the interpreter
+    # Passing the same interpreter again runs the Program on top of the globals it already holds
+    def run(self, backend="tree", interpreter=None, output=None):
+        if interpreter is None:
+            interpreter = self.interpreter(backend, output)
+        interpreter.interpret(self.statements)
+        return interpreter
+
+    # Operand types, hits and misses of each binary operator the tree-walker has run, see InlineCache.site_stats
+    def inline_cache_stats(self):
+        return site_stats(self.statements)
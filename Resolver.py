@@ -0,0 +1,223 @@
+# Resolver.py
+from Dispatch import dispatch_table
+
+'''
+Static resolver pass - runs after Parser.parse() and before Interpreter.interpret()
+Walks the syntax tree once, tracking the local scopes that will exist at runtime.
+Every local variable read or write is annotated with its (depth, slot) address:
+depth - how many environments out from the current one the variable lives
+slot  - index of the variable within that environment's list of values
+Variables not found in any local scope are globals and are left unannotated (depth None),
+the interpreter keeps looking those up by name.
+Names are bound where they appear, so a function reading a local declared after it in the same block reads
+the global of that name instead - an "Undefined variable" runtime error if there is none, where the unresolved
+interpreter would find the local.
+Functions get flat closures (see Environment.capture). A local variable a function uses from outside its own
+body becomes one of the function's upvalues, addressed at the scope just past the function's parameters, and
+is marked as a Cell wherever it is declared and used. A function nested two deep passes the variable through
+the function between them, which captures it as an upvalue of its own.
+'''
+
+
+# A local variable while its scope is being resolved
+class Local:
+    __slots__ = ("slot", "declaration", "references", "captured")
+
+    # declaration - the Stmt.Var or Stmt.Function declaring it, or (function, index) for a parameter
+    def __init__(self, slot, declaration):
+        self.slot = slot
+        self.declaration = declaration
+        # Variable and Assign nodes using it from its own function, marked once it is known to be captured
+        self.references = []
+        self.captured = False
+
+
+# A function body being resolved
+class FunctionScope:
+    __slots__ = ("declaration", "base", "upvalues")
+
+    # base - index in Resolver.scopes of the scope holding the parameters
+    def __init__(self, declaration, base):
+        self.declaration = declaration
+        self.base = base
+        # Local -> index in declaration.upvalues
+        self.upvalues = {}
+
+
+class Resolver:
+    def __init__(self):
+        # Stack of local scopes, innermost last. Each maps a variable name to its Local.
+        # Global scope is not tracked - anything not found here is global
+        self.scopes = []
+        # Functions being resolved, innermost last
+        self.functions = []
+        self.dispatch = dispatch_table(type(self))
+
+    # Resolve a list of statements
+    def resolve(self, statements):
+        for statement in statements:
+            self.resolve_stmt(statement)
+
+    # Resolve statements one at a time as they are pulled through, for pipelined execution
+    # Top-level statements only ever see the global scope, so each can be resolved on its own
+    def resolve_each(self, statements):
+        for statement in statements:
+            self.resolve_stmt(statement)
+            yield statement
+
+    def resolve_stmt(self, stmt):
+        self.dispatch[stmt.__class__](self, stmt)
+
+    def resolve_expr(self, expr):
+        return self.dispatch[expr.__class__](self, expr)
+
+    # Matches every Environment the interpreter creates - one per declaring block and one per function call
+    # Each scope is a list of its Locals in slot order plus a name -> Local map
+    def begin_scope(self):
+        self.scopes.append(([], {}))
+
+    # Once a scope is finished it is known which of its variables closures capture - those become Cells
+    def end_scope(self):
+        locals_, _ = self.scopes.pop()
+        for local in locals_:
+            if not local.captured:
+                continue
+            for reference in local.references:
+                reference.cell = True
+            declaration = local.declaration
+            if declaration.__class__ is tuple:
+                function, index = declaration
+                function.param_cells = (function.param_cells or frozenset()) | {index}
+            else:
+                declaration.cell = True
+
+    # Give a new local variable the next slot in the innermost scope
+    # Redeclaring a name takes a fresh slot, matching SlotEnvironment.define() appending
+    def declare(self, name, declaration):
+        if not self.scopes:
+            return
+        locals_, names = self.scopes[-1]
+        local = Local(len(locals_), declaration)
+        locals_.append(local)
+        names[name.lexeme] = local
+
+    # Address of the name for a Variable or Assign node, returns (depth, slot) or (None, None) for globals
+    # A variable declared outside the innermost function is reached through that function's upvalues
+    def resolve_local(self, name, node):
+        for index in range(len(self.scopes) - 1, -1, -1):
+            local = self.scopes[index][1].get(name.lexeme)
+            if local is not None:
+                break
+        else:
+            return None, None
+        if not self.functions or index >= self.functions[-1].base:
+            local.references.append(node)
+            return len(self.scopes) - 1 - index, local.slot
+        node.cell = True
+        return len(self.scopes) - self.functions[-1].base, self.upvalue(len(self.functions) - 1, local, index)
+
+    # Index of the variable among the upvalues of self.functions[level], adding it if it is new
+    # scope_index - where the variable is declared in self.scopes
+    def upvalue(self, level, local, scope_index):
+        function = self.functions[level]
+        upvalue = function.upvalues.get(local)
+        if upvalue is not None:
+            return upvalue
+        # Address from the scope the function is declared in, just outside its parameters
+        declared_in = function.base - 1
+        if level == 0 or scope_index >= self.functions[level - 1].base:
+            local.captured = True
+            address = (declared_in - scope_index, local.slot)
+        else:
+            enclosing = self.functions[level - 1]
+            address = (declared_in - enclosing.base + 1, self.upvalue(level - 1, local, scope_index))
+        upvalue = function.upvalues[local] = len(function.upvalues)
+        function.declaration.upvalues += (address,)
+        return upvalue
+
+    # Function body runs in a single new environment holding the parameters
+    def resolve_function(self, function):
+        function.upvalues = ()
+        function.param_cells = None
+        self.begin_scope()
+        self.functions.append(FunctionScope(function, len(self.scopes) - 1))
+        for index, param in enumerate(function.params):
+            self.declare(param, (function, index))
+        self.resolve(function.body)
+        self.functions.pop()
+        self.end_scope()
+
+    ''' \/ Statements \/ '''
+
+    # Blocks that declare nothing share the enclosing scope at runtime, so they get no scope here either
+    def visitBlockStmt(self, stmt):
+        if not stmt.declares:
+            self.resolve(stmt.statements)
+            return
+        self.begin_scope()
+        self.resolve(stmt.statements)
+        self.end_scope()
+
+    def visitExpressionStmt(self, stmt):
+        self.resolve_expr(stmt.expression)
+
+    # Declare the name before resolving the body so the function can refer to itself
+    def visitFunctionStmt(self, stmt):
+        self.declare(stmt.name, stmt)
+        self.resolve_function(stmt)
+
+    def visitIfStmt(self, stmt):
+        self.resolve_expr(stmt.condition)
+        self.resolve_stmt(stmt.thenBranch)
+        if stmt.elseBranch is not None:
+            self.resolve_stmt(stmt.elseBranch)
+
+    def visitPrintStmt(self, stmt):
+        self.resolve_expr(stmt.expression)
+
+    def visitReturnStmt(self, stmt):
+        if stmt.value is not None:
+            self.resolve_expr(stmt.value)
+
+    # Initialiser is resolved before the name is declared - 'var a = a + 2;' reads the outer 'a',
+    # the same as the interpreter evaluating it before calling define()
+    def visitVarStmt(self, stmt):
+        if stmt.initialiser:
+            self.resolve_expr(stmt.initialiser)
+        self.declare(stmt.name, stmt)
+
+    def visitWhileStmt(self, stmt):
+        self.resolve_expr(stmt.condition)
+        self.resolve_stmt(stmt.body)
+
+    ''' \/ Expressions \/ '''
+
+    # Assign.name is an Expr.Variable wrapping the name token
+    def visitAssignExpr(self, expr):
+        self.resolve_expr(expr.value)
+        expr.depth, expr.slot = self.resolve_local(expr.name.name, expr)
+
+    def visitBinaryExpr(self, expr):
+        self.resolve_expr(expr.left)
+        self.resolve_expr(expr.right)
+
+    def visitCallExpr(self, expr):
+        self.resolve_expr(expr.callee)
+        for argument in expr.arguments:
+            self.resolve_expr(argument)
+
+    def visitGroupingExpr(self, expr):
+        self.resolve_expr(expr.expression)
+
+    def visitLiteralExpr(self, expr):
+        pass
+
+    def visitLogicalExpr(self, expr):
+        self.resolve_expr(expr.left)
+        self.resolve_expr(expr.right)
+
+    def visitUnaryExpr(self, expr):
+        self.resolve_expr(expr.right)
+
+    def visitVariableExpr(self, expr):
+        expr.depth, expr.slot = self.resolve_local(expr.name, expr)
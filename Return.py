@@ -1,10 +1,24 @@
 # Return.py
 
 """
-Class wraps the return value with the accoutrement's Java requires for a runtime exception class.
+Completion signal for a 'return' statement.
+Statements execute to None when they complete normally. A 'return' statement instead produces a Return
+holding the return value, which execute(), executeBlock() and the if/while visitors hand straight back
+up to Function.call(). No Python exception is raised, so a function return costs one small object.
+A 'return f(...)' inside a function produces a TailCall instead: the function and arguments are handed back
+unevaluated, and the function call that is returning makes the call itself, in place of its own frame.
 """
 
-class Return(Exception):
+class Return:
+    __slots__ = ("value",)
+
     def __init__(self, value):
-        super().__init__()
         self.value = value # Return value
+
+
+class TailCall:
+    __slots__ = ("function", "arguments")
+
+    def __init__(self, function, arguments):
+        self.function = function # Script function to call next
+        self.arguments = arguments # Argument values, already checked against its arity
@@ -0,0 +1,118 @@
+# Rope.py
+
+'''
+Lazy string for repeated concatenation
+'+' on strings used to build a new Python string every time, copying both operands, so a loop like
+    shopping_list = shopping_list + ", " + item;
+was quadratic in the length of the result. Once a result reaches ROPE_THRESHOLD characters, '+'
+produces a Rope instead - a list of chunks that are only joined into one string when the value is
+looked at: printed, compared with == or !=, converted with str() or used as a dictionary key.
+Ropes are immutable values like strings. Each Rope is a view of the first 'count' chunks of a chunk
+list that Ropes built from it may share. Appending to the Rope that sees the whole list just appends
+to the list - the older, shorter views are unaffected - so building a string in a loop is linear.
+Appending to any other Rope copies its chunks into a new list first.
+Ropes belong to the interpreter that built them - shared chunk lists are not safe across threads.
+'''
+
+# Concatenations shorter than this stay plain Python strings
+ROPE_THRESHOLD = 1024
+
+
+class Rope:
+    __slots__ = ("chunks", "count", "length", "flat")
+
+    def __init__(self, chunks, count, length):
+        self.chunks = chunks
+        # Number of chunks at the start of the list that belong to this Rope
+        self.count = count
+        self.length = length
+        # Joined string, once something has looked at it
+        self.flat = None
+
+    def append(self, piece):
+        if piece.__class__ is Rope:
+            pieces = piece.chunks[:piece.count]
+            length = piece.length
+        else:
+            pieces = [piece]
+            length = len(piece)
+        chunks = self.chunks
+        if len(chunks) != self.count:
+            # A longer Rope already shares this list - start a list of our own
+            chunks = chunks[:self.count]
+        chunks.extend(pieces)
+        return Rope(chunks, len(chunks), self.length + length)
+
+    def prepend(self, piece):
+        chunks = [piece]
+        chunks.extend(self.chunks[:self.count])
+        return Rope(chunks, len(chunks), self.length + len(piece))
+
+    def __str__(self):
+        flat = self.flat
+        if flat is None:
+            flat = self.flat = "".join(self.chunks[:self.count])
+        return flat
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return repr(str(self))
+
+    # Compares equal to the string it stands for, so == and != behave exactly as on strings
+    def __eq__(self, other):
+        if other.__class__ is Rope:
+            return self.length == other.length and str(self) == str(other)
+        if other.__class__ is str:
+            return self.length == len(other) and str(self) == other
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+    # Ordering and repetition work on the joined string, as they would on a plain string
+    def __lt__(self, other):
+        return str(self) < flatten(other)
+
+    def __le__(self, other):
+        return str(self) <= flatten(other)
+
+    def __gt__(self, other):
+        return str(self) > flatten(other)
+
+    def __ge__(self, other):
+        return str(self) >= flatten(other)
+
+    def __mul__(self, other):
+        return str(self) * other
+
+    __rmul__ = __mul__
+
+
+# Plain string for a Rope, anything else is returned unchanged
+def flatten(value):
+    if value.__class__ is Rope:
+        return str(value)
+    return value
+
+
+def is_string(value):
+    return value.__class__ is str or value.__class__ is Rope
+
+
+# '+' where either operand is a string or Rope - the other operand is converted with str(), as before
+def concat(left, right):
+    if left.__class__ is Rope:
+        return left.append(right if right.__class__ is Rope else str(right))
+    left = str(left)
+    if right.__class__ is Rope:
+        return right.prepend(left)
+    right = str(right)
+    length = len(left) + len(right)
+    if length < ROPE_THRESHOLD:
+        return left + right
+    return Rope([left, right], 2, length)
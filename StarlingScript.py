@@ -1,12 +1,93 @@
+import argparse
 import sys
-from Scanner import Scanner  # Scanner class
+from Scanner import Scanner, StreamingScanner  # Scanner classes
 from TokenType import TokenType
-from Parser import Parser
+from Parser import Parser, StreamingParser, PrattParser
 from Interpreter import Interpreter
+from Resolver import Resolver
+from Optimiser import Optimiser
+from Memo import PurityAnalyser
+from Loops import LoopAnalyser
+from Cache import ProgramCache
+from ClosureCompiler import ClosureInterpreter
+from VM import VM
+from Profiler import ProfilingInterpreter, SamplingProfiler
 
 hadError = False  # Track errors
+program_cache = ProgramCache()  # Parsed programs kept on disk between runs, see run_file(cache=True)
 
-def main():
+# Execution engines selectable with run(src, backend=...)
+BACKENDS = {
+    "tree": Interpreter,  # Tree-walking interpreter
+    "closure": ClosureInterpreter,  # AST compiled to Python closures
+    "vm": VM,  # AST compiled to bytecode for a stack-based virtual machine
+}
+
+# Command line entry point
+# With no arguments, the interactive menu of test case files
+# With script paths, runs each in turn - or with --batch, runs them all on a process pool and prints a JSON summary
+def main(argv=None):
+    global hadError
+    parser = argparse.ArgumentParser(description="Run StarlingScript programs.")
+    parser.add_argument("scripts", nargs="*", help="script files, or with --batch directories and glob patterns")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="tree", help="execution engine")
+    parser.add_argument("--resolve", action="store_true", help="run the Resolver pass")
+    parser.add_argument("--optimise", action="store_true", help="run the constant folding pass")
+    parser.add_argument("--fast-scan", action="store_true", help="use the regex-driven fast scanner")
+    parser.add_argument("--no-memoise", dest="memoise", action="store_false",
+                        help="do not remember the results of pure functions")
+    parser.add_argument("--cache", action="store_true", help="reuse parsed programs from __starlingcache__")
+    parser.add_argument("--stream", action="store_true", help="scan files in chunks while parsing")
+    parser.add_argument("--pipeline", action="store_true", help="run each statement as soon as it is parsed")
+    parser.add_argument("--batch", action="store_true", help="run the scripts in parallel, print a JSON summary")
+    parser.add_argument("--workers", type=int, default=None, help="batch worker processes (default: one per core)")
+    parser.add_argument("--timeout", type=float, default=None, help="batch time limit per script, in seconds")
+    parser.add_argument("--json", default=None, help="write the batch summary to this file instead of stdout")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile each script on the tree-walker, report hot lines and functions")
+    parser.add_argument("--profile-json", default=None,
+                        help="where to write the profile data (default: <script>.profile.json)")
+    parser.add_argument("--sample", action="store_true",
+                        help="sample each script's call stack on the tree-walker, write collapsed stacks")
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="milliseconds between samples")
+    parser.add_argument("--sample-output", default=None,
+                        help="where to write the collapsed stacks (default: <script>.collapsed)")
+    args = parser.parse_args(argv)
+
+    if not args.scripts:
+        interactive()
+        return
+
+    if args.batch:
+        import Batch  # Imported here - Batch imports Program, which imports this module
+        paths = Batch.expand_paths(args.scripts)
+        summary = Batch.run_batch(paths, workers=args.workers, timeout=args.timeout, backend=args.backend,
+                                  resolve=args.resolve, optimise=args.optimise, fast_scan=args.fast_scan,
+                                  cache=args.cache, memoise=args.memoise)
+        Batch.write_summary(summary, args.json)
+        sys.exit(0 if summary["statuses"].get("ok", 0) == len(paths) else 1)
+
+    if args.profile:
+        for path in args.scripts:
+            profile_file(path, resolve=args.resolve, optimise=args.optimise, fast_scan=args.fast_scan,
+                         json_path=args.profile_json, memoise=args.memoise)
+        sys.exit(65 if hadError else 0)
+
+    if args.sample:
+        for path in args.scripts:
+            sample_file(path, resolve=args.resolve, optimise=args.optimise, fast_scan=args.fast_scan,
+                        interval=args.sample_interval / 1000, output=args.sample_output, memoise=args.memoise)
+        sys.exit(65 if hadError else 0)
+
+    for path in args.scripts:
+        run_file(path, resolve=args.resolve, backend=args.backend, fast_scan=args.fast_scan, stream=args.stream,
+                 pipeline=args.pipeline, optimise=args.optimise, cache=args.cache, memoise=args.memoise)
+    if hadError:
+        sys.exit(65)
+
+
+# Interactive menu - pick one of the test case files to run
+def interactive():
     try:
         while True:  # Wrap the main interaction in a loop
             # Reset the error flag for each iteration
@@ -54,28 +135,151 @@ def main():
         sys.exit(1)
 
 
-def run_file(path: str):
+# resolve - run the Resolver pass so local variables are addressed by (depth, slot)
+# backend - name of the execution engine in BACKENDS
+# fast_scan - use the Scanner's regex-driven fast scanning mode
+# stream - scan the file in chunks while parsing, instead of reading it all first
+# pipeline - run each top-level statement as soon as it is parsed, instead of parsing the whole program first
+# optimise - run the Optimiser's constant folding pass before resolving and running
+# cache - reuse the parsed program from program_cache when the file is unchanged (stream and pipeline are ignored)
+# memoise - remember the results of pure functions (whole programs only, not pipelined ones)
+def run_file(path: str, resolve: bool = False, backend: str = "tree", fast_scan: bool = False,
+             stream: bool = False, pipeline: bool = False, optimise: bool = False, cache: bool = False,
+             memoise: bool = True):
     with open(path, "r") as f:
-        run(f.read())
+        if cache:
+            run_cached(path, f.read(), resolve=resolve, backend=backend, fast_scan=fast_scan, optimise=optimise,
+                       memoise=memoise)
+        elif stream:
+            run_parser(StreamingParser(StreamingScanner(f).iter_tokens()), resolve=resolve, backend=backend,
+                       pipeline=pipeline, optimise=optimise, memoise=memoise)
+        else:
+            run(f.read(), resolve=resolve, backend=backend, fast_scan=fast_scan, pipeline=pipeline,
+                optimise=optimise, memoise=memoise)
+
 
+def run(src: str, resolve: bool = False, backend: str = "tree", fast_scan: bool = False,
+        pipeline: bool = False, optimise: bool = False, memoise: bool = True):
+    tokens = scan(src, fast_scan)
+    if tokens is not None:
+        run_parser(PrattParser(tokens), resolve=resolve, backend=backend, pipeline=pipeline, optimise=optimise,
+                   memoise=memoise)
 
-def run(src: str):
+
+# A cache hit skips the Scanner and Parser entirely, a miss parses the source and stores the result
+def run_cached(path: str, src: str, resolve: bool = False, backend: str = "tree", fast_scan: bool = False,
+               optimise: bool = False, memoise: bool = True):
+    global hadError
+    statements = program_cache.load(path, src)
+    outcome = "hit"
+    if statements is None:
+        outcome = "miss"
+        tokens = scan(src, fast_scan)
+        if tokens is None:
+            return
+        try:
+            statements = PrattParser(tokens).parse()
+        except Parser.ParseError as e:
+            print(f"Caught parse error: {e}", file=sys.stderr)
+            hadError = True
+            return
+        program_cache.store(path, src, statements)
+    print(f"Cache {outcome} for {path} ({program_cache.stats()})", file=sys.stderr)
+    run_statements(statements, resolve=resolve, backend=backend, optimise=optimise, memoise=memoise)
+
+
+# Run a file on the ProfilingInterpreter, print its report to stderr and save the data as JSON
+# json_path - where to write the profile, defaults to the script path plus '.profile.json'
+def profile_file(path: str, resolve: bool = False, optimise: bool = False, fast_scan: bool = False,
+                 json_path: str = None, memoise: bool = True):
+    with open(path, "r") as f:
+        src = f.read()
+    tokens = scan(src, fast_scan)
+    if tokens is None:
+        return
+    interpreter = ProfilingInterpreter(resolved=resolve, source=src)
+    run_parser(PrattParser(tokens), resolve=resolve, optimise=optimise, memoise=memoise, interpreter=interpreter)
+    print(interpreter.profile_report(), file=sys.stderr)
+    interpreter.write_profile(json_path or path + ".profile.json")
+
+
+# Run a file with a SamplingProfiler attached and write the samples as collapsed stacks for flamegraph tools
+# interval - seconds between samples
+# output - where to write the stacks, defaults to the script path plus '.collapsed'
+def sample_file(path: str, resolve: bool = False, optimise: bool = False, fast_scan: bool = False,
+                interval: float = 0.005, output: str = None, memoise: bool = True):
+    with open(path, "r") as f:
+        src = f.read()
+    tokens = scan(src, fast_scan)
+    if tokens is None:
+        return
+    interpreter = Interpreter(resolved=resolve)
+    profiler = SamplingProfiler(interpreter, interval=interval)
+    profiler.start()
+    try:
+        run_parser(PrattParser(tokens), resolve=resolve, optimise=optimise, memoise=memoise, interpreter=interpreter)
+    finally:
+        profiler.stop()
+    output = output or path + ".collapsed"
+    profiler.write_collapsed(output)
+    print(f"{profiler.total_samples()} samples written to {output}", file=sys.stderr)
+
+
+# Returns the tokens, or None after reporting a token error
+def scan(src: str, fast_scan: bool = False):
     global hadError
     scanner = Scanner(src)
     try:
-        tokens = scanner.scan_tokens()
+        return scanner.scan_tokens_fast() if fast_scan else scanner.scan_tokens()
     except RuntimeError as e:
         print(f"Caught token error: {e}", file=sys.stderr)
         hadError = True
+        return None
+
 
-    parser = Parser(tokens)
+# In pipeline mode a parse error is only found once the statements before it have run
+def run_parser(parser: Parser, resolve: bool = False, backend: str = "tree", pipeline: bool = False,
+               optimise: bool = False, memoise: bool = True, interpreter=None):
+    global hadError
     try:
-        statements = parser.parse()
-        interpreter = Interpreter()
-        interpreter.interpret(statements)
+        statements = parser.declarations() if pipeline else parser.parse()
+        run_statements(statements, resolve=resolve, backend=backend, optimise=optimise, memoise=memoise,
+                       interpreter=interpreter)
     except Parser.ParseError as e:
         print(f"Caught parse error: {e}", file=sys.stderr)
         hadError = True
+    except RuntimeError as e:
+        # A streaming scanner raises its token errors while the parser is pulling tokens
+        print(f"Caught token error: {e}", file=sys.stderr)
+        hadError = True
+
+
+# Statements are either a list or, for pipelined execution, an iterator that each pass handles one at a time
+# interpreter - run on this interpreter instead of a new one from BACKENDS
+def run_statements(statements, resolve: bool = False, backend: str = "tree", optimise: bool = False,
+                   memoise: bool = True, interpreter=None):
+    optimiser = Optimiser() if optimise else None
+    try:
+        if isinstance(statements, list):
+            if optimise:
+                statements = optimiser.optimise(statements)
+            if resolve:
+                Resolver().resolve(statements)
+            LoopAnalyser().analyse(statements)
+            if memoise:
+                PurityAnalyser().analyse(statements)
+        else:
+            if optimise:
+                statements = optimiser.optimise_each(statements)
+            if resolve:
+                statements = Resolver().resolve_each(statements)
+            statements = LoopAnalyser().analyse_each(statements)
+        if interpreter is None:
+            interpreter = BACKENDS[backend](resolved=resolve)
+        interpreter.interpret(statements)
+    finally:
+        if optimise:
+            print(f"Optimiser folded {optimiser.folded} node(s)", file=sys.stderr)
 
 if __name__ == "__main__":
     main()  # Execute the main function if this script is executed directly
@@ -4,6 +4,7 @@ from abc import ABC, abstractmethod
 
 '''
 Statements form a second hierarchy of syntax tree nodes independent of expressions
+Like Expr nodes, every statement class declares __slots__ instead of carrying a per-instance __dict__
 '''
 
 class Stmt(ABC):
@@ -11,8 +12,20 @@ class Stmt(ABC):
     # The curly-braced block statement that defines a local scope
     # "{" declaration* "}"
     class Block():
+        __slots__ = ("statements", "declares")
+
         def __init__(self, statements):
             self.statements = statements
+            # Whether the block declares any names of its own - a block that does not needs no new scope
+            self.declares = Stmt.Block.declares_names(statements)
+
+        # Nested blocks get scopes of their own, so only the block's direct statements matter
+        @staticmethod
+        def declares_names(statements):
+            for statement in statements:
+                if isinstance(statement, (Stmt.Var, Stmt.Function, Stmt.Class)):
+                    return True
+            return False
 
         def accept(self, visitor):
             return visitor.visitBlockStmt(self)
@@ -25,6 +38,8 @@ class Stmt(ABC):
     # Token name, List<Stmt.Function> methods
     # "class" IDENTIFIER "{" function* "}"
     class Class():
+        __slots__ = ("name", "superclass", "methods")
+
         def __init__(self, name, superclass, methods):
             self.name = name
             self.superclass = superclass
@@ -41,6 +56,8 @@ class Stmt(ABC):
     # Called from Interpreter.Accept - Checks expression
     # If expression accepted, call function visitExpressionStmt within interpreter
     class Expression():
+        __slots__ = ("expression",)
+
         def __init__(self, expression):
             self.expression = expression
 
@@ -54,10 +71,21 @@ class Stmt(ABC):
     # IDENTIFIER "(" parameters? ")" block
     # Token name, List<Token> params," + " List<Stmt> body",
     class Function():
+        __slots__ = ("name", "params", "body", "pure", "cell", "upvalues", "param_cells")
+
         def __init__(self, name, params, body):
             self.name = name
             self.params = params
             self.body = body
+            # Set by Memo.PurityAnalyser - calls depend only on their arguments, so results can be remembered
+            self.pure = False
+            # Set by the Resolver, see Environment.capture()
+            # cell - the function's own name is captured by a closure, so it is defined as a Cell
+            # upvalues - (depth, slot) of every Cell the function captures, from where it is declared
+            # param_cells - indexes of the parameters captured by closures, None when there are none
+            self.cell = False
+            self.upvalues = ()
+            self.param_cells = None
 
         def accept(self, visitor):
             return visitor.visitFunctionStmt(self)
@@ -69,6 +97,8 @@ class Stmt(ABC):
     # if statement conditionally executes statements
     # "if" "(" expression ")" statement ( "else" statement )?
     class If():
+        __slots__ = ("condition", "thenBranch", "elseBranch")
+
         def __init__(self, condition, thenBranch, elseBranch):
             self.condition = condition
             self.thenBranch = thenBranch
@@ -84,6 +114,8 @@ class Stmt(ABC):
     # Print statement evaluates an expression and displays the result to the user
     # "print" expression ";"
     class Print():
+        __slots__ = ("expression",)
+
         def __init__(self, expression):
             self.expression = expression
 
@@ -97,6 +129,8 @@ class Stmt(ABC):
     # Dedicated syntax for emitting a result - return statements
     # "return" expression? ";"
     class Return():
+        __slots__ = ("keyword", "value")
+
         def __init__(self, keyword, value):
             self.keyword = keyword
             self.value = value
@@ -112,9 +146,13 @@ class Stmt(ABC):
     # Token name, Expr initialiser
     # It stores the name token so we know what it’s declaring, along with the initialiser expression
     class Var():
+        __slots__ = ("name", "initialiser", "cell")
+
         def __init__(self, name, initialiser):
             self.name = name
             self.initialiser = initialiser
+            # The variable is captured by a closure, so it is defined as a Cell - set by the Resolver
+            self.cell = False
 
         def accept(self, visitor):
             return visitor.visitVarStmt(self)
@@ -126,9 +164,13 @@ class Stmt(ABC):
     # "while" "(" expression ")" statement
     # Expr condition, Stmt body
     class While():
+        __slots__ = ("condition", "body", "counted")
+
         def __init__(self, condition, body):
             self.condition = condition
             self.body = body
+            # Loops.CountedLoop set by Loops.LoopAnalyser - a for loop whose counter can be driven natively
+            self.counted = None
 
         def accept(self, visitor):
             return visitor.visitWhileStmt(self)
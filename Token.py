@@ -3,6 +3,9 @@ from TokenType import TokenType
 
 class Token:
     # Class for token in the source code
+    # Slotted - a script produces one Token per lexeme, so no per-instance __dict__
+    __slots__ = ("type", "lexeme", "literal", "line")
+
     def __init__(self, type: TokenType, lexeme: str, literal: object, line: int):
         self.type = type  # Token type (e.g., TokenType.IDENTIFIER, TokenType.NUMBER)
         self.lexeme = lexeme  # The actual text of the token
@@ -0,0 +1,370 @@
+# VM.py
+from Bytecode import OpCode
+from Callable import Callable
+from Natives import VARIADIC, define_natives
+from Rope import Rope, concat
+from Output import OutputSink
+from Compiler import Compiler
+from Environment import Environment, SlotEnvironment, Cell, capture
+
+'''
+Stack-based virtual machine for the bytecode produced by Compiler
+A single dispatch loop runs the instructions of the current chunk. Calls between StarlingScript
+functions push a frame onto a heap-allocated frame list instead of recursing in Python,
+so script recursion depth is limited only by memory. A tail call ('return f(...)') replaces the
+running frame instead of pushing a new one, so tail recursion runs in constant space.
+Variables live in the same Environment objects as the tree-walking Interpreter, so programs
+behave identically on both.
+'''
+
+# Opcodes as plain ints for the dispatch loop
+CONSTANT = int(OpCode.CONSTANT)
+NIL = int(OpCode.NIL)
+TRUE = int(OpCode.TRUE)
+FALSE = int(OpCode.FALSE)
+POP = int(OpCode.POP)
+GET_VAR = int(OpCode.GET_VAR)
+SET_VAR = int(OpCode.SET_VAR)
+DEFINE = int(OpCode.DEFINE)
+GET_LOCAL = int(OpCode.GET_LOCAL)
+SET_LOCAL = int(OpCode.SET_LOCAL)
+ADD = int(OpCode.ADD)
+SUBTRACT = int(OpCode.SUBTRACT)
+MULTIPLY = int(OpCode.MULTIPLY)
+DIVIDE = int(OpCode.DIVIDE)
+POWER = int(OpCode.POWER)
+GREATER = int(OpCode.GREATER)
+GREATER_EQUAL = int(OpCode.GREATER_EQUAL)
+LESS = int(OpCode.LESS)
+LESS_EQUAL = int(OpCode.LESS_EQUAL)
+EQUAL = int(OpCode.EQUAL)
+NOT_EQUAL = int(OpCode.NOT_EQUAL)
+NOT = int(OpCode.NOT)
+NEGATE = int(OpCode.NEGATE)
+PRINT = int(OpCode.PRINT)
+JUMP = int(OpCode.JUMP)
+POP_JUMP_IF_FALSE = int(OpCode.POP_JUMP_IF_FALSE)
+JUMP_IF_FALSE_OR_POP = int(OpCode.JUMP_IF_FALSE_OR_POP)
+JUMP_IF_TRUE_OR_POP = int(OpCode.JUMP_IF_TRUE_OR_POP)
+PUSH_SCOPE = int(OpCode.PUSH_SCOPE)
+POP_SCOPE = int(OpCode.POP_SCOPE)
+CLOSURE = int(OpCode.CLOSURE)
+CALL = int(OpCode.CALL)
+RETURN = int(OpCode.RETURN)
+HALT = int(OpCode.HALT)
+TAIL_CALL = int(OpCode.TAIL_CALL)
+GET_CELL = int(OpCode.GET_CELL)
+SET_CELL = int(OpCode.SET_CELL)
+CELL = int(OpCode.CELL)
+CLOSURE_CELL = int(OpCode.CLOSURE_CELL)
+
+# Returned by run() when a script reaches HALT rather than a 'return'
+HALTED = object()
+
+
+# Define a function's parameters in its new environment, wrapping the ones closures capture in Cells
+def bind_cells(environment, proto, arguments):
+    cells = proto.param_cells
+    for index, (name, value) in enumerate(zip(proto.params, arguments)):
+        environment.define(name, Cell(value) if index in cells else value)
+
+
+class VMFunction(Callable):
+    '''
+    Runtime function value for the VM - a compiled FunctionProto plus its closure scope (see Environment.capture)
+    '''
+    def __init__(self, proto, closure):
+        self.proto = proto
+        self.closure = closure
+
+    # Calls from inside the VM never get here - the CALL instruction pushes a frame directly.
+    # Used when something outside the dispatch loop needs to invoke the function.
+    def call(self, interpreter, arguments):
+        return interpreter.call_function(self, arguments)
+
+    def arity(self):
+        return len(self.proto.params)
+
+    def __str__(self):
+        return str(self.proto)
+
+
+class VM:
+    # resolved - statements have been annotated by the Resolver, local scopes use SlotEnvironment
+    # output - OutputSink the print statement writes to, as in Interpreter
+    def __init__(self, resolved=False, output=None):
+        # Per-instance global scope, as in Interpreter
+        self.globals = Environment(enclosing=None)
+        define_natives(self.globals)
+        self.environment = self.globals
+        # Set once a runtime error has stopped a script, like StarlingScript.hadError for parse errors
+        self.hadRuntimeError = False
+        self.output = output if output is not None else OutputSink()
+        self.new_scope = SlotEnvironment if resolved else Environment
+
+    # Compile and run each top-level statement as its own script, so statements can come from an iterator
+    # Globals live in self.environment, so later statements see what earlier ones defined
+    def interpret(self, statements):
+        compiler = Compiler()
+        try:
+            for statement in statements:
+                script = compiler.compile([statement])
+                try:
+                    # Anything but HALTED means a 'return' at the top level, which ends the program
+                    if self.run(script.chunk, self.environment) is not HALTED:
+                        break
+                except RuntimeError as error:
+                    self.hadRuntimeError = True
+                    self.output.write_line(f"\033[91mError: {error.args[1]}\033[0m")
+                    break
+        finally:
+            self.output.flush()
+
+    # Run a VMFunction to completion from outside the dispatch loop
+    def call_function(self, function, arguments):
+        environment = self.new_scope(function.closure)
+        if function.proto.param_cells is None:
+            for name, value in zip(function.proto.params, arguments):
+                environment.define(name, value)
+        else:
+            bind_cells(environment, function.proto, arguments)
+        return self.run(function.proto.chunk, environment)
+
+    # The dispatch loop
+    # A 'return' in the outermost frame ends the run - for the top-level script that ends the program
+    def run(self, chunk, env):
+        new_scope = self.new_scope
+        write_line = self.output.write_line
+        code = chunk.code
+        constants = chunk.constants
+        ip = 0
+        stack = []
+        # Stack base of the running function - everything at or above it belongs to the frame
+        base = 0
+        # Saved (chunk, code, constants, ip, env, base) of every caller
+        frames = []
+
+        while True:
+            op = code[ip]
+
+            if op == GET_VAR:
+                stack.append(env.get(constants[code[ip + 1]]))
+                ip += 2
+            elif op == GET_LOCAL:
+                stack.append(env.get_at(code[ip + 1], code[ip + 2]))
+                ip += 3
+            elif op == CONSTANT:
+                stack.append(constants[code[ip + 1]])
+                ip += 2
+            elif op == POP_JUMP_IF_FALSE:
+                value = stack.pop()
+                if value is None or value is False:
+                    ip = code[ip + 1]
+                else:
+                    ip += 2
+            elif op == ADD:
+                right = stack.pop()
+                left = stack[-1]
+                # If either operand is a string, treat the operation as string concatenation
+                if left.__class__ is str or right.__class__ is str or left.__class__ is Rope or right.__class__ is Rope:
+                    stack[-1] = concat(left, right)
+                else:
+                    stack[-1] = left + right
+                ip += 1
+            elif op == SUBTRACT:
+                right = stack.pop()
+                stack[-1] = stack[-1] - right
+                ip += 1
+            elif op == LESS:
+                right = stack.pop()
+                stack[-1] = stack[-1] < right
+                ip += 1
+            elif op == LESS_EQUAL:
+                right = stack.pop()
+                stack[-1] = stack[-1] <= right
+                ip += 1
+            elif op == GREATER:
+                right = stack.pop()
+                stack[-1] = stack[-1] > right
+                ip += 1
+            elif op == GREATER_EQUAL:
+                right = stack.pop()
+                stack[-1] = stack[-1] >= right
+                ip += 1
+            elif op == EQUAL:
+                right = stack.pop()
+                stack[-1] = stack[-1] == right
+                ip += 1
+            elif op == NOT_EQUAL:
+                right = stack.pop()
+                stack[-1] = stack[-1] != right
+                ip += 1
+            elif op == MULTIPLY:
+                right = stack.pop()
+                stack[-1] = stack[-1] * right
+                ip += 1
+            elif op == DIVIDE:
+                right = stack.pop()
+                stack[-1] = stack[-1] / right
+                ip += 1
+            elif op == POWER:
+                right = stack.pop()
+                stack[-1] = stack[-1] ** right
+                ip += 1
+            elif op == SET_VAR:
+                env.assign(constants[code[ip + 1]], stack[-1])
+                ip += 2
+            elif op == SET_LOCAL:
+                env.assign_at(code[ip + 1], code[ip + 2], stack[-1])
+                ip += 3
+            elif op == POP:
+                stack.pop()
+                ip += 1
+            elif op == JUMP:
+                ip = code[ip + 1]
+            elif op == CALL:
+                count = code[ip + 1]
+                callee_index = len(stack) - count - 1
+                callee = stack[callee_index]
+                if isinstance(callee, VMFunction):
+                    proto = callee.proto
+                    if count != len(proto.params):
+                        raise RuntimeError(None, f"Expected {len(proto.params)} arguments but got {count}. Line: {chunk.line_at(ip)}")
+                    environment = new_scope(callee.closure)
+                    if proto.param_cells is None:
+                        for i in range(count):
+                            environment.define(proto.params[i], stack[callee_index + 1 + i])
+                    else:
+                        bind_cells(environment, proto, stack[callee_index + 1:])
+                    del stack[callee_index:]
+                    # Push the caller's frame and switch to the callee
+                    frames.append((chunk, code, constants, ip + 2, env, base))
+                    chunk = proto.chunk
+                    code = chunk.code
+                    constants = chunk.constants
+                    ip = 0
+                    env = environment
+                    base = callee_index
+                    continue
+                # Check if the callee is a callable object
+                # Natives and any other Callable - values that cannot be called have no arity()
+                try:
+                    arity = callee.arity()
+                except AttributeError:
+                    raise RuntimeError(None, f"Can only call functions and classes. Line: {chunk.line_at(ip)}")
+                if arity != count and arity != VARIADIC:
+                    raise RuntimeError(None, f"Expected {arity} arguments but got {count}. Line: {chunk.line_at(ip)}")
+                arguments = stack[callee_index + 1:]
+                del stack[callee_index:]
+                stack.append(callee.call(self, arguments))
+                ip += 2
+            elif op == RETURN:
+                value = stack.pop()
+                if not frames:
+                    return value
+                del stack[base:]
+                chunk, code, constants, ip, env, base = frames.pop()
+                stack.append(value)
+            elif op == TAIL_CALL:
+                count = code[ip + 1]
+                callee_index = len(stack) - count - 1
+                callee = stack[callee_index]
+                if isinstance(callee, VMFunction):
+                    proto = callee.proto
+                    if count != len(proto.params):
+                        raise RuntimeError(None, f"Expected {len(proto.params)} arguments but got {count}. Line: {chunk.line_at(ip)}")
+                    environment = new_scope(callee.closure)
+                    if proto.param_cells is None:
+                        for i in range(count):
+                            environment.define(proto.params[i], stack[callee_index + 1 + i])
+                    else:
+                        bind_cells(environment, proto, stack[callee_index + 1:])
+                    # The callee takes over this frame - its stack space, and the caller it returns to
+                    del stack[base:]
+                    chunk = proto.chunk
+                    code = chunk.code
+                    constants = chunk.constants
+                    ip = 0
+                    env = environment
+                    continue
+                # Natives and any other Callable - values that cannot be called have no arity()
+                try:
+                    arity = callee.arity()
+                except AttributeError:
+                    raise RuntimeError(None, f"Can only call functions and classes. Line: {chunk.line_at(ip)}")
+                if arity != count and arity != VARIADIC:
+                    raise RuntimeError(None, f"Expected {arity} arguments but got {count}. Line: {chunk.line_at(ip)}")
+                value = callee.call(self, stack[callee_index + 1:])
+                # Then return its result, as RETURN does
+                if not frames:
+                    return value
+                del stack[base:]
+                chunk, code, constants, ip, env, base = frames.pop()
+                stack.append(value)
+            elif op == DEFINE:
+                env.define(constants[code[ip + 1]], stack.pop())
+                ip += 2
+            elif op == PUSH_SCOPE:
+                env = new_scope(env)
+                ip += 1
+            elif op == POP_SCOPE:
+                env = env.enclosing
+                ip += 1
+            elif op == JUMP_IF_FALSE_OR_POP:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip = code[ip + 1]
+                else:
+                    stack.pop()
+                    ip += 2
+            elif op == JUMP_IF_TRUE_OR_POP:
+                value = stack[-1]
+                if value is None or value is False:
+                    stack.pop()
+                    ip += 2
+                else:
+                    ip = code[ip + 1]
+            elif op == NIL:
+                stack.append(None)
+                ip += 1
+            elif op == TRUE:
+                stack.append(True)
+                ip += 1
+            elif op == FALSE:
+                stack.append(False)
+                ip += 1
+            elif op == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+                ip += 1
+            elif op == NEGATE:
+                stack[-1] = -stack[-1]
+                ip += 1
+            elif op == PRINT:
+                value = stack.pop()
+                write_line('nil' if value is None else str(value))
+                ip += 1
+            elif op == CLOSURE:
+                proto = constants[code[ip + 1]]
+                stack.append(VMFunction(proto, capture(env, proto.upvalues)))
+                ip += 2
+            elif op == GET_CELL:
+                stack.append(env.get_at(code[ip + 1], code[ip + 2]).value)
+                ip += 3
+            elif op == SET_CELL:
+                env.get_at(code[ip + 1], code[ip + 2]).value = stack[-1]
+                ip += 3
+            elif op == CELL:
+                stack[-1] = Cell(stack[-1])
+                ip += 1
+            elif op == CLOSURE_CELL:
+                # The Cell is defined before the function captures it, so the function can capture itself
+                proto = constants[code[ip + 1]]
+                cell = Cell(None)
+                env.define(proto.name.lexeme, cell)
+                cell.value = VMFunction(proto, capture(env, proto.upvalues))
+                ip += 2
+            elif op == HALT:
+                return HALTED
+            else:
+                raise RuntimeError(None, f"Unknown opcode {op} at offset {ip}.")
@@ -0,0 +1,41 @@
+# bench_batch.py
+# Many scripts run one after another in this process versus on the Batch process pool
+import os
+import shutil
+import sys
+import tempfile
+
+import bench_util
+from bench_util import best_time, report, ROOT
+import Batch
+import StarlingScript
+
+COPIES = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+
+# test_cases4.txt spends most of its time in a recursive Fibonacci, so each script is a real unit of work -
+# as long as memoisation is off, which would otherwise remember every call and leave almost nothing to run
+SCRIPT = "test_cases4.txt"
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for n in range(COPIES):
+            shutil.copy(os.path.join(ROOT, SCRIPT), os.path.join(directory, f"script{n}.txt"))
+        paths = Batch.expand_paths([directory])
+
+        sequential_time, _ = best_time(lambda: [StarlingScript.run_file(path, memoise=False) for path in paths], repeat=1)
+        summary = None
+
+        def batch():
+            nonlocal summary
+            summary = Batch.run_batch(paths, memoise=False)
+        batch_time, _ = best_time(batch, repeat=1)
+
+        print(f"{COPIES} copies of {SCRIPT} without memoisation, {summary['workers']} worker(s)")
+        report("Sequential", sequential_time, f"{COPIES / sequential_time:>6.1f} scripts/s")
+        report("Process pool", batch_time,
+               f"{COPIES / batch_time:>6.1f} scripts/s  {sequential_time / batch_time:.2f}x  {summary['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# bench_cache.py
+# Time to get the Stmt list for a large script - scanning and parsing versus loading it from the ProgramCache -
+# and the size of the cache entry against the script
+import os
+import sys
+import tempfile
+
+import bench_util
+from bench_util import best_time, generate_script, report
+from Scanner import Scanner
+from Parser import Parser
+from Cache import ProgramCache
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+
+def main():
+    source = generate_script(SIZE)
+    print(f"Synthetic script: {len(source) / 1e6:.1f} MB")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ProgramCache(directory)
+        path = os.path.join(directory, "generated.txt")
+        parse_time, _ = best_time(lambda: Parser(Scanner(source).scan_tokens()).parse(), repeat=1)
+        cache.store(path, source, Parser(Scanner(source).scan_tokens()).parse())
+        load_time, _ = best_time(lambda: cache.load(path, source))
+        entry_size = os.path.getsize(os.path.join(directory, os.listdir(directory)[0]))
+        report("Scan and parse", parse_time)
+        report("Cache hit", load_time, f"{parse_time / load_time:.1f}x  ({cache.stats()})")
+        print(f"Cache entry: {entry_size / 1e6:.2f} MB, {entry_size / len(source):.2f}x the size of the source")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# bench_closure.py
+# Tree-walking Interpreter against the closure compilation engine on the fib loop from test_cases4.txt
+import bench_util
+from bench_util import best_time, report
+from Scanner import Scanner
+from Parser import Parser
+from Interpreter import Interpreter
+from ClosureCompiler import ClosureInterpreter
+
+COUNT = 20
+
+SOURCE = f"""
+fun fib(n) {{
+  if (n <= 1) return n;
+  return fib(n - 2) + fib(n - 1);
+}}
+
+for (var i = 0; i < {COUNT}; i = i + 1) {{
+  print fib(i);
+}}
+"""
+
+
+def run(engine):
+    statements = Parser(Scanner(SOURCE).scan_tokens()).parse()
+    interpreter = engine()
+    return lambda: interpreter.interpret(statements)
+
+
+def main():
+    print(f"fib(0) .. fib({COUNT - 1})")
+    tree_time, tree_output = best_time(run(Interpreter))
+    closure_time, closure_output = best_time(run(ClosureInterpreter))
+    assert tree_output == closure_output, "Closure engine printed different output"
+    report("Interpreter (tree-walking)", tree_time)
+    report("ClosureInterpreter", closure_time, f"{tree_time / closure_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
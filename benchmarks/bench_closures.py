@@ -0,0 +1,86 @@
+# bench_closures.py
+# Memory held by a million live closures on the resolved tree-walker, measured with tracemalloc:
+# closures keeping their whole declaring environment chain, as they used to, against flat closures
+# that keep only the Cells of the variables they use
+import sys
+import time
+import tracemalloc
+
+import bench_util
+from Scanner import Scanner
+from Parser import Parser
+from Resolver import Resolver
+from Interpreter import Interpreter
+from Function import Function
+from Output import OutputSink
+
+CLOSURES = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+# Each closure only needs 'previous', which keeps the closure before it alive - a chain of every closure made.
+# The call that makes it also has a label string and a few numbers a whole-environment closure would keep.
+SOURCE = f"""
+fun wrap(previous, index) {{
+  var label = "closure number {'.' * 64} " + index;
+  var square = index * index;
+  var half = index / 2;
+  fun next() {{ return previous; }}
+  return next;
+}}
+var head = nil;
+for (var i = 0; i < {CLOSURES}; i = i + 1) head = wrap(head, i);
+var length = 0;
+while (head != nil) {{ head = head(); length = length + 1; }}
+print length;
+"""
+
+
+# Resolves as before flat closures - every local addressed along the full scope chain, nothing captured
+class ChainResolver(Resolver):
+    def resolve_local(self, name, node):
+        functions = self.functions
+        self.functions = []
+        try:
+            return super().resolve_local(name, node)
+        finally:
+            self.functions = functions
+
+
+# Functions keep the environment they are declared in, and everything it encloses
+class ChainInterpreter(Interpreter):
+    def visitFunctionStmt(self, stmt):
+        self.environment.define(stmt.name.lexeme, Function(stmt, self.environment))
+        return None
+
+
+# Run the script up to the point every closure is alive, returns (seconds, bytes held by the closures)
+# The last three statements walk the chain to check it, after the measurement
+def measure(resolver_class, interpreter_class):
+    statements = Parser(Scanner(SOURCE).scan_tokens()).parse()
+    resolver_class().resolve(statements)
+    output = OutputSink.in_memory()
+    interpreter = interpreter_class(resolved=True, output=output)
+    build, check = statements[:-3], statements[-3:]
+    tracemalloc.start()
+    start = time.perf_counter()
+    before = tracemalloc.get_traced_memory()[0]
+    interpreter.interpret(build)
+    held = tracemalloc.get_traced_memory()[0] - before
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    interpreter.interpret(check)
+    assert output.getvalue() == f"{CLOSURES}\n", "Closure chain is broken"
+    return elapsed, held
+
+
+def main():
+    print(f"{CLOSURES:,} closures")
+    chain_time, chain_bytes = measure(ChainResolver, ChainInterpreter)
+    print(f"{'Whole environment chain':<28} {chain_bytes / 1e6:>8.1f} MB  {chain_bytes / CLOSURES:>6.1f} bytes/closure"
+          f"  {chain_time:.1f} s")
+    flat_time, flat_bytes = measure(Resolver, Interpreter)
+    print(f"{'Flat closures':<28} {flat_bytes / 1e6:>8.1f} MB  {flat_bytes / CLOSURES:>6.1f} bytes/closure"
+          f"  {flat_time:.1f} s  {chain_bytes / flat_bytes:.2f}x less memory")
+
+
+if __name__ == "__main__":
+    main()
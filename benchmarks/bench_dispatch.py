@@ -0,0 +1,74 @@
+# bench_dispatch.py
+# Node visits per second over test_cases3.txt: the old isinstance chain / accept() dispatch
+# against the cached per-class dispatch tables in Dispatch.py
+import bench_util
+from bench_util import best_time, read_source, report
+from Scanner import Scanner
+from Parser import Parser
+from Interpreter import Interpreter
+from Expr import Expr
+
+REPEAT = 20
+
+
+# Dispatch as it was - isinstance chain for expressions, accept() for statements
+class ChainInterpreter(Interpreter):
+    def evaluate(self, expr):
+        if isinstance(expr, Expr.Binary):
+            return self.visitBinaryExpr(expr)
+        elif isinstance(expr, Expr.Grouping):
+            return self.evaluate(expr.expression)
+        elif isinstance(expr, Expr.Literal):
+            return self.visitLiteralExpr(expr)
+        elif isinstance(expr, Expr.Unary):
+            return self.visitUnaryExpr(expr)
+        elif isinstance(expr, Expr.Logical):
+            return self.visitLogicalExpr(expr)
+        elif isinstance(expr, Expr.Variable):
+            return self.visitVariableExpr(expr)
+        elif isinstance(expr, Expr.Assign):
+            return self.visitAssignExpr(expr)
+        elif isinstance(expr, Expr.Call):
+            return self.visitCallExpr(expr)
+
+    def execute(self, stmt):
+        return stmt.accept(self)
+
+
+# Counts every evaluate()/execute() call, only used to size the workload
+class CountingInterpreter(Interpreter):
+    visits = 0
+
+    def evaluate(self, expr):
+        CountingInterpreter.visits += 1
+        return super().evaluate(expr)
+
+    def execute(self, stmt):
+        CountingInterpreter.visits += 1
+        return super().execute(stmt)
+
+
+def run(engine, statements):
+    interpreter = engine()
+
+    def run_repeatedly():
+        for _ in range(REPEAT):
+            interpreter.interpret(statements)
+    return run_repeatedly
+
+
+def main():
+    statements = Parser(Scanner(read_source("test_cases3.txt")).scan_tokens()).parse()
+    best_time(run(CountingInterpreter, statements), repeat=1)
+    visits = CountingInterpreter.visits
+    print(f"test_cases3.txt x {REPEAT} - {visits} node visits")
+
+    chain_time, chain_output = best_time(run(ChainInterpreter, statements), repeat=5)
+    table_time, table_output = best_time(run(Interpreter, statements), repeat=5)
+    assert chain_output == table_output, "Dispatch tables printed different output"
+    report("isinstance chain / accept()", chain_time, f"{visits / chain_time:>10.0f} visits/s")
+    report("cached dispatch tables", table_time, f"{visits / table_time:>10.0f} visits/s  {chain_time / table_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
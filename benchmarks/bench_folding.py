@@ -0,0 +1,52 @@
+# bench_folding.py
+# Loop full of constant subexpressions, run as written and after the Optimiser's constant folding pass
+import bench_util
+from bench_util import best_time, report
+from Scanner import Scanner
+from Parser import Parser
+from Optimiser import Optimiser
+from Interpreter import Interpreter
+
+ITERATIONS = 20000
+
+# The kind of code our script generators emit - every subexpression but 'i' is constant
+SOURCE = f"""
+var i = 0;
+var total = 0;
+var label = "";
+while (i < {ITERATIONS}) {{
+  total = total + (10 * 2) / 6 + 2 ^ 3 - -1;
+  label = "foo" + "bar";
+  if (!false and (1 < 2 | nil)) total = total + 1;
+  if (false) print "debug";
+  i = i + 1;
+}}
+print total;
+print label;
+"""
+
+
+def run(optimise):
+    statements = Parser(Scanner(SOURCE).scan_tokens()).parse()
+    folded = 0
+    if optimise:
+        optimiser = Optimiser()
+        statements = optimiser.optimise(statements)
+        folded = optimiser.folded
+    interpreter = Interpreter()
+    return lambda: interpreter.interpret(statements), folded
+
+
+def main():
+    print(f"Constant subexpressions in a loop, {ITERATIONS} iterations")
+    plain, _ = run(optimise=False)
+    optimised, folded = run(optimise=True)
+    plain_time, plain_output = best_time(plain)
+    folded_time, folded_output = best_time(optimised)
+    assert plain_output == folded_output, "Optimised run printed different output"
+    report("As written", plain_time)
+    report("Constant folded", folded_time, f"{plain_time / folded_time:.2f}x  ({folded} nodes folded)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# bench_inline_cache.py
+# Binary operators per second on the tree-walker: the operator if/elif chain against inline caches,
+# on an arithmetic loop and on a function whose '+' sees numbers and strings, then the per-site statistics
+import sys
+
+import bench_util
+from bench_util import best_time, report
+from Program import Program
+from Interpreter import Interpreter
+from TokenType import TokenType
+from Rope import Rope, concat
+import InlineCache
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+
+# Ten binary operators per iteration - most sites always see the same operand types, the two that
+# start on integers and go on with a float are polymorphic
+ARITHMETIC = f"""
+var total = 0;
+var label = "";
+for (var i = 0; i < {ITERATIONS}; i = i + 1) {{
+  total = total + i * 2 - i / 4;
+  if (i == 7) label = "seven: " + i;
+  total = total - (i ^ 1) + 1;
+}}
+print total;
+print label;
+"""
+
+# add() sees numbers and strings from alternating call sites
+POLYMORPHIC = f"""
+fun add(a, b) {{ return a + b; }}
+var total = 0;
+var text = "";
+for (var i = 0; i < {ITERATIONS}; i = i + 1) {{
+  total = add(total, i);
+  if (i < 10) text = add(text, i);
+}}
+print total;
+print text;
+"""
+
+
+# Operator selection as it was - test the operator against each token type in turn
+class ChainInterpreter(Interpreter):
+    def visitBinaryExpr(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if expr.operator.type == TokenType.GREATER:
+            return left > right
+        elif expr.operator.type == TokenType.GREATER_EQUAL:
+            return left >= right
+        elif expr.operator.type == TokenType.LESS:
+            return left < right
+        elif expr.operator.type == TokenType.LESS_EQUAL:
+            return left <= right
+        elif expr.operator.type == TokenType.MINUS:
+            return left - right
+        elif expr.operator.type == TokenType.PLUS:
+            if left.__class__ is str or right.__class__ is str or left.__class__ is Rope or right.__class__ is Rope:
+                return concat(left, right)
+            else:
+                return left + right
+        elif expr.operator.type == TokenType.SLASH:
+            return left / right
+        elif expr.operator.type == TokenType.STAR:
+            return left * right
+        elif expr.operator.type == TokenType.BANG_EQUAL:
+            return left != right
+        elif expr.operator.type == TokenType.EQUAL_EQUAL:
+            return left == right
+        elif expr.operator.type == TokenType.CARET:
+            return left ** right
+
+
+# Binary evaluations over every cached run, counted from the statistics
+def evaluations(program):
+    return sum(site["hits"] + site["misses"] for site in program.inline_cache_stats())
+
+
+def main():
+    for label, source in (("Arithmetic loop", ARITHMETIC), ("Polymorphic '+'", POLYMORPHIC)):
+        program = Program.from_source(source)
+        chain_time, chain_output = best_time(lambda: ChainInterpreter().interpret(program.statements))
+        cached_time, cached_output = best_time(lambda: program.run())
+        assert chain_output == cached_output, "Inline caches printed different output"
+        # best_time() runs the Program three times
+        count = evaluations(program) // 3
+        print(f"{label} - {count:,} binary operations per run")
+        report("  Operator chain", chain_time, f"{count / chain_time:,.0f} ops/s")
+        report("  Inline caches", cached_time, f"{count / cached_time:,.0f} ops/s  {chain_time / cached_time:.2f}x")
+        print(InlineCache.report(program.statements))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# bench_loops.py
+# Counted for loops on the tree-walker and closure backends: every iteration's comparison and increment run
+# through the interpreter, against the same loops annotated by LoopAnalyser and counted natively
+import sys
+
+import bench_util
+from bench_util import best_time, report
+from Scanner import Scanner
+from Parser import Parser
+from Resolver import Resolver
+from Loops import LoopAnalyser
+import StarlingScript
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+# A small body, so the loop's own overhead shows - plus a nested loop whose limit is the outer counter
+SOURCE = f"""
+var total = 0;
+for (var i = 0; i < {ITERATIONS}; i = i + 1) {{
+  total = total + i;
+}}
+print total;
+var pairs = 0;
+for (var i = 0; i < 450; i = i + 1) {{
+  for (var j = 0; j < i; j = j + 1) pairs = pairs + 1;
+}}
+print pairs;
+"""
+
+
+def run(backend, resolve, counted):
+    statements = Parser(Scanner(SOURCE).scan_tokens()).parse()
+    if resolve:
+        Resolver().resolve(statements)
+    if counted:
+        LoopAnalyser().analyse(statements)
+    return best_time(lambda: StarlingScript.BACKENDS[backend](resolved=resolve).interpret(statements))
+
+
+def main():
+    iterations = ITERATIONS + 450 * 449 // 2 + 450
+    print(f"{iterations:,} loop iterations")
+    for backend in ("tree", "closure"):
+        for resolve in (False, True):
+            label = f"{backend}{' +resolve' if resolve else ''}"
+            plain_time, plain_output = run(backend, resolve, False)
+            counted_time, counted_output = run(backend, resolve, True)
+            assert plain_output == counted_output, "Counted loops printed different output"
+            report(f"{label} while loop", plain_time, f"{iterations / plain_time:,.0f} iterations/s")
+            report(f"{label} counted", counted_time,
+                   f"{iterations / counted_time:,.0f} iterations/s  {plain_time / counted_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
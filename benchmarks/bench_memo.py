@@ -0,0 +1,45 @@
+# bench_memo.py
+# Recursive fib on the tree-walker, with and without memoising pure functions
+import sys
+
+import bench_util
+from bench_util import best_time, report
+from Scanner import Scanner
+from Parser import Parser
+from Memo import PurityAnalyser
+from Interpreter import Interpreter
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+
+# fib from test_cases4.txt
+SOURCE = f"""
+fun fib(n) {{
+  if (n <= 1) return n;
+  return fib(n - 2) + fib(n - 1);
+}}
+print fib({N});
+"""
+
+
+def run(memoise):
+    statements = Parser(Scanner(SOURCE).scan_tokens()).parse()
+    if memoise:
+        PurityAnalyser().analyse(statements)
+    interpreter = Interpreter()
+    return lambda: interpreter.interpret(statements), interpreter
+
+
+def main():
+    print(f"fib({N})")
+    plain, _ = run(memoise=False)
+    memoised, interpreter = run(memoise=True)
+    # Exponential without memoisation - a single run is plenty
+    plain_time, plain_output = best_time(plain, repeat=1)
+    memo_time, memo_output = best_time(memoised)
+    assert plain_output == memo_output, "Memoised run printed different output"
+    report("Not memoised", plain_time)
+    report("Memoised", memo_time, f"{plain_time / memo_time:.0f}x  ({interpreter.memo.stats()})")
+
+
+if __name__ == "__main__":
+    main()
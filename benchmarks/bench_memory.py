@@ -0,0 +1,60 @@
+# bench_memory.py
+# Memory held by the token list and the syntax tree of a large synthetic script, measured with tracemalloc
+import sys
+import tracemalloc
+
+import bench_util
+from bench_util import generate_script
+from Scanner import Scanner
+from Parser import Parser
+from Dispatch import NODE_CLASSES
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+
+NODE_TYPES = {node_class for node_class, suffix in NODE_CLASSES}
+
+
+# Attribute values of a node, whether it stores them in __slots__ or a __dict__
+def fields(node):
+    names = getattr(type(node), '__slots__', None)
+    if names is None:
+        return list(vars(node).values())
+    return [getattr(node, name) for name in names]
+
+
+# Count every syntax tree node reachable from the statement list
+def count_nodes(statements):
+    count = 0
+    pending = list(statements)
+    while pending:
+        value = pending.pop()
+        if isinstance(value, list):
+            pending.extend(value)
+        elif type(value) in NODE_TYPES:
+            count += 1
+            pending.extend(fields(value))
+    return count
+
+
+def main():
+    source = generate_script(SIZE)
+    print(f"Synthetic script: {len(source)} characters")
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    tokens = Scanner(source).scan_tokens()
+    after_scan = tracemalloc.get_traced_memory()[0]
+    statements = Parser(tokens).parse()
+    after_parse = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    token_bytes = after_scan - start
+    ast_bytes = after_parse - after_scan
+    nodes = count_nodes(statements)
+    print(f"{len(tokens):>10} tokens     {token_bytes / 1e6:>8.1f} MB  {token_bytes / len(tokens):>6.1f} bytes/token")
+    print(f"{nodes:>10} AST nodes  {ast_bytes / 1e6:>8.1f} MB  {ast_bytes / nodes:>6.1f} bytes/node")
+    print(f"{'':>10} source     {len(source) / 1e6:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
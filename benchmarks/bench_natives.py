@@ -0,0 +1,81 @@
+# bench_natives.py
+# Calls per second through Interpreter.visitCallExpr: the old path (input special case, isinstance checks)
+# against the native registry's single arity check, then a benchmark timed from inside the script with clock()
+import sys
+
+import bench_util
+from bench_util import best_time, report
+from Scanner import Scanner
+from Parser import Parser
+from Interpreter import Interpreter
+from Callable import Callable
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+# Two calls per iteration - one script function, one native
+SOURCE = f"""
+fun add(a, b) {{ return a + b; }}
+var total = 0;
+for (var i = 0; i < {ITERATIONS}; i = i + 1) {{
+  total = add(total, abs(i));
+}}
+print total;
+"""
+
+# Timed by the script itself
+CLOCKED = f"""
+fun add(a, b) {{ return a + b; }}
+var start = clock();
+var total = 0;
+for (var i = 0; i < {ITERATIONS}; i = i + 1) {{
+  total = add(total, abs(i));
+}}
+print clock() - start;
+"""
+
+
+# Call path as it was - name check for input() on every call, then isinstance(Callable) twice
+class CheckingInterpreter(Interpreter):
+    def visitCallExpr(self, expr):
+        exprCheck = expr.callee.name.lexeme
+        if exprCheck == "input":
+            prompt = ""
+            if expr.arguments:
+                prompt = self.evaluate(expr.arguments[0])
+            return input(prompt)
+        callee = self.evaluate(expr.callee)
+
+        arguments = []
+        for argument in expr.arguments:
+            arguments.append(self.evaluate(argument))
+
+        if not isinstance(callee, Callable):
+            raise RuntimeError(f"Can only call functions and classes. Line: {expr.paren.line}")
+        if not isinstance(callee, Callable):
+            raise TypeError("Callee must be an instance of Callable")
+        if len(arguments) != callee.arity():
+            raise RuntimeError(f"Expected {callee.arity()} arguments but got {len(arguments)}. Line: {expr.paren.line}")
+        return callee.call(self, arguments)
+
+
+def run(interpreter_class, source=SOURCE):
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    interpreter = interpreter_class()
+    return best_time(lambda: interpreter.interpret(statements))
+
+
+def main():
+    calls = ITERATIONS * 2
+    print(f"{ITERATIONS} iterations, {calls} calls")
+    checked_time, checked_output = run(CheckingInterpreter)
+    native_time, native_output = run(Interpreter)
+    assert checked_output == native_output, "Native registry printed different output"
+    report("Old call path", checked_time, f"{calls / checked_time:,.0f} calls/s")
+    report("Native registry", native_time, f"{calls / native_time:,.0f} calls/s  {checked_time / native_time:.2f}x")
+
+    host_time, output = run(Interpreter, CLOCKED)
+    report("Measured with clock()", float(output.strip()), f"(host measured {host_time * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# bench_output.py
+# Lines printed per second by a print-heavy script: Python's print() for every line, as the print statement
+# used to run, against the buffered OutputSink, writing to a block-buffered file and a line-buffered one
+import os
+import sys
+import tempfile
+import time
+
+import bench_util
+from bench_util import report
+from Scanner import Scanner
+from Parser import Parser
+from Interpreter import Interpreter
+from Output import OutputSink
+
+LINES = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+SOURCE = f"""
+for (var i = 0; i < {LINES}; i = i + 1) {{
+  print "line " + i;
+}}
+"""
+
+
+# Print statement as it was - one print() call per line
+class PrintingInterpreter(Interpreter):
+    def visitPrintStmt(self, stmt):
+        value = self.evaluate(stmt.expression)
+        print(f"{self.stringify(value)}")
+
+
+# Run on a fresh interpreter with sys.stdout pointed at a temporary file, return (best seconds, file contents)
+# line_buffered - write the file a line at a time, as Python does for a terminal or with -u
+def run(interpreter_class, statements, line_buffered, repeat=3):
+    best = None
+    for _ in range(repeat):
+        descriptor, path = tempfile.mkstemp()
+        os.close(descriptor)
+        saved = sys.stdout
+        try:
+            with open(path, "w", buffering=1 if line_buffered else -1) as stream:
+                sys.stdout = stream
+                interpreter = interpreter_class(output=OutputSink(stream))
+                start = time.perf_counter()
+                interpreter.interpret(statements)
+                stream.flush()
+                elapsed = time.perf_counter() - start
+            with open(path) as f:
+                output = f.read()
+        finally:
+            sys.stdout = saved
+            os.remove(path)
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, output
+
+
+def main():
+    statements = Parser(Scanner(SOURCE).scan_tokens()).parse()
+    print(f"{LINES} lines")
+    for label, line_buffered in (("Block-buffered file", False), ("Line-buffered file", True)):
+        print(label)
+        print_time, print_output = run(PrintingInterpreter, statements, line_buffered)
+        sink_time, sink_output = run(Interpreter, statements, line_buffered)
+        assert print_output == sink_output, "OutputSink wrote different output"
+        report("  print() per line", print_time, f"{LINES / print_time:,.0f} lines/s")
+        report("  OutputSink", sink_time, f"{LINES / sink_time:,.0f} lines/s  {print_time / sink_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# bench_parser.py
+# Syntax tree nodes per second for the recursive descent Parser against the table-driven PrattParser,
+# over the tokens of a generated 5 MB script plus a file of long arithmetic expressions
+import gc
+import sys
+import time
+
+import bench_util
+from bench_util import generate_script, report
+from Scanner import Scanner
+from Parser import Parser, PrattParser
+from Dispatch import walk
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+
+# Expression-heavy lines, where nearly every token goes through the expression grammar
+EXPRESSION_TEMPLATE = "var e{n} = (a{n} + {n} * b - c / 2 ^ x) >= -d and f(g, {n} - 1) != h | !(i < j) & k == \"s\";\n"
+
+
+def generate_expressions(size):
+    parts = []
+    total = 0
+    n = 0
+    while total < size:
+        part = EXPRESSION_TEMPLATE.format(n=n)
+        parts.append(part)
+        total += len(part)
+        n += 1
+    return "".join(parts)
+
+
+# The garbage collector is paused while parsing - otherwise its passes over the growing tree, and any tree
+# still alive from the run before, take more time than the parsing does
+def parse(parser_class, tokens):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        statements = parser_class(tokens).parse()
+        return statements, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+# Node classes in walk order - equal for two parses only if they built the same shape of tree
+def shape(statements):
+    return [node.__class__ for node in walk(statements)]
+
+
+def main():
+    for label, source in (("Generated script", generate_script(SIZE)),
+                          ("Expressions", generate_expressions(SIZE // 5))):
+        tokens = Scanner(source).scan_tokens_fast()
+        descent_statements, descent_time = parse(Parser, tokens)
+        descent_shape = shape(descent_statements)
+        del descent_statements
+        pratt_statements, pratt_time = parse(PrattParser, tokens)
+        assert descent_shape == shape(pratt_statements), "PrattParser built a different tree"
+        del pratt_statements
+        nodes = len(descent_shape)
+        print(f"{label}: {len(source) / 1e6:.1f} MB, {len(tokens):,} tokens, {nodes:,} nodes")
+        report("  Parser", descent_time, f"{nodes / descent_time:>12,.0f} nodes/s")
+        report("  PrattParser", pratt_time, f"{nodes / pratt_time:>12,.0f} nodes/s  {descent_time / pratt_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# bench_pipeline.py
+# Time to first output and total time for a large script, whole-program versus pipelined execution
+import contextlib
+import sys
+import time
+
+import bench_util
+import StarlingScript
+
+STATEMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+# bench_util.generate_script() is only meant for scanning and parsing - its while loops never end
+STATEMENT_TEMPLATE = """var value{n} = {n} * 2 + 1;
+print "value " + value{n};
+"""
+
+
+# Discards script output, remembering when the first line was written
+class FirstWrite:
+    def __init__(self):
+        self.first = None
+
+    def write(self, text):
+        if self.first is None:
+            self.first = time.perf_counter()
+
+    def flush(self):
+        pass
+
+
+def measure(source, pipeline):
+    sink = FirstWrite()
+    with contextlib.redirect_stdout(sink):
+        start = time.perf_counter()
+        StarlingScript.run(source, fast_scan=True, pipeline=pipeline)
+        elapsed = time.perf_counter() - start
+    return sink.first - start, elapsed
+
+
+def main():
+    source = "".join(STATEMENT_TEMPLATE.format(n=n) for n in range(STATEMENTS // 2))
+    print(f"Synthetic script: {STATEMENTS} top-level statements")
+    for label, pipeline in (("whole program", False), ("pipelined", True)):
+        first, total = measure(source, pipeline)
+        bench_util.report(label, first, f"to first output, {total * 1000:.1f} ms total")
+
+
+if __name__ == "__main__":
+    main()
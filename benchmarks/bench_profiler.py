@@ -0,0 +1,109 @@
+# bench_profiler.py
+# Cost of profiling a recursive fib - plain Interpreter against the deterministic and sampling profilers
+import contextlib
+import io
+import sys
+import timeit
+
+import bench_util
+from bench_util import best_time, report
+from Scanner import Scanner
+from Parser import Parser
+from Interpreter import Interpreter
+from Profiler import ProfilingInterpreter, SamplingProfiler
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 22
+
+SOURCE = f"""
+fun fib(n) {{
+  if (n <= 1) return n;
+  return fib(n - 2) + fib(n - 1);
+}}
+print fib({N});
+"""
+
+
+# Sampling is meant to stay under this much overhead
+SAMPLING_BUDGET = 0.05
+
+
+def parse():
+    return Parser(Scanner(SOURCE).scan_tokens()).parse()
+
+
+ROUNDS = 7
+
+
+# Plain and sampled runs alternate, so both see the same machine conditions - returns the best time of each
+# and the number of samples taken per sampled run
+def plain_and_sampled(rounds=ROUNDS):
+    statements = parse()
+    plain_best = sampled_best = None
+    plain_output = sampled_output = None
+    samples = 0
+    for _ in range(rounds):
+        interpreter = Interpreter()
+        plain_time, plain_output = best_time(lambda: interpreter.interpret(statements), repeat=1)
+
+        interpreter = Interpreter()
+        profiler = SamplingProfiler(interpreter)
+        profiler.start()
+        try:
+            sampled_time, sampled_output = best_time(lambda: interpreter.interpret(statements), repeat=1)
+        finally:
+            profiler.stop()
+        samples += profiler.total_samples()
+
+        plain_best = plain_time if plain_best is None else min(plain_best, plain_time)
+        sampled_best = sampled_time if sampled_best is None else min(sampled_best, sampled_time)
+    assert plain_output == sampled_output, "Sampled run printed different output"
+    return plain_best, sampled_best, samples // rounds, plain_output
+
+
+# Call stack list that counts the calls pushed onto it
+class CountingStack(list):
+    pushes = 0
+
+    def append(self, value):
+        CountingStack.pushes += 1
+        super().append(value)
+
+
+# Seconds added per call (push and pop in Function.call) and per sample (copying the stack and counting it),
+# timed in isolation - whole-run timings on a busy machine vary by more than the overhead being measured
+def unit_costs(depth, number=200000):
+    stack = [None] * depth
+    samples = {}
+    push = timeit.timeit("stack.append(None)\ntry:\n    pass\nfinally:\n    stack.pop()",
+                         globals={"stack": stack}, number=number) / number
+    sample = timeit.timeit("s = tuple(stack); samples[s] = samples.get(s, 0) + 1",
+                           globals={"stack": stack, "samples": samples}, number=number) / number
+    return push, sample
+
+
+def main():
+    print(f"fib({N})")
+    plain_time, sampled_time, samples, plain_output = plain_and_sampled()
+    report("Interpreter", plain_time)
+    report("SamplingProfiler attached", sampled_time, f"{(sampled_time / plain_time - 1) * 100:+.1f}% measured")
+
+    interpreter = Interpreter()
+    interpreter.call_stack = CountingStack()
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(parse())
+    calls = CountingStack.pushes
+    push_cost, sample_cost = unit_costs(N)
+    bound = (calls * push_cost + samples * sample_cost) / plain_time
+    print(f"{'':<32} {calls} calls x {push_cost * 1e9:.0f} ns + {samples} samples x {sample_cost * 1e9:.0f} ns"
+          f" = {bound * 100:.2f}% of the plain run (budget {SAMPLING_BUDGET * 100:.0f}%"
+          f"{'' if bound <= SAMPLING_BUDGET else ', EXCEEDED'})")
+
+    statements = parse()
+    interpreter = ProfilingInterpreter(source=SOURCE)
+    profiled_time, profiled_output = best_time(lambda: interpreter.interpret(statements))
+    assert plain_output == profiled_output, "Profiled run printed different output"
+    report("ProfilingInterpreter", profiled_time, f"{(profiled_time / plain_time - 1) * 100:+.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# bench_program.py
+# A long-lived worker running the same script many times - re-scanning and re-parsing it for every run
+# versus parsing it once into a Program and running that on a fresh interpreter each time
+import sys
+import threading
+
+import bench_util
+from bench_util import best_time, read_source, report
+from Scanner import Scanner
+from Parser import Parser
+from Interpreter import Interpreter
+from Program import Program
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+SOURCE = read_source("test_cases1.txt")
+
+
+def reparse():
+    for _ in range(RUNS):
+        Interpreter().interpret(Parser(Scanner(SOURCE).scan_tokens()).parse())
+
+
+def reuse(program):
+    for _ in range(RUNS):
+        program.run()
+
+
+# The same Program shared by several threads, each run on its own interpreter
+def threaded(program, threads=4):
+    workers = [threading.Thread(target=lambda: [program.run() for _ in range(RUNS // threads)])
+               for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def main():
+    print(f"test_cases1.txt, {RUNS} runs")
+    program = Program.from_source(SOURCE)
+    reparse_time, reparse_output = best_time(reparse)
+    reuse_time, reuse_output = best_time(lambda: reuse(program))
+    threaded_time, threaded_output = best_time(lambda: threaded(program))
+    assert reparse_output == reuse_output, "Program runs printed different output"
+    assert len(threaded_output) == len(reuse_output), "Threaded runs printed a different amount of output"
+    report("Scan + parse every run", reparse_time, f"{RUNS / reparse_time:>8.0f} runs/s")
+    report("Shared Program", reuse_time, f"{RUNS / reuse_time:>8.0f} runs/s  {reparse_time / reuse_time:.2f}x")
+    report("Shared Program, 4 threads", threaded_time, f"{RUNS / threaded_time:>8.0f} runs/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# bench_recursion.py
+# Deep and mutual recursion on every backend - tail calls in constant stack, and the VM's heap-allocated frames
+import sys
+
+import bench_util
+from bench_util import best_time, report
+from Scanner import Scanner
+from Parser import Parser
+from StarlingScript import BACKENDS
+
+DEPTH = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+# Within Python's default recursion limit even for the tree-walker's nested frames
+SHALLOW = 100
+
+PROGRAMS = {
+    "tail recursion": """
+fun loop(n, acc) {{
+  if (n == 0) return acc;
+  return loop(n - 1, acc + 1);
+}}
+print loop({depth}, 0);
+""",
+    "mutual recursion": """
+fun isEven(n) {{ if (n == 0) return true; return isOdd(n - 1); }}
+fun isOdd(n) {{ if (n == 0) return false; return isEven(n - 1); }}
+print isEven({depth});
+""",
+    "non-tail recursion": """
+fun count(n) {{
+  if (n == 0) return 0;
+  return 1 + count(n - 1);
+}}
+print count({depth});
+""",
+}
+
+
+# tail_calls - False runs every call as a nested call, as before tail calls were recognised
+def run(source, backend, tail_calls=True):
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    interpreter = BACKENDS[backend]()
+    interpreter.tail_calls = tail_calls
+    return best_time(lambda: interpreter.interpret(statements))
+
+
+def main():
+    for name, template in PROGRAMS.items():
+        print(f"{name}, depth {DEPTH}")
+        for backend in BACKENDS:
+            seconds, output = run(template.format(depth=DEPTH), backend)
+            result = output.strip().splitlines()[-1] if output.strip() else ""
+            report(backend, seconds, f"{DEPTH / seconds:,.0f} calls/s" if "Error" not in result else result)
+        print()
+
+    # The same calls at a depth every mode can reach, with and without the tree-walker recognising tail calls
+    print(f"tail recursion, depth {SHALLOW}, tree-walker")
+    source = PROGRAMS["tail recursion"].format(depth=SHALLOW) * 100
+    nested_time, nested_output = run(source, "tree", tail_calls=False)
+    tail_time, tail_output = run(source, "tree")
+    assert nested_output == tail_output, "Tail calls printed different output"
+    report("Nested calls", nested_time)
+    report("Tail calls", tail_time, f"{nested_time / tail_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# bench_resolver.py
+# Compares name-based Environment lookups against Resolver (depth, slot) addressing
+# on test_cases3.txt-style nested while loops, run inside a function nested a few blocks deep
+import bench_util
+from bench_util import best_time, report
+from Scanner import Scanner
+from Parser import Parser
+from Resolver import Resolver
+from Interpreter import Interpreter
+
+OUTER = 200
+INNER = 200
+
+# Nested while loops from test_cases3.txt, wrapped in blocks so every lookup walks several scopes
+SOURCE = f"""
+fun nested() {{
+  var total = 0;
+  {{
+    var outer_count = 1;
+    {{
+      while (outer_count <= {OUTER}) {{
+        var inner_count = 1;
+        while (inner_count <= {INNER}) {{
+          total = total + inner_count;
+          inner_count = inner_count + 1;
+        }}
+        outer_count = outer_count + 1;
+      }}
+    }}
+  }}
+  print total;
+}}
+nested();
+"""
+
+
+def parse():
+    return Parser(Scanner(SOURCE).scan_tokens()).parse()
+
+
+def run(resolved):
+    statements = parse()
+    if resolved:
+        Resolver().resolve(statements)
+    interpreter = Interpreter(resolved=resolved)
+    return lambda: interpreter.interpret(statements)
+
+
+def main():
+    print(f"Nested while loops, {OUTER} x {INNER} iterations")
+    dict_time, dict_output = best_time(run(resolved=False))
+    slot_time, slot_output = best_time(run(resolved=True))
+    assert dict_output == slot_output, "Resolved run printed different output"
+    report("Environment (name lookup)", dict_time)
+    report("SlotEnvironment (resolved)", slot_time, f"{dict_time / slot_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# bench_return.py
+# Calls per second for recursive fib(25): 'return' as a raised exception (the old protocol)
+# against the Return completion handed back through execute()/executeBlock()
+import sys
+
+import bench_util
+from bench_util import best_time, report
+from Scanner import Scanner
+from Parser import Parser
+from Interpreter import Interpreter
+from Function import Function
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 25
+
+SOURCE = f"""
+fun fib(n) {{
+  if (n <= 1) return n;
+  return fib(n - 2) + fib(n - 1);
+}}
+print fib({N});
+"""
+
+
+# Old protocol - visitReturnStmt raised, Function.call caught
+class ReturnException(Exception):
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+class ExceptionFunction(Function):
+    def call(self, interpreter, arguments):
+        environment = interpreter.new_scope(self.closure)
+        for i in range(len(self.declaration.params)):
+            environment.define(self.declaration.params[i].lexeme, arguments[i])
+        try:
+            interpreter.executeBlock(self.declaration.body, environment)
+        except ReturnException as returnValue:
+            return returnValue.value
+        return None
+
+
+class ExceptionInterpreter(Interpreter):
+    def visitFunctionStmt(self, stmt):
+        self.environment.define(stmt.name.lexeme, ExceptionFunction(stmt, self.environment))
+        return None
+
+    def visitReturnStmt(self, stmt):
+        value = None
+        if stmt.value is not None:
+            value = self.evaluate(stmt.value)
+        raise ReturnException(value)
+
+
+# Number of StarlingScript calls made by fib(n)
+def call_count(n):
+    a, b = 1, 1
+    for _ in range(n):
+        a, b = b, a + b + 1
+    return a
+
+
+def run(engine):
+    statements = Parser(Scanner(SOURCE).scan_tokens()).parse()
+    interpreter = engine()
+    return lambda: interpreter.interpret(statements)
+
+
+def main():
+    calls = call_count(N)
+    print(f"fib({N}) - {calls} calls")
+    before, before_output = best_time(run(ExceptionInterpreter), repeat=1)
+    after, after_output = best_time(run(Interpreter), repeat=1)
+    assert before_output == after_output, "Completion protocol printed different output"
+    report("raise Return (before)", before, f"{calls / before:>10.0f} calls/s")
+    report("Return completion (after)", after, f"{calls / after:>10.0f} calls/s  {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# bench_ropes.py
+# Build a long string in a loop, as the README's shopping list does - plain string concatenation
+# against Ropes, at growing sizes, then a 10 MB string with Ropes - on the tree-walker and the closure backend
+import sys
+
+import bench_util
+from bench_util import best_time, report
+from Scanner import Scanner
+from Parser import Parser
+from Interpreter import Interpreter
+from ClosureCompiler import ClosureInterpreter
+import Rope
+
+# Characters appended per iteration
+PIECE = "item " + "x" * 94 + ","
+TARGET_MB = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+# Sizes plain concatenation is timed at - it is quadratic, so it stops well short of the target
+PLAIN_MB = (0.25, 0.5, 1, 2)
+
+
+def source(megabytes):
+    iterations = int(megabytes * 1_000_000 / len(PIECE))
+    return f"""
+var list = "";
+for (var i = 0; i < {iterations}; i = i + 1) {{
+  list = list + "{PIECE[:-1]}" + ",";
+}}
+print len(list);
+print list == list + "";
+"""
+
+
+BACKENDS = (("Tree-walker", Interpreter), ("Closure backend", ClosureInterpreter))
+
+
+# threshold - Rope.ROPE_THRESHOLD for the run, infinity for plain strings throughout
+def run(megabytes, threshold, interpreter_class):
+    statements = Parser(Scanner(source(megabytes)).scan_tokens()).parse()
+    saved = Rope.ROPE_THRESHOLD
+    Rope.ROPE_THRESHOLD = threshold
+    try:
+        return best_time(lambda: interpreter_class().interpret(statements), repeat=1)
+    finally:
+        Rope.ROPE_THRESHOLD = saved
+
+
+def main():
+    for label, interpreter_class in BACKENDS:
+        print(label)
+        for megabytes in PLAIN_MB:
+            plain_time, plain_output = run(megabytes, float("inf"), interpreter_class)
+            rope_time, rope_output = run(megabytes, Rope.ROPE_THRESHOLD, interpreter_class)
+            assert plain_output == rope_output, "Ropes printed different output"
+            print(f"  {megabytes} MB")
+            report("    Plain strings", plain_time)
+            report("    Ropes", rope_time, f"{plain_time / rope_time:.1f}x")
+
+        rope_time, output = run(TARGET_MB, Rope.ROPE_THRESHOLD, interpreter_class)
+        length = int(output.split()[0])
+        print(f"  {TARGET_MB} MB")
+        report("    Ropes", rope_time, f"{length:,} characters, {length / rope_time / 1e6:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
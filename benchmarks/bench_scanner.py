@@ -0,0 +1,34 @@
+# bench_scanner.py
+# Tokens per second for Scanner.scan_tokens() against the regex-driven Scanner.scan_tokens_fast()
+# over a generated 10 MB script
+import sys
+import time
+
+import bench_util
+from bench_util import generate_script, report
+from Scanner import Scanner
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+
+
+def scan(source, fast):
+    scanner = Scanner(source)
+    start = time.perf_counter()
+    tokens = scanner.scan_tokens_fast() if fast else scanner.scan_tokens()
+    return tokens, time.perf_counter() - start
+
+
+def main():
+    source = generate_script(SIZE)
+    print(f"Synthetic script: {len(source) / 1e6:.1f} MB")
+    slow_tokens, slow_time = scan(source, fast=False)
+    fast_tokens, fast_time = scan(source, fast=True)
+    assert [(t.type, t.lexeme, t.literal, t.line) for t in slow_tokens] == \
+           [(t.type, t.lexeme, t.literal, t.line) for t in fast_tokens], "Fast mode produced different tokens"
+    count = len(fast_tokens)
+    report("scan_tokens", slow_time, f"{count / slow_time:>12.0f} tokens/s")
+    report("scan_tokens_fast", fast_time, f"{count / fast_time:>12.0f} tokens/s  {slow_time / fast_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
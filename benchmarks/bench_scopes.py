@@ -0,0 +1,59 @@
+# bench_scopes.py
+# Environments allocated by a 'for' loop, with every block getting a scope versus scopes elided
+# for blocks that declare nothing
+import sys
+
+import bench_util
+from bench_util import best_time, report
+from Scanner import Scanner
+from Parser import Parser
+from Environment import Environment
+from Interpreter import Interpreter
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+SOURCE = f"""
+var total = 0;
+for (var i = 0; i < {ITERATIONS}; i = i + 1) {{
+  total = total + i;
+}}
+print total;
+"""
+
+
+# Environment that counts how many times it is created
+class CountingEnvironment(Environment):
+    created = 0
+
+    def __init__(self, enclosing):
+        CountingEnvironment.created += 1
+        super().__init__(enclosing)
+
+
+# The old behaviour - a new scope for every block, whatever it contains
+class EveryBlockInterpreter(Interpreter):
+    def visitBlockStmt(self, stmt):
+        return self.executeBlock(stmt.statements, self.new_scope(self.environment))
+
+
+def run(interpreter_class):
+    statements = Parser(Scanner(SOURCE).scan_tokens()).parse()
+    interpreter = interpreter_class()
+    interpreter.new_scope = CountingEnvironment
+    CountingEnvironment.created = 0
+    seconds, output = best_time(lambda: interpreter.interpret(statements), repeat=1)
+    return seconds, output, CountingEnvironment.created
+
+
+def main():
+    print(f"for loop, {ITERATIONS} iterations")
+    every_time, every_output, every_count = run(EveryBlockInterpreter)
+    elided_time, elided_output, elided_count = run(Interpreter)
+    assert every_output == elided_output, "Elided run printed different output"
+    report("Scope for every block", every_time, f"{every_count:>9} environments")
+    report("Empty scopes elided", elided_time,
+           f"{elided_count:>9} environments  {every_time / elided_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
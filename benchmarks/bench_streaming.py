@@ -0,0 +1,53 @@
+# bench_streaming.py
+# Peak memory of reading, scanning and parsing a large script file, whole-file versus streaming
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import bench_util
+from bench_util import generate_script
+from Scanner import Scanner, StreamingScanner
+from Parser import Parser, StreamingParser
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+
+def parse_whole(path):
+    with open(path, "r") as f:
+        return Parser(Scanner(f.read()).scan_tokens()).parse()
+
+
+def parse_streaming(path):
+    with open(path, "r") as f:
+        return StreamingParser(StreamingScanner(f).iter_tokens()).parse()
+
+
+# Returns (seconds, peak bytes traced while parsing, bytes still held by the syntax tree afterwards)
+def measure(parse, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    statements = parse(path)
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del statements
+    return elapsed, peak, retained
+
+
+def main():
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write(generate_script(SIZE))
+        path = f.name
+    try:
+        print(f"Synthetic script: {os.path.getsize(path) / 1e6:.1f} MB")
+        for label, parse in (("whole file", parse_whole), ("streaming", parse_streaming)):
+            elapsed, peak, retained = measure(parse, path)
+            bench_util.report(label, elapsed, f"peak {peak / 1e6:>7.1f} MB  (syntax tree {retained / 1e6:.1f} MB)")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
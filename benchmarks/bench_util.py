@@ -0,0 +1,74 @@
+# bench_util.py
+# Shared helpers for the benchmark scripts in this folder
+import contextlib
+import io
+import os
+import sys
+import time
+
+# Benchmarks are run as 'python benchmarks/<name>.py' - make the interpreter modules importable
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+# Read one of the test case scripts shipped in the repository root
+def read_source(file_name):
+    with open(os.path.join(ROOT, file_name), "r") as f:
+        return f.read()
+
+
+# Run fn() with stdout captured so script output does not swamp the report
+# Returns (best time in seconds, captured output of the last run)
+def best_time(fn, repeat=3):
+    best = None
+    output = ""
+    for _ in range(repeat):
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+        output = buffer.getvalue()
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, output
+
+
+# Print one aligned line of a benchmark report
+def report(label, seconds, extra=""):
+    print(f"{label:<32} {seconds * 1000:>10.1f} ms  {extra}")
+
+
+# Chunk of StarlingScript exercising every statement and expression kind, numbered so names stay unique
+SCRIPT_TEMPLATE = """// Generated block {n}
+var counter{n} = {n};
+var label{n} = "item " + counter{n} + " of the generated script";
+fun scale{n}(value, factor) {{
+  if (value > 100 and factor != 0) {{
+    return (value * factor) / 2 ^ 2;
+  }} else {{
+    return -value + factor - 1.5;
+  }}
+}}
+for (var i = 0; i < 3; i = i + 1) {{
+  counter{n} = scale{n}(counter{n}, i) + 1;
+}}
+while (counter{n} < 10 | !false) {{
+  counter{n} = counter{n} + 100;
+  print label{n} + ": " + counter{n};
+}}
+"""
+
+
+# Generate a synthetic script of roughly 'size' characters
+def generate_script(size):
+    parts = []
+    total = 0
+    n = 0
+    while total < size:
+        part = SCRIPT_TEMPLATE.format(n=n)
+        parts.append(part)
+        total += len(part)
+        n += 1
+    return "".join(parts)